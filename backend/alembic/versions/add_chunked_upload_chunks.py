@@ -0,0 +1,37 @@
+"""add_chunked_upload_chunks
+
+Revision ID: add_chunked_upload_chunks
+Revises: add_chunked_upload_status
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_chunked_upload_chunks'
+down_revision: Union[str, Sequence[str], None] = 'add_chunked_upload_status'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('chunked_upload_chunks',
+        sa.Column('upload_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('chunk_number', sa.Integer(), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['upload_id'], ['chunked_uploads.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('upload_id', 'chunk_number')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('chunked_upload_chunks')
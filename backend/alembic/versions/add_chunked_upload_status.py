@@ -0,0 +1,31 @@
+"""add_chunked_upload_status
+
+Revision ID: add_chunked_upload_status
+Revises: add_content_addressed_blobs
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_chunked_upload_status'
+down_revision: Union[str, Sequence[str], None] = 'add_content_addressed_blobs'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chunked_uploads', sa.Column('status', sa.String(length=20), nullable=False, server_default='uploading'))
+    op.add_column('chunked_uploads', sa.Column('error_message', sa.Text(), nullable=True))
+    op.execute("UPDATE chunked_uploads SET status = 'completed' WHERE is_completed")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('chunked_uploads', 'error_message')
+    op.drop_column('chunked_uploads', 'status')
@@ -0,0 +1,47 @@
+"""add_dashboard_rollups
+
+Revision ID: add_dashboard_rollups
+Revises: add_file_renditions
+Create Date: 2026-10-17 23:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_dashboard_rollups'
+down_revision: Union[str, Sequence[str], None] = 'add_file_renditions'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('dashboard_rollups',
+        sa.Column('metric', sa.String(length=40), nullable=False),
+        sa.Column('bucket', sa.String(length=40), nullable=False, server_default=''),
+        sa.Column('count', sa.BigInteger(), nullable=False, server_default=sa.text('0')),
+        sa.Column('amount', sa.Numeric(precision=16, scale=2), nullable=False, server_default=sa.text('0')),
+        sa.PrimaryKeyConstraint('metric', 'bucket')
+    )
+    # Preenche com os dados existentes (mesmo cálculo de DashboardRollups.compute)
+    op.execute("""
+        INSERT INTO dashboard_rollups (metric, bucket, count, amount)
+        SELECT 'project_status', status::text, count(*), 0 FROM projects GROUP BY status
+        UNION ALL
+        SELECT 'completed_revenue', to_char(actual_end_date, 'YYYY-MM-DD'), count(*), sum(total_value)
+        FROM projects WHERE status = 'completed' AND actual_end_date IS NOT NULL GROUP BY actual_end_date
+        UNION ALL
+        SELECT 'open_stages_due', to_char(planned_end_date, 'YYYY-MM-DD'), count(*), 0
+        FROM stages WHERE status <> 'completed' GROUP BY planned_end_date
+        UNION ALL
+        SELECT 'active_clients', '', count(*), 0 FROM clients WHERE is_active HAVING count(*) > 0
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('dashboard_rollups')
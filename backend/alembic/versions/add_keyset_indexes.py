@@ -0,0 +1,39 @@
+"""add_keyset_indexes
+
+Revision ID: add_keyset_indexes
+Revises: add_dashboard_rollups
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_keyset_indexes'
+down_revision: Union[str, Sequence[str], None] = 'add_dashboard_rollups'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # (created_at, id): ordem padrão das listagens; a paginação por cursor desempata pelo id.
+    # Em projects e clients substitui o índice só de created_at.
+    op.drop_index('ix_projects_created_at', table_name='projects')
+    op.drop_index('ix_clients_created_at', table_name='clients')
+    op.create_index('ix_projects_created_at_id', 'projects', ['created_at', 'id'], unique=False)
+    op.create_index('ix_clients_created_at_id', 'clients', ['created_at', 'id'], unique=False)
+    op.create_index('ix_files_created_at_id', 'files', ['created_at', 'id'], unique=False)
+    op.create_index('ix_tasks_created_at_id', 'tasks', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_created_at_id', table_name='tasks')
+    op.drop_index('ix_files_created_at_id', table_name='files')
+    op.drop_index('ix_clients_created_at_id', table_name='clients')
+    op.drop_index('ix_projects_created_at_id', table_name='projects')
+    op.create_index('ix_clients_created_at', 'clients', ['created_at'], unique=False)
+    op.create_index('ix_projects_created_at', 'projects', ['created_at'], unique=False)
@@ -0,0 +1,56 @@
+"""add_list_filter_indexes
+
+Revision ID: add_list_filter_indexes
+Revises: add_search_entries
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_list_filter_indexes'
+down_revision: Union[str, Sequence[str], None] = 'add_search_entries'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (coluna do filtro, created_at, id): o filtro seguido da ordem padrão das listagens, então a página e o
+# cursor saem do índice já ordenados e o total é contado só nele. Também atendem os by_project/by_client/
+# by_stage e as relações carregadas por selectin (project.files, stage.files, stage.tasks).
+LIST_FILTER_INDEXES = [
+    ('files', 'project_id'),
+    ('files', 'client_id'),
+    ('files', 'stage_id'),
+    ('files', 'uploaded_by_id'),
+    ('tasks', 'stage_id'),
+    ('tasks', 'created_by_id'),
+    ('tasks', 'assigned_to_id'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, column in LIST_FILTER_INDEXES:
+        op.create_index(f'ix_{table}_{column}_created_at_id', table, [column, 'created_at', 'id'], unique=False)
+    # Etapas de um projeto em ordem (project.stages, rollups, reordenação ao remover etapas)
+    op.create_index('ix_stages_project_id_order', 'stages', ['project_id', 'order'], unique=False)
+    # A chave primária é (project_id, client_id): projetos de um cliente precisam do índice invertido, que
+    # cobre a junção sem ler a tabela
+    op.create_index('ix_project_clients_client_id', 'project_clients', ['client_id', 'project_id'], unique=False)
+    # Escopo dos dashboards de arquiteto (projetos criados por ele e etapas atribuídas a ele)
+    op.create_index(op.f('ix_projects_created_by_id'), 'projects', ['created_by_id'], unique=False)
+    op.create_index(op.f('ix_stages_assigned_to_id'), 'stages', ['assigned_to_id'], unique=False)
+    for table in ('files', 'tasks', 'stages', 'project_clients', 'projects'):
+        op.execute(f'ANALYZE {table}')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_stages_assigned_to_id'), table_name='stages')
+    op.drop_index(op.f('ix_projects_created_by_id'), table_name='projects')
+    op.drop_index('ix_project_clients_client_id', table_name='project_clients')
+    op.drop_index('ix_stages_project_id_order', table_name='stages')
+    for table, column in reversed(LIST_FILTER_INDEXES):
+        op.drop_index(f'ix_{table}_{column}_created_at_id', table_name=table)
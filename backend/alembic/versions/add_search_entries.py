@@ -0,0 +1,86 @@
+"""add_search_entries
+
+Revision ID: add_search_entries
+Revises: add_search_indexes
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_search_entries'
+down_revision: Union[str, Sequence[str], None] = 'add_search_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Conteúdo da busca global por entidade. search_entries guarda uma cópia dela, atualizada pelos services
+    # (SearchIndex.refresh), porque a view em si não pode ser indexada
+    op.execute("""
+        CREATE VIEW search_sources AS
+        SELECT 'project'::varchar(20) AS entity_type, p.id AS entity_id, p.name::varchar AS title,
+               (SELECT string_agg(c.name, ', ' ORDER BY c.name) FROM project_clients pc
+                JOIN clients c ON c.id = pc.client_id WHERE pc.project_id = p.id)::varchar AS subtitle,
+               p.name::varchar AS content, p.id AS project_id,
+               ARRAY(SELECT pc.client_id FROM project_clients pc WHERE pc.project_id = p.id ORDER BY 1) AS client_ids
+        FROM projects p
+        UNION ALL
+        SELECT 'client', c.id, c.name, c.email, concat_ws(' ', c.name, c.document, c.email), NULL::uuid, ARRAY[c.id]
+        FROM clients c
+        UNION ALL
+        SELECT 'stage', s.id, s.name, p.name, s.name, s.project_id,
+               ARRAY(SELECT pc.client_id FROM project_clients pc WHERE pc.project_id = s.project_id ORDER BY 1)
+        FROM stages s JOIN projects p ON p.id = s.project_id
+        UNION ALL
+        SELECT 'task', t.id, t.title, concat_ws(' / ', p.name, s.name), t.title, s.project_id,
+               ARRAY(SELECT pc.client_id FROM project_clients pc WHERE pc.project_id = s.project_id ORDER BY 1)
+        FROM tasks t JOIN stages s ON s.id = t.stage_id JOIN projects p ON p.id = s.project_id
+        UNION ALL
+        SELECT 'file', f.id, f.original_name, coalesce(p.name, c.name), f.original_name, p.id,
+               ARRAY(SELECT pc.client_id FROM project_clients pc WHERE pc.project_id = p.id
+                     UNION SELECT f.client_id WHERE f.client_id IS NOT NULL ORDER BY 1)
+        FROM files f
+        LEFT JOIN stages s ON s.id = f.stage_id
+        LEFT JOIN projects p ON p.id = coalesce(f.project_id, s.project_id)
+        LEFT JOIN clients c ON c.id = f.client_id
+    """)
+    op.create_table('search_entries',
+        sa.Column('entity_type', sa.String(length=20), nullable=False),
+        sa.Column('entity_id', sa.UUID(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('subtitle', sa.String(), nullable=True),
+        sa.Column('content', sa.String(), nullable=False),
+        sa.Column('project_id', sa.UUID(), nullable=True),
+        sa.Column('client_ids', postgresql.ARRAY(sa.UUID()), nullable=False, server_default='{}'),
+        sa.PrimaryKeyConstraint('entity_type', 'entity_id')
+    )
+    op.execute("""
+        INSERT INTO search_entries (entity_type, entity_id, title, subtitle, content, project_id, client_ids)
+        SELECT entity_type, entity_id, title, subtitle, content, project_id, client_ids FROM search_sources
+    """)
+    op.create_index(op.f('ix_search_entries_project_id'), 'search_entries', ['project_id'], unique=False)
+    # GiST (e não GIN) de trigramas: além de filtrar, entrega as entradas em ordem de distância (<<->), então
+    # a busca lê só as mais parecidas mesmo quando o termo aparece em boa parte da tabela
+    op.create_index(
+        'ix_search_entries_content', 'search_entries', [sa.text('immutable_unaccent(content) gist_trgm_ops')],
+        unique=False, postgresql_using='gist'
+    )
+    # Filtro de permissão dos clientes (client_ids @> ARRAY[<cliente>])
+    op.create_index('ix_search_entries_client_ids', 'search_entries', ['client_ids'], unique=False, postgresql_using='gin')
+    op.execute('ANALYZE search_entries')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_search_entries_client_ids', table_name='search_entries')
+    op.drop_index('ix_search_entries_content', table_name='search_entries')
+    op.drop_index(op.f('ix_search_entries_project_id'), table_name='search_entries')
+    op.drop_table('search_entries')
+    op.execute('DROP VIEW search_sources')
@@ -0,0 +1,60 @@
+"""add_search_indexes
+
+Revision ID: add_search_indexes
+Revises: add_keyset_indexes
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_search_indexes'
+down_revision: Union[str, Sequence[str], None] = 'add_keyset_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (índice, tabela, coluna) buscados com utils.search.matches
+SEARCH_INDEXES = [
+    ('ix_projects_name_search', 'projects', 'name'),
+    ('ix_clients_name_search', 'clients', 'name'),
+    ('ix_clients_document_search', 'clients', 'document'),
+    ('ix_clients_email_search', 'clients', 'email'),
+    ('ix_files_original_name_search', 'files', 'original_name'),
+    ('ix_tasks_title_search', 'tasks', 'title'),
+    ('ix_stages_name_search', 'stages', 'name'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # pg_trgm e unaccent vêm no contrib do Postgres (incluído na imagem oficial)
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+    # unaccent() é STABLE (depende do dicionário configurado) e não pode entrar num índice; com o dicionário
+    # fixo ela é imutável na prática, então o wrapper pode ser declarado IMMUTABLE
+    op.execute("""
+        CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """)
+    # GIN de trigramas sobre o texto sem acentos: atende ILIKE '%termo%' sem varrer a tabela
+    for name, table, column in SEARCH_INDEXES:
+        op.create_index(
+            name, table, [sa.text(f'immutable_unaccent({column}) gin_trgm_ops')], unique=False, postgresql_using='gin'
+        )
+    # Estatísticas das expressões indexadas: sem elas o planner estima a seletividade da busca às cegas e
+    # prefere percorrer o índice de created_at, lendo a tabela inteira quando o termo é raro
+    for table in sorted({table for _, table, _ in SEARCH_INDEXES}):
+        op.execute(f'ANALYZE {table}')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(SEARCH_INDEXES):
+        op.drop_index(name, table_name=table)
+    op.execute('DROP FUNCTION IF EXISTS immutable_unaccent(text)')
+    # As extensões ficam: podem ser usadas por outros objetos do banco
@@ -0,0 +1,47 @@
+"""replace_uploaded_chunks_text
+
+Revision ID: replace_uploaded_chunks_text
+Revises: add_chunked_upload_chunks
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'replace_uploaded_chunks_text'
+down_revision: Union[str, Sequence[str], None] = 'add_chunked_upload_chunks'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Chunks de uploads em andamento anteriores ao registro por chunk não têm digest nem tamanho
+    op.alter_column('chunked_upload_chunks', 'size', existing_type=sa.BigInteger(), nullable=True)
+    op.alter_column('chunked_upload_chunks', 'sha256', existing_type=sa.String(length=64), nullable=True)
+    op.execute("""
+        INSERT INTO chunked_upload_chunks (upload_id, chunk_number, created_at)
+        SELECT u.id, CAST(trim(n) AS integer), now()
+        FROM chunked_uploads u, unnest(string_to_array(u.uploaded_chunks, ',')) AS n
+        WHERE NOT u.is_completed AND coalesce(u.uploaded_chunks, '') <> '' AND trim(n) <> ''
+        ON CONFLICT (upload_id, chunk_number) DO NOTHING
+    """)
+    op.drop_column('chunked_uploads', 'uploaded_chunks')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('chunked_uploads', sa.Column('uploaded_chunks', sa.Text(), nullable=True))
+    op.execute("""
+        UPDATE chunked_uploads u SET uploaded_chunks = coalesce((
+            SELECT string_agg(c.chunk_number::text, ',' ORDER BY c.chunk_number)
+            FROM chunked_upload_chunks c WHERE c.upload_id = u.id
+        ), '')
+    """)
+    op.execute("DELETE FROM chunked_upload_chunks WHERE sha256 IS NULL OR size IS NULL")
+    op.alter_column('chunked_upload_chunks', 'sha256', existing_type=sa.String(length=64), nullable=False)
+    op.alter_column('chunked_upload_chunks', 'size', existing_type=sa.BigInteger(), nullable=False)
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from starlette.concurrency import run_in_threadpool
 
 from ..api.dependencies import get_db, get_current_actor_factory
+from ..api.responses import cached_json_response
+from ..core.config import settings
 from ..schemas.client import ClientCreate, ClientUpdate, ClientRead, PaginatedClients, ClientBasicRead
 from ..services.client_service import ClientService
 
@@ -11,20 +13,24 @@ router = APIRouter()
 
 @router.get("", response_model=PaginatedClients)
 async def get_clients(
+    request: Request,
     db: Session = Depends(get_db),
     admin_user = Depends(get_current_actor_factory(["admin"])),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: str = Query(None),
+    count: str = Query(None, pattern="^(none|exact|estimate)$"),
     order_by: str = Query("created_at"),
     order_dir: str = Query("desc", pattern="^(asc|desc)$"),
     search: str = Query(None),
     is_active: bool = Query(None),
 ):
     service = ClientService(db)
-    return await run_in_threadpool(
+    result = await run_in_threadpool(
         service.get_clients,
-        limit, offset, order_by, order_dir, search, is_active
+        limit, offset, order_by, order_dir, search, is_active, settings.CACHE_RESPONSE_BYTES, cursor=cursor, count=count
     )
+    return cached_json_response(request, result)
 
 @router.get("/me", response_model=ClientBasicRead)
 async def get_me(
@@ -1,12 +1,48 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from starlette.concurrency import run_in_threadpool
 
-from ..api.dependencies import get_db
+from ..api.dependencies import get_db, get_current_actor_factory
+from ..models.client import Client
+from ..models.user import User
 from ..services import dashboard_service
+from ..services.dashboard_service import DashboardScope
+from ..utils.cache import cache
 
 router = APIRouter()
 
 @router.get("")
 async def get_dashboard(db: Session = Depends(get_db)):
     return await run_in_threadpool(dashboard_service.get_dashboard_service, db)
+
+@router.get("/me")
+async def get_my_dashboard(db: Session = Depends(get_db), actor = Depends(get_current_actor_factory())):
+    """Dashboard dos projetos do ator: do cliente logado, ou criados pelo usuário ou com etapas atribuídas a ele"""
+    return await run_in_threadpool(dashboard_service.get_scoped_dashboard_service, db, DashboardScope.for_actor(actor))
+
+@router.get("/clients/{client_id}")
+async def get_client_dashboard(
+    client_id: str,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_current_actor_factory(["admin"]))
+):
+    client = db.get(Client, client_id)
+    if not client:
+        raise HTTPException(status_code=404, detail="Cliente não encontrado")
+    return await run_in_threadpool(dashboard_service.get_scoped_dashboard_service, db, DashboardScope("client", client.id))
+
+@router.get("/users/{user_id}")
+async def get_user_dashboard(
+    user_id: str,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_current_actor_factory(["admin"]))
+):
+    user = db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    return await run_in_threadpool(dashboard_service.get_scoped_dashboard_service, db, DashboardScope("user", user.id))
+
+@router.get("/cache-stats")
+async def get_cache_stats(admin_user: User = Depends(get_current_actor_factory(["admin"]))):
+    """Contadores do cache (acertos, falhas, despejos, expirações) para monitoramento - apenas para admins"""
+    return cache.stats()
@@ -1,18 +1,28 @@
 from typing import List
-from fastapi import APIRouter, Depends, UploadFile, File as FastAPIFile, Query, HTTPException, Form, Body
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import APIRouter, Depends, Query, Path, HTTPException, Body, Request, BackgroundTasks, Header
+from fastapi.responses import FileResponse, StreamingResponse, Response, RedirectResponse
 from sqlalchemy.orm import Session
 from starlette.concurrency import run_in_threadpool
 import os
-from io import BytesIO
-import zipfile
+import hashlib
+import anyio
+from secrets import token_hex
+from datetime import timezone
+from email.utils import formatdate, parsedate_to_datetime
 
 from ..api.dependencies import get_db, get_current_actor_factory, client_resource_permission
+from ..api.responses import cached_json_response
 from ..models.user import User
-from ..schemas.file import FileRead, FileCreate, FileUpdate, PaginatedFiles, FileCategory, FileReadPublic
+from ..schemas.file import FileRead, FileCreate, FileUpdate, PaginatedFiles, FileCategory, FileReadPublic, FileRenditionRead
 from ..services.file_service import FileService
+from ..services.video_rendition_service import VideoRenditionService
 from ..models.project import Project
 from ..core.config import settings
+from ..core.storage import storage
+from ..core.renditions import renditions
+from ..core.multipart_stream import MultipartStream
+from ..core.upload_limits import upload_limiter, release_connection
+from ..utils.zip_stream import stream_zip
 from ..schemas.chunked_upload import (
     ChunkedUploadInitiate, ChunkedUploadResponse, ChunkUploadResponse,
     ChunkedUploadStatus, ChunkedUploadComplete
@@ -22,10 +32,13 @@ router = APIRouter()
 
 @router.get("", response_model=PaginatedFiles)
 async def get_files(
+    request: Request,
     db: Session = Depends(get_db),
     admin_user: User = Depends(get_current_actor_factory(["admin"])),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: str = Query(None),
+    count: str = Query(None, pattern="^(none|exact|estimate)$"),
     order_by: str = Query("created_at"),
     order_dir: str = Query("desc", pattern="^(asc|desc)$"),
     original_name: str = Query(None),
@@ -36,10 +49,12 @@ async def get_files(
     uploaded_by_id: str = Query(None),
 ):
     service = FileService(db)
-    return await run_in_threadpool(
+    result = await run_in_threadpool(
         service.get_files,
-        limit, offset, order_by, order_dir, original_name, category, project_id, client_id, stage_id, uploaded_by_id
+        limit, offset, order_by, order_dir, original_name, category, project_id, client_id, stage_id, uploaded_by_id,
+        settings.CACHE_RESPONSE_BYTES, cursor=cursor, count=count
     )
+    return cached_json_response(request, result)
 
 @router.get("/project/{project_id}", response_model=List[FileReadPublic])
 async def get_files_by_project(
@@ -77,56 +92,70 @@ async def get_file(
     service = FileService(db)
     return await run_in_threadpool(service.get_file, file_id, client_resource_permission, actor)
 
-@router.post("", response_model=FileRead)
-async def upload_file(
-    file: UploadFile = FastAPIFile(...),
-    category: str = Form(None),
-    project_id: str = Form(None),
-    client_id: str = Form(None),
-    stage_id: str = Form(None),
-    description: str = Form(None),
-    db: Session = Depends(get_db),
-    actor = Depends(get_current_actor_factory())
-):
-    from uuid import UUID
+def _multipart_body(file_field: str, fields: List[str]) -> dict:
+    """Documenta no OpenAPI o multipart lido por MultipartStream (sem UploadFile/Form na assinatura)"""
+    properties = {file_field: {"type": "string", "format": "binary"}}
+    properties.update({field: {"type": "string"} for field in fields})
+    return {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object", "required": [file_field], "properties": properties
+    }}}}}
 
-    filename = file.filename or "unnamed"
-    mime_type = file.content_type or "application/octet-stream"
-
-    temp_service = FileService(db)
-    temp_service._validate_file_type(filename, mime_type)
+def _form_file_data(fields: dict, filename: str, mime_type: str, actor) -> FileCreate:
+    from uuid import UUID
 
-    detected_category = None
+    category = fields.get("category")
     if category:
         try:
             detected_category = FileCategory(category)
         except Exception:
             detected_category = FileCategory.document
+    elif mime_type.startswith("image/"):
+        detected_category = FileCategory.image
+    elif mime_type.startswith("video/"):
+        detected_category = FileCategory.video
     else:
-        mime = file.content_type or "application/octet-stream"
-        if mime.startswith("image/"):
-            detected_category = FileCategory.image
-        elif mime.startswith("video/"):
-            detected_category = FileCategory.video
-        else:
-            detected_category = FileCategory.document
+        detected_category = FileCategory.document
 
-    file_data = FileCreate(
-        original_name=file.filename or "unnamed",
+    project_id = fields.get("project_id")
+    client_id = fields.get("client_id")
+    stage_id = fields.get("stage_id")
+    return FileCreate(
+        original_name=filename,
         stored_name="",
         path="",
         size=0,
-        mime_type=file.content_type or "application/octet-stream",
+        mime_type=mime_type,
         category=detected_category,
-        description=description,
+        description=fields.get("description"),
         project_id=UUID(project_id) if project_id else None,
         client_id=UUID(client_id) if client_id else None,
         stage_id=UUID(stage_id) if stage_id else None,
         uploaded_by_id=actor.id
     )
 
+@router.post("", response_model=FileRead,
+             openapi_extra=_multipart_body("file", ["category", "project_id", "client_id", "stage_id", "description"]))
+async def upload_file(
+    request: Request,
+    db: Session = Depends(get_db),
+    actor = Depends(get_current_actor_factory())
+):
+    """
+    Upload multipart (campo `file` e campos opcionais category, project_id, client_id, stage_id, description).
+    O corpo só começa a ser lido depois que houver vaga no limite de uploads e vai direto para o blob store.
+    """
     service = FileService(db)
-    return await run_in_threadpool(service.upload_file, file, file_data, actor, client_resource_permission)
+    await release_connection(db)
+    async with upload_limiter.slot(actor.id):
+        form = MultipartStream(request, "file")
+        await form.open_file()
+        filename = form.filename or "unnamed"
+        mime_type = form.content_type or "application/octet-stream"
+        return await service.upload_file(
+            filename, mime_type, form.file_chunks(),
+            lambda: _form_file_data(form.fields, filename, mime_type, actor),
+            actor, client_resource_permission
+        )
 
 @router.put("/{file_id}", response_model=FileRead)
 async def update_file(file_id: str, file_data: FileUpdate, db: Session = Depends(get_db), admin_user: User = Depends(get_current_actor_factory(["admin"]))):
@@ -138,26 +167,213 @@ async def delete_file(file_id: str, db: Session = Depends(get_db), admin_user: U
     service = FileService(db)
     return await run_in_threadpool(service.delete_file_api, file_id)
 
+class ByteRangeFileResponse(FileResponse):
+    """FileResponse com multipart/byteranges conforme RFC 9110 (Content-Type multipart e CRLF)"""
+
+    async def _handle_multiple_ranges(self, send, ranges, file_size, send_header_only):
+        boundary = token_hex(13)
+        content_type = self.headers["content-type"]
+        parts = [
+            (f"--{boundary}\r\nContent-Type: {content_type}\r\n"
+             f"Content-Range: bytes {start}-{end - 1}/{file_size}\r\n\r\n").encode("latin-1")
+            for start, end in ranges
+        ]
+        closing = f"--{boundary}--\r\n".encode("latin-1")
+        content_length = sum(len(part) + (end - start) + 2 for part, (start, end) in zip(parts, ranges)) + len(closing)
+        self.headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+        self.headers["content-length"] = str(content_length)
+        await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+        if send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            for part, (start, end) in zip(parts, ranges):
+                await send({"type": "http.response.body", "body": part, "more_body": True})
+                await file.seek(start)
+                while start < end:
+                    chunk = await file.read(min(self.chunk_size, end - start))
+                    start += len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                await send({"type": "http.response.body", "body": b"\r\n", "more_body": True})
+        await send({"type": "http.response.body", "body": closing, "more_body": False})
+
+def _file_validators(file_model):
+    """ETag e Last-Modified derivados dos metadados do File, sem tocar no disco"""
+    updated = file_model.updated_at or file_model.created_at
+    if updated.tzinfo is None:
+        updated = updated.replace(tzinfo=timezone.utc)
+    etag_base = f"{file_model.id}-{file_model.size}-{updated.isoformat()}"
+    etag = f'"{hashlib.md5(etag_base.encode()).hexdigest()}"'
+    return etag, updated.replace(microsecond=0)
+
+def _is_not_modified(request: Request, etag: str, last_modified) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified <= since
+    return False
+
 @router.get("/{file_id}/download")
-async def download_file(file_id: str, db: Session = Depends(get_db), actor = Depends(get_current_actor_factory())):
+async def download_file(file_id: str, request: Request, db: Session = Depends(get_db), actor = Depends(get_current_actor_factory())):
+    """
+    Download de arquivo com suporte a requisições condicionais e parciais.
+
+    - If-None-Match / If-Modified-Since são avaliados contra os metadados do File e retornam 304
+      sem acessar o sistema de arquivos.
+    - Range com um ou vários intervalos retorna 206 (multipart/byteranges quando houver mais de um);
+      If-Range usa o mesmo ETag/Last-Modified.
+    """
     service = FileService(db)
     file_model = await run_in_threadpool(service.get_file_internal, file_id, actor, client_resource_permission)
-    file_path = file_model.path
+    etag, last_modified = _file_validators(file_model)
+    validator_headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified.timestamp(), usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+    if _is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=validator_headers)
+
+    safe_name = FileService.sanitize_filename(file_model.original_name)
+    return await _stored_file_response(file_model.path, safe_name, file_model.mime_type, validator_headers)
+
+async def _stored_file_response(key: str, filename: str, media_type: str, headers: dict):
+    """Entrega uma chave do storage: redirect para URL assinada em storages remotos, arquivo com Range no local"""
+    presigned_url = await run_in_threadpool(
+        storage.presign, key, settings.S3_PRESIGN_EXPIRY_SECONDS,
+        filename=filename, media_type=media_type
+    )
+    if presigned_url:
+        return RedirectResponse(presigned_url, status_code=307, headers={"Cache-Control": "private, no-store"})
+
     # valida path dentro do diretório de upload
-    root = os.path.realpath(settings.UPLOAD_DIR)
-    real = os.path.realpath(file_path)
-    if not real.startswith(root + os.sep) and real != root:
-        raise HTTPException(status_code=400, detail="Caminho de arquivo inválido")
-    if not os.path.exists(real):
+    real = storage.local_path(key)
+    if not real or not os.path.exists(real):
         raise HTTPException(status_code=404, detail="Arquivo não encontrado no sistema de arquivos")
 
-    safe_name = FileService.sanitize_filename(file_model.original_name)
-    return FileResponse(
+    return ByteRangeFileResponse(
         path=real,
-        filename=safe_name,
-        media_type=file_model.mime_type
+        filename=filename,
+        media_type=media_type,
+        headers=headers
     )
 
+@router.get("/{file_id}/thumbnail")
+async def get_thumbnail(
+    file_id: str,
+    request: Request,
+    size: str = Query("thumb", description="Tamanho da rendition (ex.: thumb, medium)"),
+    db: Session = Depends(get_db),
+    actor = Depends(get_current_actor_factory())
+):
+    """
+    Miniatura/preview de imagens e renders, em WebP quando o cliente aceitar (Accept) e JPEG caso contrário.
+    A rendition é gerada num pool de processos no primeiro pedido (ou logo após o upload) e servida do cache.
+    """
+    if size not in settings.RENDITION_SIZES:
+        available = ", ".join(settings.RENDITION_SIZES)
+        raise HTTPException(status_code=400, detail=f"Tamanho inválido. Tamanhos disponíveis: {available}")
+    service = FileService(db)
+    file_model = await run_in_threadpool(service.get_file_internal, file_id, actor, client_resource_permission)
+    if not renditions.supports(file_model):
+        raise HTTPException(status_code=404, detail="Miniatura não disponível para este tipo de arquivo")
+
+    fmt = "webp" if "image/webp" in request.headers.get("accept", "") else "jpeg"
+    _, last_modified = _file_validators(file_model)
+    etag_base = f"{file_model.id}-{file_model.content_hash}-{settings.RENDITION_SIZES[size]}-{fmt}"
+    etag = f'"{hashlib.md5(etag_base.encode()).hexdigest()}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified.timestamp(), usegmt=True),
+        "Cache-Control": "private, max-age=86400",
+        "Vary": "Accept",
+    }
+    if _is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    path = await renditions.get(file_model, size, fmt)
+    return FileResponse(path, media_type=f"image/{fmt}", headers=headers)
+
+@router.get("/{file_id}/renditions", response_model=List[FileRenditionRead])
+async def get_file_renditions(
+    file_id: str,
+    db: Session = Depends(get_db),
+    actor = Depends(get_current_actor_factory())
+):
+    """Poster e preview de vídeo, com status (pending, processing, ready, failed) e metadados"""
+    service = FileService(db)
+    file_model = await run_in_threadpool(service.get_file_internal, file_id, actor, client_resource_permission)
+    return await run_in_threadpool(VideoRenditionService(db).get_renditions, file_model.id)
+
+@router.post("/{file_id}/renditions", response_model=List[FileRenditionRead], status_code=202)
+async def regenerate_file_renditions(
+    file_id: str,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_current_actor_factory(["admin"]))
+):
+    """Agenda novamente a geração de poster e preview do vídeo - apenas para admins"""
+    file_model = await run_in_threadpool(FileService(db).get_file_internal, file_id, admin_user, client_resource_permission)
+    video_service = VideoRenditionService(db)
+    if not video_service.supports(file_model):
+        raise HTTPException(status_code=400, detail="Arquivo não é um vídeo suportado")
+    if not video_service.tools():
+        raise HTTPException(status_code=503, detail="ffmpeg não está disponível no servidor")
+    await run_in_threadpool(video_service.schedule, file_model)
+    return await run_in_threadpool(video_service.get_renditions, file_model.id)
+
+@router.get("/{file_id}/renditions/{kind}")
+async def download_file_rendition(
+    file_id: str,
+    request: Request,
+    kind: str = Path(..., pattern="^(poster|preview)$"),
+    db: Session = Depends(get_db),
+    actor = Depends(get_current_actor_factory())
+):
+    """Conteúdo do poster ou do preview, com Range (o preview tem faststart e toca sem baixar o vídeo inteiro)"""
+    service = FileService(db)
+    file_model = await run_in_threadpool(service.get_file_internal, file_id, actor, client_resource_permission)
+    rendition = await run_in_threadpool(VideoRenditionService(db).get_ready_rendition, file_model.id, kind)
+    etag, last_modified = _file_validators(rendition)
+    validator_headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified.timestamp(), usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+    if _is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=validator_headers)
+    base_name = os.path.splitext(FileService.sanitize_filename(file_model.original_name))[0]
+    filename = f"{base_name}_{kind}{os.path.splitext(rendition.path)[1]}"
+    return await _stored_file_response(rendition.path, filename, rendition.mime_type, validator_headers)
+
+def _zip_entries(file_models):
+    """Monta as entradas do ZIP apenas para arquivos válidos e existentes no storage"""
+    entries = []
+    for file_model in file_models:
+        if not file_model.path:
+            continue
+        try:
+            stored = storage.stat(file_model.path)
+        except HTTPException:
+            continue
+        if not stored:
+            continue
+        entries.append((
+            FileService.sanitize_filename(file_model.original_name),
+            stored.size,
+            stored.modified,
+            lambda key=file_model.path: storage.open_range(key)
+        ))
+    return entries
+
 @router.get("/project/{project_id}/download")
 async def download_project_files(
     project_id: str,
@@ -171,25 +387,14 @@ async def download_project_files(
     project = db.query(Project).filter(Project.id == project_id).first()
     project_name = project.name if project else f"projeto_{project_id}"
     safe_project_name = FileService.sanitize_filename(project_name)
-    zip_buffer = BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
-        for file in files:
-            # precisamos obter o modelo interno para pegar o path real
-            file_model = await run_in_threadpool(service.get_file_internal, str(file.id), actor, client_resource_permission)
-            if not file_model.path:
-                continue
-            real = os.path.realpath(file_model.path)
-            root = os.path.realpath(settings.UPLOAD_DIR)
-            if not real.startswith(root + os.sep) and real != root:
-                continue
-            if not os.path.exists(real):
-                continue
-            arcname = FileService.sanitize_filename(file_model.original_name)
-            zipf.write(real, arcname=arcname)
-    zip_buffer.seek(0)
+    entries = []
+    for file in files:
+        # precisamos obter o modelo interno para pegar o path real
+        file_model = await run_in_threadpool(service.get_file_internal, str(file.id), actor, client_resource_permission)
+        entries.append(file_model)
     zip_filename = f"{safe_project_name}.zip"
     return StreamingResponse(
-        zip_buffer,
+        stream_zip(await run_in_threadpool(_zip_entries, entries)),
         media_type="application/zip",
         headers={"Content-Disposition": f'attachment; filename="{zip_filename}"'}
     )
@@ -210,23 +415,9 @@ async def download_selected_files(
             continue
     if not files:
         raise HTTPException(status_code=404, detail="Nenhum arquivo encontrado.")
-    zip_buffer = BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
-        root = os.path.realpath(settings.UPLOAD_DIR)
-        for file_model in files:
-            if not file_model.path:
-                continue
-            real = os.path.realpath(file_model.path)
-            if not real.startswith(root + os.sep) and real != root:
-                continue
-            if not os.path.exists(real):
-                continue
-            arcname = FileService.sanitize_filename(file_model.original_name)
-            zipf.write(real, arcname=arcname)
-    zip_buffer.seek(0)
     zip_filename = "arquivos.zip"
     return StreamingResponse(
-        zip_buffer,
+        stream_zip(await run_in_threadpool(_zip_entries, files)),
         media_type="application/zip",
         headers={"Content-Disposition": f'attachment; filename="{zip_filename}"'}
     )
@@ -241,16 +432,43 @@ async def initiate_chunked_upload(
     service = FileService(db)
     return await run_in_threadpool(service.initiate_upload, upload_data, actor)
 
-@router.post("/chunked/{upload_id}/chunk/{chunk_number}", response_model=ChunkUploadResponse)
+@router.post("/chunked/{upload_id}/chunk/{chunk_number}", response_model=ChunkUploadResponse,
+             openapi_extra=_multipart_body("chunk", ["checksum"]))
 async def upload_chunk(
     upload_id: str,
     chunk_number: int,
-    chunk: UploadFile = FastAPIFile(...),
+    request: Request,
     db: Session = Depends(get_db),
     actor = Depends(get_current_actor_factory())
 ):
+    """
+    Recebe um chunk multipart (campo `chunk`); `checksum` (SHA-256 do chunk, opcional) rejeita chunks
+    corrompidos na chegada. Como no PUT, o corpo só é lido depois que houver vaga no limite de uploads.
+    """
     service = FileService(db)
-    return await run_in_threadpool(service.upload_chunk, upload_id, chunk_number, chunk)
+    await release_connection(db)
+    async with upload_limiter.slot(actor.id):
+        form = MultipartStream(request, "chunk")
+        await form.open_file()
+        return await service.upload_chunk(upload_id, chunk_number, form.file_chunks(), lambda: form.fields.get("checksum"))
+
+@router.put("/chunked/{upload_id}/chunk/{chunk_number}", response_model=ChunkUploadResponse)
+async def put_chunk(
+    upload_id: str,
+    chunk_number: int,
+    request: Request,
+    x_chunk_checksum: str = Header(None),
+    db: Session = Depends(get_db),
+    actor = Depends(get_current_actor_factory())
+):
+    """
+    Recebe um chunk como corpo bruto (application/octet-stream), gravado no storage à medida que chega.
+    O corpo só começa a ser lido depois que houver vaga no limite de uploads. `X-Chunk-Checksum` é opcional.
+    """
+    service = FileService(db)
+    await release_connection(db)
+    async with upload_limiter.slot(actor.id):
+        return await service.upload_chunk(upload_id, chunk_number, request.stream(), x_chunk_checksum)
 
 @router.get("/chunked/{upload_id}/status", response_model=ChunkedUploadStatus)
 async def get_upload_status(
@@ -264,11 +482,20 @@ async def get_upload_status(
 @router.post("/chunked/{upload_id}/complete", response_model=ChunkedUploadComplete)
 async def complete_upload(
     upload_id: str,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    background: bool = Query(False, description="Monta o arquivo em segundo plano; acompanhe por /status"),
     db: Session = Depends(get_db),
     actor = Depends(get_current_actor_factory())
 ):
     service = FileService(db)
-    return await run_in_threadpool(service.complete_upload, upload_id, actor, client_resource_permission)
+    result = await run_in_threadpool(
+        service.complete_upload, upload_id, actor, client_resource_permission,
+        background_tasks if background else None
+    )
+    if result.status == "assembling":
+        response.status_code = 202
+    return result
 
 @router.get("/chunked/{upload_id}/retry", response_model=ChunkedUploadStatus)
 async def retry_missing_chunks(
@@ -289,6 +516,15 @@ async def cleanup_expired_uploads(
     service = FileService(db)
     return await run_in_threadpool(service.cleanup_expired_uploads)
 
+@router.post("/storage/deduplicate")
+async def deduplicate_storage(
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_current_actor_factory(["admin"]))
+):
+    """Migra arquivos antigos para o blob store deduplicado - apenas para admins"""
+    service = FileService(db)
+    return await run_in_threadpool(service.deduplicate_storage)
+
 @router.delete("/chunked/{upload_id}")
 async def cancel_upload(
     upload_id: str,
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
 from sqlalchemy.orm import Session
 from starlette.concurrency import run_in_threadpool
 
 from ..api.dependencies import get_db, get_current_actor_factory, client_resource_permission
+from ..api.responses import cached_json_response
+from ..core.config import settings
 from ..models import User
 from ..schemas.project import ProjectRead, ProjectCreate, ProjectUpdate, PaginatedProjects
 from ..services.project_service import ProjectService
@@ -11,10 +13,13 @@ router = APIRouter()
 
 @router.get("", response_model=PaginatedProjects)
 async def get_projects(
+    request: Request,
     db: Session = Depends(get_db),
     admin_user: User = Depends(get_current_actor_factory(["admin"])),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: str = Query(None),
+    count: str = Query(None, pattern="^(none|exact|estimate)$"),
     order_by: str = Query("created_at"),
     order_dir: str = Query("desc", pattern="^(asc|desc)$"),
     name: str = Query(None),
@@ -27,10 +32,12 @@ async def get_projects(
     search: str = Query(None),
 ):
     service = ProjectService(db)
-    return await run_in_threadpool(
+    result = await run_in_threadpool(
         service.get_projects,
-        limit, offset, order_by, order_dir, name, status, start_date, client_id, stage_name, stage_type, stage, search
+        limit, offset, order_by, order_dir, name, status, start_date, client_id, stage_name, stage_type, stage, search,
+        settings.CACHE_RESPONSE_BYTES, cursor=cursor, count=count
     )
+    return cached_json_response(request, result)
 
 @router.get("/my", response_model=PaginatedProjects)
 async def get_my_projects(
@@ -38,6 +45,8 @@ async def get_my_projects(
     actor = Depends(get_current_actor_factory()),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: str = Query(None),
+    count: str = Query(None, pattern="^(none|exact|estimate)$"),
     order_by: str = Query("created_at"),
     order_dir: str = Query("desc", pattern="^(asc|desc)$"),
     name: str = Query(None),
@@ -49,7 +58,7 @@ async def get_my_projects(
     service = ProjectService(db)
     return await run_in_threadpool(
         service.get_my_projects,
-        actor, limit, offset, order_by, order_dir, name, status, start_date, client_id, search
+        actor, limit, offset, order_by, order_dir, name, status, start_date, client_id, search, cursor=cursor, count=count
     )
 
 @router.get("/client/{client_id}", response_model=PaginatedProjects)
@@ -59,6 +68,8 @@ async def get_projects_by_client(
     actor = Depends(get_current_actor_factory()),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: str = Query(None),
+    count: str = Query(None, pattern="^(none|exact|estimate)$"),
     order_by: str = Query("created_at"),
     order_dir: str = Query("desc", pattern="^(asc|desc)$"),
     name: str = Query(None),
@@ -69,7 +80,8 @@ async def get_projects_by_client(
     service = ProjectService(db)
     return await run_in_threadpool(
         service.get_projects_by_client,
-        client_id, actor, limit, offset, order_by, order_dir, name, status, start_date, search, client_resource_permission
+        client_id, actor, limit, offset, order_by, order_dir, name, status, start_date, search, client_resource_permission,
+        cursor=cursor, count=count
     )
 
 @router.get("/{project_id}", response_model=ProjectRead)
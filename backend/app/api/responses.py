@@ -0,0 +1,41 @@
+from fastapi import Request
+from fastapi.responses import Response
+
+from ..utils.cache import EncodedJSON
+
+
+def _accepts_gzip(request: Request) -> bool:
+    for item in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = item.partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            q = params.strip().removeprefix("q=")
+            try:
+                return not params or float(q) > 0
+            except ValueError:
+                return False
+    return False
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def cached_json_response(request: Request, result):
+    """
+    Resposta de uma listagem: um EncodedJSON vira um Response com os bytes guardados no cache (comprimidos,
+    se o cliente aceitar gzip), ETag e 304 para If-None-Match; modelos seguem pelo response_model da rota.
+    """
+    if not isinstance(result, EncodedJSON):
+        return result
+    # no-cache: o navegador guarda a resposta, mas revalida com o ETag a cada uso
+    headers = {"ETag": result.etag, "Vary": "Accept-Encoding", "Cache-Control": "private, no-cache"}
+    if _etag_matches(request, result.etag):
+        return Response(status_code=304, headers=headers)
+    if result.gzipped is not None and _accepts_gzip(request):
+        headers["Content-Encoding"] = "gzip"
+        return Response(result.gzipped, media_type="application/json", headers=headers)
+    return Response(result.body, media_type="application/json", headers=headers)
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from ..api import auth, users, clients, projects, stage_types, files, tasks, dashboard
+from ..api import auth, users, clients, projects, stage_types, files, tasks, dashboard, search
 
 api_router = APIRouter()
 
@@ -12,3 +12,4 @@ api_router.include_router(stage_types.router, prefix="/stage-types", tags=["stag
 api_router.include_router(files.router, prefix="/files", tags=["files"])
 api_router.include_router(tasks.router, prefix="/tasks", tags=["tasks"])
 api_router.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"])
+api_router.include_router(search.router, prefix="/search", tags=["search"])
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from ..api.dependencies import get_db, get_current_actor_factory
+from ..schemas.search import SearchResults
+from ..services.search_service import SearchService
+
+router = APIRouter()
+
+@router.get("", response_model=SearchResults)
+async def search(
+    db: Session = Depends(get_db),
+    actor = Depends(get_current_actor_factory(["admin", "client"])),
+    q: str = Query(..., min_length=2, max_length=100),
+    types: str = Query(None, description="Tipos separados por vírgula: project, client, stage, task, file"),
+    limit: int = Query(20, ge=1, le=50),
+):
+    """Busca em projetos, clientes, etapas, tarefas e arquivos; clientes só recebem resultados dos seus projetos"""
+    service = SearchService(db)
+    type_list = [t.strip() for t in types.split(",") if t.strip()] if types else None
+    return await run_in_threadpool(service.search, actor, q.strip(), type_list, limit)
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
 from typing import List
 from starlette.concurrency import run_in_threadpool
 
 from ..api.dependencies import get_db, get_current_actor_factory
+from ..api.responses import cached_json_response
+from ..core.config import settings
 from ..models.user import User
 from ..schemas.stage_type import StageTypeRead, StageTypeCreate, StageTypeUpdate, PaginatedStageTypes
 from ..services.stage_type_service import StageTypeService
@@ -12,20 +14,25 @@ router = APIRouter()
 
 @router.get("", response_model=PaginatedStageTypes)
 async def get_stage_types(
+    request: Request,
     db: Session = Depends(get_db),
     actor = Depends(get_current_actor_factory()),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: str = Query(None),
+    count: str = Query(None, pattern="^(none|exact|estimate)$"),
     order_by: str = Query("created_at"),
     order_dir: str = Query("asc", pattern="^(asc|desc)$"),
     name: str = Query(None),
     is_active: bool = Query(None),
 ):
     service = StageTypeService(db)
-    return await run_in_threadpool(
+    result = await run_in_threadpool(
         service.get_stage_types,
-        actor, limit, offset, order_by, order_dir, name, is_active
+        actor, limit, offset, order_by, order_dir, name, is_active, settings.CACHE_RESPONSE_BYTES,
+        cursor=cursor, count=count
     )
+    return cached_json_response(request, result)
 
 @router.get("/active", response_model=List[StageTypeRead])
 async def get_active_stage_types(
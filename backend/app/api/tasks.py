@@ -1,10 +1,12 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
 from starlette.concurrency import run_in_threadpool
 
 from ..api.dependencies import get_db, get_current_actor_factory, client_resource_permission
+from ..api.responses import cached_json_response
+from ..core.config import settings
 from ..schemas.task import TaskRead, TaskCreate, TaskUpdate, PaginatedTasks
 from ..services.task_service import TaskService
 
@@ -12,10 +14,13 @@ router = APIRouter()
 
 @router.get("", response_model=PaginatedTasks)
 async def get_tasks(
+    request: Request,
     db: Session = Depends(get_db),
     admin_user = Depends(get_current_actor_factory(["admin"])),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: str = Query(None),
+    count: str = Query(None, pattern="^(none|exact|estimate)$"),
     order_by: str = Query("created_at"),
     order_dir: str = Query("desc", pattern="^(asc|desc)$"),
     title: str = Query(None),
@@ -27,10 +32,12 @@ async def get_tasks(
     assigned_to_id: str = Query(None),
 ):
     service = TaskService(db)
-    return await run_in_threadpool(
+    result = await run_in_threadpool(
         service.get_tasks,
-        limit, offset, order_by, order_dir, title, status, priority, due_date, stage_id, created_by_id, assigned_to_id
+        limit, offset, order_by, order_dir, title, status, priority, due_date, stage_id, created_by_id, assigned_to_id,
+        settings.CACHE_RESPONSE_BYTES, cursor=cursor, count=count
     )
+    return cached_json_response(request, result)
 
 @router.get("/stage/{stage_id}", response_model=List[TaskRead])
 async def get_tasks_by_stage(stage_id: str, db: Session = Depends(get_db), actor = Depends(get_current_actor_factory())):
@@ -1,6 +1,6 @@
 import json
 import os
-from typing import List
+from typing import Dict, List
 from pydantic import field_validator
 from pydantic_settings import BaseSettings
 
@@ -46,12 +46,66 @@ class Settings(BaseSettings):
         env = (data.get('ENVIRONMENT') or os.getenv('ENVIRONMENT') or 'development').strip().lower()
         return env in ("prod", "production")
 
+    # Cache em memória das listagens e do dashboard
+    CACHE_DEFAULT_TTL: int = 60  # segundos
+    CACHE_MAX_ENTRIES: int = 5000
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # tamanho serializado aproximado das entradas
+    CACHE_SWEEP_INTERVAL: int = 30  # segundos entre as varreduras de entradas expiradas
+    # Segundos em que uma entrada vencida ainda é servida enquanto uma única requisição a recalcula (0 desativa)
+    CACHE_STALE_TTL: int = 30
+    # "local" (um cache por processo) ou "redis" (compartilhado, com L1 local invalidado via pub/sub)
+    CACHE_BACKEND: str = "local"
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"  # Redis >= 7 (ou compatível, ex.: Valkey)
+    CACHE_REDIS_NAMESPACE: str = "crialt:cache:"
+    CACHE_L1_TTL: int = 5  # segundos no L1 de cada processo quando CACHE_BACKEND=redis
+    # Guarda as listagens paginadas já serializadas em JSON, respondidas sem passar pelo response_model
+    CACHE_RESPONSE_BYTES: bool = True
+    CACHE_GZIP_MIN_BYTES: int = 1024  # respostas a partir deste tamanho também ficam comprimidas (0 desativa)
+
+    # Dashboard lido da tabela dashboard_rollups, mantida a cada escrita. Ao reativar depois de um período
+    # desativado, reconstrua a tabela com `python -m app.services.dashboard_rollups rebuild`
+    DASHBOARD_ROLLUPS: bool = True
+    # Acima deste número de projetos, o dashboard de um recorte é invalidado por qualquer escrita em projetos
+    # ou clientes, em vez de guardar uma tag por projeto
+    DASHBOARD_SCOPE_MAX_TAGS: int = 500
+
     # Upload/Storage
     UPLOAD_DIR: str = "app/storage/uploads"
     MAX_FILE_SIZE: int = 1 * 1024 * 1024 * 1024  # 1GB
     CHUNK_UPLOAD_TIMEOUT: int = 300  # 5 minutos timeout para chunks
     MAX_CHUNK_SIZE: int = 50 * 1024 * 1024  # 50MB por chunk
     CHUNKED_UPLOAD_EXPIRY_HOURS: int = 24  # Expiração de uploads chunked
+    CHUNK_ASSEMBLY_WORKERS: int = 4  # Threads de cópia na montagem do arquivo final
+    CHUNK_ASSEMBLY_STALE_MINUTES: int = 30  # Montagem parada há mais tempo pode ser reiniciada
+    MAX_CONCURRENT_UPLOADS: int = 32  # Uploads (arquivos ou chunks) processados ao mesmo tempo por instância
+    MAX_CONCURRENT_UPLOADS_PER_USER: int = 8
+    UPLOAD_QUEUE_TIMEOUT: int = 30  # Segundos na fila antes de responder 429
+    UPLOAD_IO_THREADS: int = 16  # Threads para hash/banco dos uploads, separadas das demais rotas
+
+    # Miniaturas/previews de imagens (cache em disco, geradas num pool de processos)
+    RENDITION_DIR: str = "app/storage/renditions"
+    RENDITION_SIZES: Dict[str, int] = {"thumb": 256, "medium": 1280}  # maior lado em pixels
+    RENDITION_WORKERS: int = 2
+    RENDITIONS_ON_UPLOAD: bool = True  # gera as miniaturas logo após o upload, sem esperar o primeiro pedido
+
+    # Poster/preview de vídeos (ffmpeg e ffprobe do sistema; sem eles a geração é ignorada)
+    FFMPEG_PATH: str = "ffmpeg"
+    FFPROBE_PATH: str = "ffprobe"
+    VIDEO_POSTER_WIDTH: int = 1280
+    VIDEO_PREVIEW_HEIGHT: int = 480
+    VIDEO_PREVIEW_BITRATE: str = "600k"  # ~10MB a cada 2 minutos de vídeo
+    VIDEO_TRANSCODE_WORKERS: int = 1  # transcodes simultâneos por instância
+    VIDEO_TRANSCODE_TIMEOUT: int = 1800  # segundos
+
+    # Backend de armazenamento: "local" (UPLOAD_DIR) ou "s3" (qualquer serviço compatível, ex.: MinIO)
+    STORAGE_BACKEND: str = "local"
+    S3_BUCKET: str = ""
+    S3_ENDPOINT_URL: str | None = None
+    S3_REGION: str | None = None
+    S3_ACCESS_KEY_ID: str | None = None
+    S3_SECRET_ACCESS_KEY: str | None = None
+    S3_PREFIX: str = ""
+    S3_PRESIGN_EXPIRY_SECONDS: int = 300  # validade das URLs de download direto
 
     ALLOWED_EXTENSIONS: List[str] = [
         ".jpg", ".jpeg", ".png", ".gif", ".webp", ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".dwg", ".dxf", ".txt", ".zip", ".rar",
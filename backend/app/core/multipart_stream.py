@@ -0,0 +1,136 @@
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+try:
+    from python_multipart.exceptions import MultipartParseError
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ModuleNotFoundError:
+    from multipart.exceptions import MultipartParseError
+    from multipart.multipart import MultipartParser, parse_options_header
+
+_FILE_START = object()
+_FILE_END = object()
+
+
+class MultipartStream:
+    """
+    Lê um corpo multipart/form-data à medida que ele chega de request.stream().
+
+    Com UploadFile o Starlette grava o corpo inteiro num arquivo temporário antes do handler rodar; aqui o
+    conteúdo do arquivo é entregue em blocos por file_chunks() e nada é lido antes de open_file(). Campos de
+    texto, enviados antes ou depois do arquivo, ficam em `fields`; os posteriores só estão disponíveis
+    depois que file_chunks() termina.
+    """
+
+    def __init__(self, request: Request, file_field: str, max_field_size: int = 1024 * 1024) -> None:
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or not params.get(b"boundary"):
+            raise HTTPException(status_code=400, detail="Corpo deve ser multipart/form-data")
+        self.body = request.stream().__aiter__()
+        self.file_field = file_field
+        self.max_field_size = max_field_size
+        self.fields: Dict[str, str] = {}
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self.events: Deque = deque()
+        self.ended = False
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._field: Optional[str] = None
+        self._in_file = False
+        self._value = bytearray()
+        self.parser = MultipartParser(params[b"boundary"], callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_end": self._on_end,
+        })
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        # Só o primeiro arquivo do campo esperado é repassado; qualquer outra parte é tratada como campo de texto
+        if name == self.file_field and b"filename" in options and self.filename is None:
+            self._in_file = True
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+            self.content_type = self._headers.get(b"content-type", b"").decode("latin-1") or None
+            self.events.append(_FILE_START)
+        else:
+            self._field = name
+            self._value = bytearray()
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self.events.append(data[start:end])
+            return
+        self._value += data[start:end]
+        if len(self._value) > self.max_field_size:
+            raise HTTPException(status_code=400, detail=f"Campo '{self._field}' muito grande")
+
+    def _on_part_end(self) -> None:
+        if self._in_file:
+            self._in_file = False
+            self.events.append(_FILE_END)
+        elif self._field is not None:
+            self.fields[self._field] = self._value.decode("utf-8", "replace")
+            self._field = None
+
+    def _on_end(self) -> None:
+        self.ended = True
+
+    async def _next_event(self):
+        while not self.events:
+            if self.ended:
+                return None
+            try:
+                data = await self.body.__anext__()
+            except StopAsyncIteration:
+                raise HTTPException(status_code=400, detail="Corpo multipart incompleto")
+            try:
+                self.parser.write(data)
+            except MultipartParseError as e:
+                raise HTTPException(status_code=400, detail=f"Corpo multipart inválido: {e}")
+        return self.events.popleft()
+
+    async def open_file(self) -> None:
+        """Lê até o início do arquivo, preenchendo filename e content_type"""
+        while True:
+            event = await self._next_event()
+            if event is None:
+                raise HTTPException(status_code=400, detail=f"Arquivo não enviado no campo '{self.file_field}'")
+            if event is _FILE_START:
+                return
+
+    async def file_chunks(self) -> AsyncIterator[bytes]:
+        """Conteúdo do arquivo em blocos; ao terminar, lê o resto do corpo (campos enviados depois do arquivo)"""
+        while True:
+            event = await self._next_event()
+            if event is _FILE_END:
+                break
+            if event is None:
+                raise HTTPException(status_code=400, detail="Corpo multipart incompleto")
+            if event:
+                yield event
+        while await self._next_event() is not None:
+            pass
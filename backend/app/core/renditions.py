@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+
+from ..core.config import settings
+from ..core.storage import storage
+from ..schemas.file import FileCategory
+from ..utils.image_renditions import IMAGE_EXTENSIONS, RenditionTarget, render_image
+
+RENDITION_CATEGORIES = {FileCategory.image, FileCategory.render}
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+
+
+def _render_job(source_key: str, targets: List[RenditionTarget]):
+    """Executado no processo do pool: lê o original do storage (baixando para um temporário se for remoto)"""
+    source = storage.local_path(source_key)
+    if source is not None:
+        return render_image(source, targets)
+    fd, temp = tempfile.mkstemp(prefix="rendition-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for data in storage.open_range(source_key):
+                out.write(data)
+        return render_image(temp, targets)
+    finally:
+        os.remove(temp)
+
+
+class RenditionCache:
+    """
+    Miniaturas e previews de imagens gerados num pool de processos e guardados em disco em
+    <RENDITION_DIR>/<file_id>/<lado>.<formato>. O conteúdo de um File não muda, então cada rendition é
+    gerada uma vez (no upload ou no primeiro pedido) e só é removida junto com o arquivo.
+    """
+
+    def __init__(self, root: str, sizes: Dict[str, int], workers: int) -> None:
+        self.root = os.path.realpath(root)
+        self.sizes = sizes
+        self.workers = workers
+        self.logger = logging.getLogger(__name__)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def supports(file_model) -> bool:
+        ext = os.path.splitext(file_model.original_name or "")[1].lower()
+        return file_model.category in RENDITION_CATEGORIES and ext in IMAGE_EXTENSIONS
+
+    def path(self, file_id, size: str, fmt: str) -> str:
+        return os.path.join(self.root, str(file_id), f"{self.sizes[size]}.{EXTENSIONS[fmt]}")
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: o processo filho não herda locks de threads do servidor; reciclado para conter
+            # o crescimento de memória do Pillow com imagens muito grandes
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=200
+            )
+        return self._pool
+
+    def _submit(self, source_key: str, targets: List[RenditionTarget]) -> Future:
+        """
+        Agenda a geração dos alvos que ainda não estão em andamento. Pedidos da mesma rendition enquanto
+        ela é gerada recebem o mesmo Future.
+        """
+        with self._lock:
+            pending = [target for target in targets if target[0] not in self._inflight]
+            if not pending:
+                return self._inflight[targets[0][0]]
+            try:
+                future = self._executor().submit(_render_job, source_key, pending)
+            except BrokenProcessPool:
+                # Um processo morreu (ex.: falta de memória) e inutilizou o pool: recria uma vez
+                self._pool = None
+                future = self._executor().submit(_render_job, source_key, pending)
+            for dest, _, _ in pending:
+                self._inflight[dest] = future
+        future.add_done_callback(lambda done: self._finish(done, pending))
+        return future
+
+    def _finish(self, future: Future, targets: List[RenditionTarget]) -> None:
+        with self._lock:
+            for dest, _, _ in targets:
+                if self._inflight.get(dest) is future:
+                    del self._inflight[dest]
+            if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+                self._pool = None
+
+    async def get(self, file_model, size: str, fmt: str) -> str:
+        """Caminho da rendition, gerando-a no pool de processos se ainda não existir"""
+        dest = self.path(file_model.id, size, fmt)
+        if os.path.exists(dest):
+            return dest
+        future = self._submit(file_model.path, [(dest, self.sizes[size], fmt)])
+        try:
+            # shield: se este cliente desistir, a geração continua para quem espera o mesmo Future
+            await asyncio.shield(asyncio.wrap_future(future))
+        except Exception as e:
+            self.logger.warning(f"Erro ao gerar miniatura do arquivo {file_model.id}: {e}")
+            raise HTTPException(status_code=422, detail="Não foi possível gerar a miniatura deste arquivo")
+        return dest
+
+    def schedule(self, file_model) -> None:
+        """Gera em segundo plano todas as renditions WebP de um arquivo recém-enviado"""
+        if not settings.RENDITIONS_ON_UPLOAD or not self.supports(file_model):
+            return
+        targets = [(self.path(file_model.id, size, "webp"), side, "webp") for size, side in self.sizes.items()]
+        try:
+            future = self._submit(file_model.path, targets)
+        except Exception as e:
+            self.logger.warning(f"Erro ao agendar miniaturas do arquivo {file_model.id}: {e}")
+            return
+        file_id = file_model.id
+
+        def log_error(done: Future) -> None:
+            if not done.cancelled() and done.exception():
+                self.logger.warning(f"Erro ao gerar miniaturas do arquivo {file_id}: {done.exception()}")
+
+        future.add_done_callback(log_error)
+
+    def discard(self, file_id) -> None:
+        shutil.rmtree(os.path.join(self.root, str(file_id)), ignore_errors=True)
+
+
+renditions = RenditionCache(settings.RENDITION_DIR, settings.RENDITION_SIZES, settings.RENDITION_WORKERS)
@@ -0,0 +1,360 @@
+import asyncio
+import io
+import os
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from typing import AsyncIterable, BinaryIO, Iterable, Iterator, List, NamedTuple, Optional
+
+import aiofiles
+import anyio
+import anyio.to_thread
+from fastapi import HTTPException
+
+from ..core.config import settings
+
+READ_SIZE = 1024 * 1024  # 1MB por leitura
+
+
+class StoredObject(NamedTuple):
+    key: str
+    size: int
+    modified: float
+
+
+def iter_stream(stream: BinaryIO, read_size: int = READ_SIZE) -> Iterator[bytes]:
+    """Adapta um arquivo (ex.: UploadFile.file) para o iterável de blocos aceito por put_stream"""
+    return iter(lambda: stream.read(read_size), b"")
+
+
+class StorageBackend(ABC):
+    """
+    Interface de armazenamento de arquivos. Chaves são caminhos relativos à raiz do storage
+    (ex.: "blobs/ab/cd/<sha256>", "temp_chunks/<upload_id>/chunk_000001").
+    """
+
+    @abstractmethod
+    def put_stream(self, key: str, chunks: Iterable[bytes]) -> int:
+        """Grava os blocos na chave (sobrescrevendo) e retorna o total de bytes"""
+
+    def put_bytes(self, key: str, data: bytes) -> int:
+        return self.put_stream(key, [data])
+
+    async def put_stream_async(self, key: str, chunks: AsyncIterable[bytes]) -> int:
+        """
+        Versão assíncrona de put_stream. O padrão roda put_stream numa thread alimentada pelo event loop
+        através de um canal com poucos blocos em memória, então quem envia mais rápido do que o storage
+        grava fica esperando (backpressure) em vez de acumular o corpo da requisição.
+        """
+        send, receive = anyio.create_memory_object_stream(4)
+        loop = asyncio.get_running_loop()
+
+        def blocking_chunks():
+            # Drivers como o boto3 leem de threads próprias, então a ponte não depende de thread do AnyIO
+            while True:
+                try:
+                    yield asyncio.run_coroutine_threadsafe(receive.receive(), loop).result()
+                except anyio.EndOfStream:
+                    return
+
+        async def pump():
+            async with send:
+                async for data in chunks:
+                    await send.send(data)
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(pump)
+            total = await anyio.to_thread.run_sync(self.put_stream, key, blocking_chunks())
+        return total
+
+    @abstractmethod
+    def open_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Lê o intervalo [start, end) da chave em blocos"""
+
+    @abstractmethod
+    def stat(self, key: str) -> Optional[StoredObject]:
+        """Metadados da chave, ou None se não existir"""
+
+    def exists(self, key: str) -> bool:
+        return self.stat(key) is not None
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove a chave; não falha se ela não existir"""
+
+    @abstractmethod
+    def move(self, src_key: str, dest_key: str) -> None:
+        """Move (ou renomeia) uma chave, substituindo o destino"""
+
+    def copy(self, src_key: str, dest_key: str) -> None:
+        """Copia uma chave, substituindo o destino; a origem continua existindo"""
+        self.put_stream(dest_key, self.open_range(src_key))
+
+    @abstractmethod
+    def list(self, prefix: str) -> List[StoredObject]:
+        """Lista as chaves sob o prefixo"""
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Remove todas as chaves sob o prefixo e retorna os bytes liberados"""
+        freed = 0
+        for obj in self.list(prefix):
+            self.delete(obj.key)
+            freed += obj.size
+        return freed
+
+    def presign(self, key: str, expires_in: int = 300, filename: Optional[str] = None,
+                media_type: Optional[str] = None) -> Optional[str]:
+        """URL temporária de download direto, quando o backend suportar"""
+        return None
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Caminho no sistema de arquivos local, quando o backend for local"""
+        return None
+
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root: str) -> None:
+        os.makedirs(root, exist_ok=True)
+        self.root = os.path.realpath(root)
+
+    def _resolve(self, key: str) -> str:
+        # os.path.join mantém caminhos absolutos (registros gravados antes do storage por chaves)
+        joined = os.path.join(self.root, key)
+        real = os.path.realpath(joined)
+        if not real.startswith(self.root + os.sep) and real != self.root:
+            raise HTTPException(status_code=400, detail="Caminho de arquivo inválido")
+        if os.path.islink(joined):
+            raise HTTPException(status_code=400, detail="Links simbólicos não são permitidos")
+        return real
+
+    def _key_for(self, path: str) -> str:
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def put_stream(self, key: str, chunks: Iterable[bytes]) -> int:
+        path = self._resolve(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        total = 0
+        with open(path, "wb") as out:
+            for data in chunks:
+                total += len(data)
+                out.write(data)
+        return total
+
+    async def put_stream_async(self, key: str, chunks: AsyncIterable[bytes]) -> int:
+        path = self._resolve(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        total = 0
+        async with aiofiles.open(path, "wb") as out:
+            async for data in chunks:
+                total += len(data)
+                await out.write(data)
+        return total
+
+    def open_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        path = self._resolve(key)
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else end - start
+            while remaining is None or remaining > 0:
+                data = f.read(READ_SIZE if remaining is None else min(READ_SIZE, remaining))
+                if not data:
+                    break
+                if remaining is not None:
+                    remaining -= len(data)
+                yield data
+
+    def stat(self, key: str) -> Optional[StoredObject]:
+        path = self._resolve(key)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if not os.path.isfile(path):
+            return None
+        return StoredObject(self._key_for(path), st.st_size, st.st_mtime)
+
+    def delete(self, key: str) -> None:
+        path = self._resolve(key)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def move(self, src_key: str, dest_key: str) -> None:
+        src = self._resolve(src_key)
+        dest = self._resolve(dest_key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(src, dest)
+
+    def copy(self, src_key: str, dest_key: str) -> None:
+        src = self._resolve(src_key)
+        dest = self._resolve(dest_key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        partial = f"{dest}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            # Hard link quando origem e destino estão no mesmo sistema de arquivos: nenhum byte copiado
+            os.link(src, partial)
+        except OSError:
+            shutil.copyfile(src, partial)
+        os.replace(partial, dest)
+
+    def list(self, prefix: str) -> List[StoredObject]:
+        base = self._resolve(prefix)
+        if os.path.isfile(base):
+            return [obj for obj in [self.stat(prefix)] if obj]
+        objects = []
+        for dirpath, _, filenames in os.walk(base):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                objects.append(StoredObject(self._key_for(path), st.st_size, st.st_mtime))
+        return objects
+
+    def delete_prefix(self, prefix: str) -> int:
+        freed = sum(obj.size for obj in self.list(prefix))
+        base = self._resolve(prefix)
+        if os.path.isdir(base) and base != self.root:
+            shutil.rmtree(base, ignore_errors=True)
+        else:
+            self.delete(prefix)
+        return freed
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self._resolve(key)
+
+
+class _IterableReader(io.RawIOBase):
+    """Arquivo somente leitura sobre um iterável de blocos (para upload_fileobj do boto3)"""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._buffer = b""
+        self.total = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        self.total += n
+        return n
+
+
+class S3Storage(StorageBackend):
+    """Driver para qualquer serviço compatível com o protocolo S3 (AWS, MinIO, etc.)"""
+
+    def __init__(self, bucket: str, endpoint_url: Optional[str] = None, region: Optional[str] = None,
+                 access_key_id: Optional[str] = None, secret_access_key: Optional[str] = None,
+                 prefix: str = "") -> None:
+        try:
+            import boto3
+            from botocore.config import Config
+            from botocore.exceptions import ClientError
+        except ImportError:
+            raise RuntimeError("O pacote boto3 é necessário para STORAGE_BACKEND=s3")
+        self._client_error = ClientError
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.local_root = os.path.realpath(settings.UPLOAD_DIR)
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            config=Config(signature_version="s3v4", s3={"addressing_style": "path"})
+        )
+
+    def _key(self, key: str) -> str:
+        # Caminhos absolutos antigos sob UPLOAD_DIR viram chaves relativas (mesmo layout no bucket)
+        if os.path.isabs(key):
+            relative = os.path.relpath(os.path.realpath(key), self.local_root)
+            if relative.startswith(".."):
+                raise HTTPException(status_code=400, detail="Caminho de arquivo inválido")
+            key = relative.replace(os.sep, "/")
+        if ".." in key.split("/"):
+            raise HTTPException(status_code=400, detail="Caminho de arquivo inválido")
+        key = key.lstrip("/")
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _strip_prefix(self, key: str) -> str:
+        return key[len(self.prefix) + 1:] if self.prefix else key
+
+    def put_stream(self, key: str, chunks: Iterable[bytes]) -> int:
+        reader = _IterableReader(chunks)
+        self.client.upload_fileobj(reader, self.bucket, self._key(key))
+        return reader.total
+
+    def open_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        params = {"Bucket": self.bucket, "Key": self._key(key)}
+        if start or end is not None:
+            params["Range"] = f"bytes={start}-{'' if end is None else end - 1}"
+        body = self.client.get_object(**params)["Body"]
+        try:
+            yield from body.iter_chunks(READ_SIZE)
+        finally:
+            body.close()
+
+    def stat(self, key: str) -> Optional[StoredObject]:
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except self._client_error as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return StoredObject(key, head["ContentLength"], head["LastModified"].timestamp())
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def move(self, src_key: str, dest_key: str) -> None:
+        src = self._key(src_key)
+        # copy gerenciado usa multipart copy no servidor para objetos grandes; nenhum byte passa pela API
+        self.client.copy({"Bucket": self.bucket, "Key": src}, self.bucket, self._key(dest_key))
+        self.client.delete_object(Bucket=self.bucket, Key=src)
+
+    def copy(self, src_key: str, dest_key: str) -> None:
+        self.client.copy({"Bucket": self.bucket, "Key": self._key(src_key)}, self.bucket, self._key(dest_key))
+
+    def list(self, prefix: str) -> List[StoredObject]:
+        objects = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for item in page.get("Contents", []):
+                objects.append(StoredObject(self._strip_prefix(item["Key"]), item["Size"], item["LastModified"].timestamp()))
+        return objects
+
+    def presign(self, key: str, expires_in: int = 300, filename: Optional[str] = None,
+                media_type: Optional[str] = None) -> Optional[str]:
+        params = {"Bucket": self.bucket, "Key": self._key(key)}
+        if filename:
+            params["ResponseContentDisposition"] = f'attachment; filename="{filename}"'
+        if media_type:
+            params["ResponseContentType"] = media_type
+        return self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires_in)
+
+
+def create_storage_backend() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            bucket=settings.S3_BUCKET,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            prefix=settings.S3_PREFIX
+        )
+    return LocalStorage(settings.UPLOAD_DIR)
+
+
+storage = create_storage_backend()
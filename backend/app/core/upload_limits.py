@@ -0,0 +1,84 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Optional, TypeVar
+
+import anyio
+import anyio.to_thread
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+
+T = TypeVar("T")
+
+
+class UploadLimiter:
+    """
+    Limita uploads simultâneos por instância e por usuário. Quem passa do limite espera na fila até
+    UPLOAD_QUEUE_TIMEOUT e então recebe 429, em vez de ocupar threads do servidor.
+    """
+
+    def __init__(self, max_total: int, max_per_user: int, queue_timeout: float) -> None:
+        self.total = asyncio.Semaphore(max_total)
+        self.max_per_user = max_per_user
+        self.queue_timeout = queue_timeout
+        self.per_user: Dict[str, asyncio.Semaphore] = {}
+        self.users_active: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def slot(self, user_id) -> AsyncIterator[None]:
+        key = str(user_id)
+        user_semaphore = self.per_user.setdefault(key, asyncio.Semaphore(self.max_per_user))
+        self.users_active[key] = self.users_active.get(key, 0) + 1
+        acquired = []
+        try:
+            try:
+                with anyio.fail_after(self.queue_timeout):
+                    await user_semaphore.acquire()
+                    acquired.append(user_semaphore)
+                    await self.total.acquire()
+                    acquired.append(self.total)
+            except TimeoutError:
+                raise HTTPException(
+                    status_code=429,
+                    detail="Muitos uploads simultâneos, tente novamente em instantes",
+                    headers={"Retry-After": "5"}
+                )
+            yield
+        finally:
+            for semaphore in reversed(acquired):
+                semaphore.release()
+            self.users_active[key] -= 1
+            if not self.users_active[key]:
+                del self.users_active[key]
+                del self.per_user[key]
+
+
+upload_limiter = UploadLimiter(
+    max_total=settings.MAX_CONCURRENT_UPLOADS,
+    max_per_user=settings.MAX_CONCURRENT_UPLOADS_PER_USER,
+    queue_timeout=settings.UPLOAD_QUEUE_TIMEOUT
+)
+
+_io_limiter: Optional[anyio.CapacityLimiter] = None
+
+
+async def run_upload_io(func: Callable[..., T], *args) -> T:
+    """
+    Executa trabalho curto de upload (hash de um bloco, registro no banco) num pool de threads próprio,
+    para que uploads não consumam as threads usadas pelas demais rotas (run_in_threadpool).
+    """
+    global _io_limiter
+    if _io_limiter is None:
+        _io_limiter = anyio.CapacityLimiter(settings.UPLOAD_IO_THREADS)
+    return await anyio.to_thread.run_sync(func, *args, limiter=_io_limiter)
+
+
+async def release_connection(db: Session) -> None:
+    """
+    Devolve ao pool a conexão usada até aqui (ex.: autenticação) antes da fila e da leitura do corpo, que
+    podem demorar; sem isso cada upload em andamento prende uma conexão e as demais rotas esperam pelo pool.
+    Os objetos já carregados (como o usuário autenticado) continuam legíveis; a sessão volta a conectar
+    quando for usada de novo.
+    """
+    await run_upload_io(db.close)
@@ -5,7 +5,10 @@ from .project import Project
 from .stage_type import StageType
 from .stage import Stage
 from .task import Task
-from .file import File
-from .chunked_upload import ChunkedUpload
+from .file import File, FileRendition
+from .chunked_upload import ChunkedUpload, ChunkedUploadChunk
+from .blob import Blob
+from .dashboard_rollup import DashboardRollup
+from .search_entry import SearchEntry
 
-__all__ = ["Base", "User", "Client", "Project", "StageType", "Stage", "Task", "File", "ChunkedUpload"]
+__all__ = ["Base", "User", "Client", "Project", "StageType", "Stage", "Task", "File", "FileRendition", "ChunkedUpload", "ChunkedUploadChunk", "Blob", "DashboardRollup", "SearchEntry"]
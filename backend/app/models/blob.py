@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime
+from datetime import datetime, timezone
+
+from .base import Base
+
+
+class Blob(Base):
+    __tablename__ = "blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    path = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
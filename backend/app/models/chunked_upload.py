@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, Text
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Boolean, Text, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID
 from uuid import uuid4
 from datetime import datetime, timezone
@@ -25,10 +25,22 @@ class ChunkedUpload(Base):
     description = Column(Text)
     uploaded_by_id = Column(UUID(as_uuid=True), nullable=False)
 
-    uploaded_chunks = Column(Text, default="")
     is_completed = Column(Boolean, default=False)
+    status = Column(String(20), nullable=False, default="uploading")  # uploading, assembling, completed, failed
+    error_message = Column(Text)
     final_file_id = Column(UUID(as_uuid=True))
 
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     expires_at = Column(DateTime(timezone=True))
+
+
+class ChunkedUploadChunk(Base):
+    """Chunk recebido de um upload (uma linha por chunk), com o SHA-256 calculado na chegada"""
+    __tablename__ = "chunked_upload_chunks"
+
+    upload_id = Column(UUID(as_uuid=True), ForeignKey("chunked_uploads.id", ondelete="CASCADE"), primary_key=True)
+    chunk_number = Column(Integer, primary_key=True)
+    size = Column(BigInteger)
+    sha256 = Column(String(64))  # nulo em chunks migrados da antiga coluna uploaded_chunks
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
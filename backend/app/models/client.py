@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 from sqlalchemy import (
     Column, String, Boolean, DateTime, Date, Enum as SQLAlchemyEnum,
-    JSON
+    JSON, Index
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -12,6 +12,8 @@ from ..models.base import Base
 
 class Client(Base):
     __tablename__ = "clients"
+    # Ordem padrão das listagens, com o id que a paginação por cursor usa para desempatar
+    __table_args__ = (Index("ix_clients_created_at_id", "created_at", "id"),)
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=False, index=True)
@@ -29,7 +31,7 @@ class Client(Base):
     address = Column(JSON, nullable=True)
     notes = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
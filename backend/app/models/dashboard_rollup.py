@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, BigInteger, Numeric
+
+from .base import Base
+
+
+class DashboardRollup(Base):
+    """Contadores do dashboard mantidos a cada escrita de projeto, etapa ou cliente (ver services/dashboard_rollups.py)"""
+    __tablename__ = "dashboard_rollups"
+
+    # project_status, completed_revenue, open_stages_due ou active_clients
+    metric = Column(String(40), primary_key=True)
+    # Status do projeto ou data ISO (AAAA-MM-DD) do bucket; vazio para métricas sem bucket
+    bucket = Column(String(40), primary_key=True, default="")
+    count = Column(BigInteger, nullable=False, default=0)
+    amount = Column(Numeric(16, 2), nullable=False, default=0)
@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 from sqlalchemy import (
     Column, String, DateTime, Enum as SQLAlchemyEnum,
-    ForeignKey, Integer
+    ForeignKey, Integer, BigInteger, Float, Text, UniqueConstraint, Index
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -12,6 +12,15 @@ from ..models.base import Base
 
 class File(Base):
     __tablename__ = "files"
+    # Ordem padrão das listagens, com o id que a paginação por cursor usa para desempatar, sozinha e depois
+    # de cada filtro das listagens
+    __table_args__ = (
+        Index("ix_files_created_at_id", "created_at", "id"),
+        Index("ix_files_project_id_created_at_id", "project_id", "created_at", "id"),
+        Index("ix_files_client_id_created_at_id", "client_id", "created_at", "id"),
+        Index("ix_files_stage_id_created_at_id", "stage_id", "created_at", "id"),
+        Index("ix_files_uploaded_by_id_created_at_id", "uploaded_by_id", "created_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     original_name = Column(String, nullable=False)
@@ -21,6 +30,7 @@ class File(Base):
     mime_type = Column(String, nullable=False)
     category = Column(SQLAlchemyEnum(FileCategory), nullable=False)
     description = Column(String, nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # sha256 do blob em blobs
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -35,3 +45,26 @@ class File(Base):
     client = relationship("Client", back_populates="documents")
     stage = relationship("Stage", back_populates="files")
     uploaded_by = relationship("User", back_populates="uploaded_files")
+    renditions = relationship("FileRendition", back_populates="file", cascade="all, delete-orphan", passive_deletes=True)
+
+
+class FileRendition(Base):
+    """Versão derivada de um arquivo (poster e preview de vídeo), gerada em segundo plano e gravada no storage"""
+    __tablename__ = "file_renditions"
+    __table_args__ = (UniqueConstraint("file_id", "kind", name="uq_file_renditions_file_kind"),)
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    file_id = Column(UUID(as_uuid=True), ForeignKey("files.id", ondelete="CASCADE"), nullable=False, index=True)
+    kind = Column(String(20), nullable=False)  # poster, preview
+    status = Column(String(20), nullable=False, default="pending")  # pending, processing, ready, failed
+    path = Column(String)
+    mime_type = Column(String)
+    size = Column(BigInteger)
+    width = Column(Integer)
+    height = Column(Integer)
+    duration = Column(Float)  # segundos
+    error_message = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    file = relationship("File", back_populates="renditions")
@@ -3,7 +3,7 @@ from datetime import datetime, UTC
 
 from sqlalchemy import (
     Column, String, DateTime, Date, Enum as SQLAlchemyEnum,
-    JSON, ForeignKey, Numeric, Table
+    JSON, ForeignKey, Numeric, Table, Index
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -15,11 +15,15 @@ from .stage import Stage
 project_clients = Table(
     'project_clients', Base.metadata,
     Column('project_id', UUID(as_uuid=True), ForeignKey('projects.id'), primary_key=True),
-    Column('client_id', UUID(as_uuid=True), ForeignKey('clients.id'), primary_key=True)
+    Column('client_id', UUID(as_uuid=True), ForeignKey('clients.id'), primary_key=True),
+    # A chave primária começa pelo projeto; este índice atende os projetos de um cliente
+    Index('ix_project_clients_client_id', 'client_id', 'project_id')
 )
 
 class Project(Base):
     __tablename__ = "projects"
+    # Ordem padrão das listagens, com o id que a paginação por cursor usa para desempatar
+    __table_args__ = (Index("ix_projects_created_at_id", "created_at", "id"),)
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=False, index=True)
@@ -33,10 +37,10 @@ class Project(Base):
     work_address = Column(JSON, nullable=True)
     scope = Column(JSON, nullable=True)
     notes = Column(String, nullable=True)
-    created_at = Column(DateTime, default=lambda: datetime.now(UTC), index=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(UTC))
     updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
 
-    created_by_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    created_by_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
     current_stage_id = Column(UUID(as_uuid=True), nullable=True, index=True)
 
     # Relationships
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Index, String
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+
+from .base import Base
+
+
+class SearchEntry(Base):
+    """
+    Índice da busca global: uma linha por projeto, cliente, etapa, tarefa e arquivo, copiada da view
+    search_sources e mantida a cada escrita pelos services (ver services/search_index.py)
+    """
+    __tablename__ = "search_entries"
+    # O índice de trigramas de content (GiST) fica só na migration add_search_entries: depende de immutable_unaccent
+    __table_args__ = (Index("ix_search_entries_client_ids", "client_ids", postgresql_using="gin"),)
+
+    # project, client, stage, task ou file
+    entity_type = Column(String(20), primary_key=True)
+    entity_id = Column(UUID(as_uuid=True), primary_key=True)
+    title = Column(String, nullable=False)
+    # Contexto exibido com o resultado: clientes do projeto, projeto da etapa/tarefa/arquivo, e-mail do cliente
+    subtitle = Column(String)
+    # Texto pesquisado (índice de trigramas sobre immutable_unaccent(content))
+    content = Column(String, nullable=False)
+    project_id = Column(UUID(as_uuid=True), index=True)
+    # Clientes que podem ver o resultado (os do projeto; o próprio cliente na entrada dele)
+    client_ids = Column(ARRAY(UUID(as_uuid=True)), nullable=False, default=list)
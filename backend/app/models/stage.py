@@ -3,7 +3,7 @@ from datetime import datetime
 
 from sqlalchemy import (
     Column, String, DateTime, Date, Enum as SQLAlchemyEnum,
-    JSON, ForeignKey, Numeric, Integer
+    JSON, ForeignKey, Numeric, Integer, Index
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -14,6 +14,8 @@ from ..models.base import Base
 
 class Stage(Base):
     __tablename__ = "stages"
+    # Etapas de um projeto em ordem
+    __table_args__ = (Index("ix_stages_project_id_order", "project_id", "order"),)
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=False, index=True)
@@ -34,7 +36,7 @@ class Stage(Base):
     project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id"), nullable=False)
     stage_type_id = Column(UUID(as_uuid=True), ForeignKey("stage_types.id"), nullable=False, index=True)
     created_by_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    assigned_to_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+    assigned_to_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True, index=True)
 
     project = relationship("Project", back_populates="stages")
     stage_type = relationship("StageType", back_populates="stages")
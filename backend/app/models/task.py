@@ -3,7 +3,7 @@ from datetime import datetime
 
 from sqlalchemy import (
     Column, String, DateTime, Enum as SQLAlchemyEnum,
-    ForeignKey, Date
+    ForeignKey, Date, Index
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -14,6 +14,14 @@ from ..models.base import Base
 
 class Task(Base):
     __tablename__ = "tasks"
+    # Ordem padrão das listagens, com o id que a paginação por cursor usa para desempatar, sozinha e depois
+    # de cada filtro das listagens
+    __table_args__ = (
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_stage_id_created_at_id", "stage_id", "created_at", "id"),
+        Index("ix_tasks_created_by_id_created_at_id", "created_by_id", "created_at", "id"),
+        Index("ix_tasks_assigned_to_id_created_at_id", "assigned_to_id", "created_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title = Column(String, nullable=False)
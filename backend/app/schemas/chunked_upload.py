@@ -29,6 +29,7 @@ class ChunkUploadResponse(BaseModel):
     received: bool
     upload_progress: float = Field(..., ge=0.0, le=100.0, description="Progresso em porcentagem")
     uploaded_chunks: List[int]
+    checksum: Optional[str] = Field(None, description="SHA-256 do chunk calculado pelo servidor")
 
 
 class ChunkedUploadStatus(BaseModel):
@@ -39,6 +40,8 @@ class ChunkedUploadStatus(BaseModel):
     missing_chunks: Optional[List[int]] = Field(default=[], description="Lista de chunks faltando para retry")
     progress: float = Field(..., ge=0.0, le=100.0)
     is_completed: bool
+    status: str = Field("uploading", description="uploading, assembling, completed ou failed")
+    error_message: Optional[str] = None
     final_file_id: Optional[UUID] = None
     created_at: datetime
     expires_at: datetime
@@ -46,5 +49,6 @@ class ChunkedUploadStatus(BaseModel):
 
 class ChunkedUploadComplete(BaseModel):
     upload_id: str
-    final_file_id: UUID
+    final_file_id: Optional[UUID] = None
+    status: str = "completed"
     message: str
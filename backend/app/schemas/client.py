@@ -74,8 +74,11 @@ class ClientRead(ClientBase):
 
 
 class PaginatedClients(BaseModel):
-    total: int
+    # None nas páginas pedidas por cursor, que não contam o total
+    total: Optional[int] = None
     count: int
-    offset: int
+    offset: Optional[int] = None
     limit: int
     items: List[ClientRead]
+    # Cursor da página seguinte (None na última); repasse em `cursor` para continuar na mesma ordem
+    next_cursor: Optional[str] = None
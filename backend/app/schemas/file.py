@@ -58,9 +58,26 @@ class FileReadPublic(BaseModel):
     stage_id: Optional[UUID] = None
     uploaded_by_id: UUID
 
+class FileRenditionRead(BaseModel):
+    kind: str
+    status: str
+    mime_type: Optional[str] = None
+    size: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    duration: Optional[float] = None
+    error_message: Optional[str] = None
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
 class PaginatedFiles(BaseModel):
-    total: int
+    # None nas páginas pedidas por cursor, que não contam o total
+    total: Optional[int] = None
     count: int
-    offset: int
+    offset: Optional[int] = None
     limit: int
     items: List[FileRead]
+    # Cursor da página seguinte (None na última); repasse em `cursor` para continuar na mesma ordem
+    next_cursor: Optional[str] = None
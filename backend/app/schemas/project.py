@@ -170,8 +170,11 @@ ClientRead.model_rebuild()
 
 
 class PaginatedProjects(BaseModel):
-    total: int
+    # None nas páginas pedidas por cursor, que não contam o total
+    total: Optional[int] = None
     count: int
-    offset: int
+    offset: Optional[int] = None
     limit: int
     items: List[ProjectRead]
+    # Cursor da página seguinte (None na última); repasse em `cursor` para continuar na mesma ordem
+    next_cursor: Optional[str] = None
@@ -0,0 +1,21 @@
+from typing import Optional, List
+from uuid import UUID
+from pydantic import BaseModel
+
+
+class SearchHit(BaseModel):
+    # project, client, stage, task ou file
+    type: str
+    id: UUID
+    title: str
+    subtitle: Optional[str] = None
+    # Projeto do resultado (o próprio, no caso de projetos), para navegação
+    project_id: Optional[UUID] = None
+    # Relevância de 0 a 1 (word_similarity do termo com o texto do resultado)
+    score: float
+
+
+class SearchResults(BaseModel):
+    query: str
+    count: int
+    items: List[SearchHit]
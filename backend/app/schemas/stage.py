@@ -1,7 +1,7 @@
 from typing import Optional, List
 from uuid import UUID
 from datetime import datetime, date
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
 import enum
 from .stage_type import StageTypeRead
 
@@ -61,12 +61,22 @@ class StageRead(StageBase):
 
     stage_type: Optional[StageTypeRead] = None
 
+    @validator('files', 'tasks', pre=True)
+    def relationship_ids(cls, v):
+        # Vindos do ORM, files e tasks são objetos File/Task; a resposta traz só os ids
+        if v is None:
+            return v
+        return [getattr(item, 'id', item) for item in v]
+
     class Config:
         from_attributes = True
 
 class PaginatedStages(BaseModel):
-    total: int
+    # None nas páginas pedidas por cursor, que não contam o total
+    total: Optional[int] = None
     count: int
-    offset: int
+    offset: Optional[int] = None
     limit: int
     items: List[StageRead]
+    # Cursor da página seguinte (None na última); repasse em `cursor` para continuar na mesma ordem
+    next_cursor: Optional[str] = None
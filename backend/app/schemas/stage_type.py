@@ -90,8 +90,11 @@ class StageTypeRead(StageTypeBase):
 
 
 class PaginatedStageTypes(BaseModel):
-    total: int
+    # None nas páginas pedidas por cursor, que não contam o total
+    total: Optional[int] = None
     count: int
-    offset: int
+    offset: Optional[int] = None
     limit: int
     items: List[StageTypeRead]
+    # Cursor da página seguinte (None na última); repasse em `cursor` para continuar na mesma ordem
+    next_cursor: Optional[str] = None
@@ -0,0 +1,302 @@
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session, SessionTransaction
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from fastapi import HTTPException
+from itertools import chain
+from typing import AsyncIterable, AsyncIterator, Iterable, List, Optional, Tuple
+from uuid import uuid4
+import anyio
+import hashlib
+import logging
+import os
+
+from ..core.storage import storage
+from ..core.upload_limits import run_upload_io
+from ..models.blob import Blob
+from ..models.file import File
+from ..utils.file_assembly import assemble_files
+
+# Chaves do storage a conferir quando a transação da sessão terminar (session.info)
+CLEANUP_KEY = "blob_store_cleanup"
+
+logger = logging.getLogger(__name__)
+
+
+def _content_lock(sha256: str):
+    # Trava por conteúdo até o fim da transação, compartilhada entre quem referencia o blob e a limpeza
+    return select(func.pg_advisory_xact_lock(func.hashtextextended(sha256, 0)))
+
+
+def _cleanup(bind, items: List[Tuple[str, ...]]) -> None:
+    """
+    Apaga do storage as chaves que o banco, já confirmado ou desfeito, não referencia mais. Cada chave é
+    conferida numa transação própria: o blob só sai se não houver linha em blobs (com a trava do conteúdo,
+    então uma transação que está referenciando o mesmo blob termina antes), e os demais caminhos só saem se
+    nenhum File apontar para eles.
+    """
+    for item in dict.fromkeys(items):
+        try:
+            with bind.begin() as conn:
+                if item[0] == "blob":
+                    _, sha256, path = item
+                    conn.execute(_content_lock(sha256))
+                    referenced = conn.execute(select(Blob.sha256).where(Blob.sha256 == sha256)).first()
+                else:
+                    _, path = item
+                    referenced = conn.execute(select(File.id).where(File.path == path).limit(1)).first()
+                if referenced is None:
+                    storage.delete(path)
+        except Exception as e:
+            logger.warning(f"Erro ao limpar {item[-1]} do storage: {e}")
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _cleanup_after_transaction(session: Session, transaction: SessionTransaction) -> None:
+    # Commit, rollback ou close: depois do fim da transação externa, com a conexão dela já devolvida
+    if transaction.parent is None and session.info.get(CLEANUP_KEY):
+        _cleanup(session.get_bind(), session.info.pop(CLEANUP_KEY))
+
+
+class BlobStore:
+    """
+    Armazenamento endereçado por conteúdo (SHA-256) com contagem de referências.
+
+    Os blobs ficam na chave blobs/<aa>/<bb>/<sha256> do storage; vários registros de File com o mesmo
+    conteúdo apontam para o mesmo blob, que só é removido do disco quando a última referência sai.
+    Os métodos não fazem commit: o chamador confirma a transação junto com o File. Nada que o banco ainda
+    referencia sai do storage antes do fim da transação: arquivos a apagar (blob sem referências, caminho
+    antigo de um File) só são removidos depois dela, e só se o commit confirmou que ninguém mais aponta para
+    eles; um blob novo posicionado por uma transação desfeita é removido da mesma forma.
+    """
+
+    def __init__(self, db: Session) -> None:
+        self.db = db
+        self.logger = logging.getLogger(__name__)
+        self.storage = storage
+
+    @staticmethod
+    def blob_path(sha256: str) -> str:
+        return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+    @staticmethod
+    def new_temp_path() -> str:
+        return f"blobs/tmp/{uuid4().hex}"
+
+    def hash_file(self, path: str) -> Tuple[str, int]:
+        sha256_hash = hashlib.sha256()
+        size = 0
+        for data in self.storage.open_range(path):
+            size += len(data)
+            sha256_hash.update(data)
+        return sha256_hash.hexdigest(), size
+
+    def _cleanup_later(self, *item: str) -> None:
+        self.db.info.setdefault(CLEANUP_KEY, []).append(item)
+
+    def discard_path(self, path: str) -> None:
+        """Apaga a chave do storage depois da transação, se nenhum File apontar mais para ela"""
+        self._cleanup_later("path", path)
+
+    def _reference(self, sha256: str, size: int) -> str:
+        """Incrementa (ou cria) a referência do blob, com a trava do conteúdo até o fim da transação"""
+        final_path = self.blob_path(sha256)
+        # Com a trava, a limpeza de outra transação que soltou o último File deste conteúdo espera o nosso
+        # commit (e aí vê a referência) ou termina antes (e aí o arquivo é posicionado de novo abaixo)
+        self.db.execute(_content_lock(sha256))
+        self.db.execute(
+            pg_insert(Blob)
+            .values(sha256=sha256, path=final_path, size=size, ref_count=1)
+            .on_conflict_do_update(
+                index_elements=[Blob.sha256],
+                set_={"ref_count": Blob.ref_count + 1}
+            )
+        )
+        # Se a transação for desfeita, um blob posicionado por ela fica sem linha e é removido
+        self._cleanup_later("blob", sha256, final_path)
+        return final_path
+
+    def store_temp(self, temp_path: str, sha256: str, size: int) -> str:
+        """Move um arquivo já escrito e com hash calculado para o blob, incrementando a referência"""
+        final_path = self._reference(sha256, size)
+        if self.storage.exists(final_path):
+            self.storage.delete(temp_path)
+            self.logger.info(f"Blob {sha256} já existente, conteúdo deduplicado ({size} bytes)")
+        else:
+            self.storage.move(temp_path, final_path)
+        return final_path
+
+    def write_temp(self, chunks: Iterable[bytes], max_size: Optional[int] = None) -> Tuple[str, str, int]:
+        """Grava os blocos numa chave temporária calculando o hash, retornando (temp_path, sha256, size)"""
+        temp_path = self.new_temp_path()
+        sha256_hash = hashlib.sha256()
+        size = 0
+
+        def hashed():
+            nonlocal size
+            for data in chunks:
+                size += len(data)
+                if max_size is not None and size > max_size:
+                    raise HTTPException(status_code=400, detail="O arquivo é muito grande.")
+                sha256_hash.update(data)
+                yield data
+
+        try:
+            self.storage.put_stream(temp_path, hashed())
+        except Exception:
+            try:
+                self.storage.delete(temp_path)
+            except Exception:
+                pass
+            raise
+        return temp_path, sha256_hash.hexdigest(), size
+
+    async def write_temp_async(self, chunks: AsyncIterable[bytes], max_size: Optional[int] = None) -> Tuple[str, str, int]:
+        """Como write_temp, sem bloquear o event loop: o hash de cada bloco roda no pool de threads de upload"""
+        temp_path = self.new_temp_path()
+        sha256_hash = hashlib.sha256()
+        size = 0
+
+        async def hashed() -> AsyncIterator[bytes]:
+            nonlocal size
+            async for data in chunks:
+                size += len(data)
+                if max_size is not None and size > max_size:
+                    raise HTTPException(status_code=400, detail="O arquivo é muito grande.")
+                await run_upload_io(sha256_hash.update, data)
+                yield data
+
+        try:
+            await self.storage.put_stream_async(temp_path, hashed())
+        except BaseException:
+            with anyio.CancelScope(shield=True):
+                try:
+                    await run_upload_io(self.storage.delete, temp_path)
+                except Exception:
+                    pass
+            raise
+        return temp_path, sha256_hash.hexdigest(), size
+
+    def reference_existing(self, sha256: str, size: int) -> Optional[str]:
+        """
+        Incrementa a referência de um blob já armazenado, sem gravar nada; None se ele não existir ou se
+        o tamanho dele não for o esperado
+        """
+        blob = self.db.query(Blob).filter(Blob.sha256 == sha256).with_for_update().first()
+        if not blob or not self.storage.exists(blob.path):
+            return None
+        if blob.size != size:
+            self.logger.warning(f"Blob {sha256} com tamanho {blob.size} diferente do esperado ({size} bytes)")
+            return None
+        blob.ref_count += 1
+        self.db.flush()
+        self.logger.info(f"Blob {sha256} já existente, conteúdo deduplicado ({blob.size} bytes)")
+        return blob.path
+
+    def assemble(self, keys: List[str], workers: int = 4, sha256: Optional[str] = None) -> Tuple[str, str, int]:
+        """
+        Concatena as chaves numa chave temporária, retornando (temp_path, sha256, size). Se o sha256
+        já for conhecido (calculado durante o upload), o conteúdo não é lido de novo para o hash.
+        """
+        temp_path = self.new_temp_path()
+        sources = [self.storage.local_path(key) for key in keys]
+        dest = self.storage.local_path(temp_path)
+        if dest is None or None in sources:
+            return self.write_temp(chain.from_iterable(self.storage.open_range(key) for key in keys))
+
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        try:
+            calculated, size = assemble_files(sources, dest, workers, compute_hash=sha256 is None)
+        except Exception:
+            try:
+                self.storage.delete(temp_path)
+            except Exception:
+                pass
+            raise
+        return temp_path, sha256 or calculated, size
+
+    def store_stream(self, chunks: Iterable[bytes], max_size: Optional[int] = None) -> Tuple[str, str, int]:
+        """Grava os blocos no blob store, retornando (sha256, path, size)"""
+        temp_path, sha256, size = self.write_temp(chunks, max_size)
+        try:
+            return sha256, self.store_temp(temp_path, sha256, size), size
+        except Exception:
+            self.storage.delete(temp_path)
+            raise
+
+    def store_bytes(self, data: bytes) -> Tuple[str, str, int]:
+        return self.store_stream([data])
+
+    def release(self, sha256: str) -> bool:
+        """Remove uma referência; sem nenhuma, o blob sai do banco e, depois do commit, do storage"""
+        blob = self.db.query(Blob).filter(Blob.sha256 == sha256).with_for_update().first()
+        if not blob:
+            return False
+        blob.ref_count -= 1
+        if blob.ref_count > 0:
+            self.db.flush()
+            return False
+        self.db.delete(blob)
+        self.db.flush()
+        self._cleanup_later("blob", sha256, blob.path)
+        return True
+
+    def deduplicate_existing(self) -> dict:
+        """
+        Migra arquivos gravados antes do blob store (content_hash nulo) para blobs, no próprio disco:
+        o primeiro arquivo de cada conteúdo é copiado para o blob (hard link no storage local) e, depois do
+        commit que aponta o File para o blob, o original e as cópias seguintes são apagados.
+        """
+        processed = 0
+        duplicates = 0
+        missing = 0
+        bytes_reclaimed = 0
+
+        file_ids = [row.id for row in self.db.query(File.id).filter(File.content_hash.is_(None)).all()]
+        for file_id in file_ids:
+            file = self.db.get(File, file_id)
+            try:
+                found = bool(file.path) and self.storage.exists(file.path)
+            except HTTPException:
+                found = False
+            if not found:
+                missing += 1
+                continue
+            try:
+                sha256, size = self.hash_file(file.path)
+                final_path = self._reference(sha256, size)
+                existed = self.storage.exists(final_path)
+                if not existed:
+                    self.storage.copy(file.path, final_path)
+                self.discard_path(file.path)
+                file.path = final_path
+                file.content_hash = sha256
+                self.db.commit()
+            except Exception as e:
+                self.db.rollback()
+                self.logger.error(f"Erro ao migrar arquivo {file_id} para o blob store: {e}")
+                continue
+            processed += 1
+            if existed:
+                duplicates += 1
+                bytes_reclaimed += size
+
+        result = {
+            "message": "Deduplicação concluída",
+            "files_processed": processed,
+            "duplicates_removed": duplicates,
+            "files_missing": missing,
+            "space_freed_bytes": bytes_reclaimed,
+            "space_freed_mb": round(bytes_reclaimed / (1024 * 1024), 2)
+        }
+        self.logger.info(f"Deduplicação concluída: {result}")
+        return result
+
+
+if __name__ == "__main__":
+    from ..core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(BlobStore(db).deduplicate_existing())
+    finally:
+        db.close()
@@ -1,19 +1,40 @@
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
-from typing import Optional, Dict, Any
+from sqlalchemy.orm import Session, selectinload
+from typing import Optional, Dict, Any, Union
 from ..models.client import Client
 from ..schemas.client import ClientCreate, ClientUpdate, ClientRead, PaginatedClients, ClientBasicRead
 from ..schemas.project import ProjectRead, serialize_project
 from ..core.security import get_password_hash
 from ..services.auth_service import AuthService
-from ..utils.cache import cache
+from ..services.project_service import project_read_options, project_tags
+from ..core.config import settings
+from ..utils.cache import cache, EncodedJSON
+from ..utils.pagination import paginate
+from ..utils.search import matches, relevance
+from .dashboard_rollups import DashboardRollups, Rollups
+from .search_index import SearchIndex
 import logging
 
+# Campos do cliente exibidos ou pesquisados na busca global
+SEARCH_FIELDS = {"name", "document", "email"}
+
+
+def client_read_options() -> list:
+    """ClientRead traz os projetos do cliente, carregados com os mesmos loaders do ProjectRead"""
+    return [selectinload(Client.projects).options(*project_read_options())]
+
 
 class ClientService:
     def __init__(self, db: Session):
         self.db = db
         self.logger = logging.getLogger(__name__)
+        self.rollups = DashboardRollups(db)
+        self.search = SearchIndex(db)
+
+    def _update_rollups(self, before: Rollups, client: Client) -> None:
+        """Ajusta a contagem de clientes ativos do dashboard na transação da escrita"""
+        if settings.DASHBOARD_ROLLUPS:
+            self.rollups.apply(before, self.rollups.client_rollups(client))
 
     def serialize_client(self, client):
         data = client.__dict__.copy()
@@ -23,49 +44,52 @@ class ClientService:
             data["projects"] = []
         return ClientRead.model_validate(data)
 
-    def get_clients(self, limit: int, offset: int, order_by: str, order_dir: str, search: Optional[str], is_active: Optional[bool]) -> PaginatedClients:
+    def get_clients(self, limit: int, offset: int, order_by: str, order_dir: str, search: Optional[str], is_active: Optional[bool], encoded: bool = False, cursor: Optional[str] = None, count: Optional[str] = None) -> Union[PaginatedClients, EncodedJSON]:
         cache_params = {
             "limit": limit,
             "offset": offset,
             "order_by": order_by,
             "order_dir": order_dir,
             "search": search,
-            "is_active": is_active
+            "is_active": is_active,
+            "cursor": cursor,
+            "count": count
         }
-        cached = cache.get("clients", cache_params)
-        if cached:
-            self.logger.info(f"[CACHE] get_clients: params={cache_params}")
-            return cached
-        self.logger.info(f"[DB] get_clients: params={cache_params}")
-        query = self.db.query(Client)
-        if search:
-            like_pattern = f"%{search}%"
-            query = query.filter(
-                (Client.name.ilike(like_pattern)) |
-                (Client.document.ilike(like_pattern)) |
-                (Client.email.ilike(like_pattern))
+
+        def load() -> PaginatedClients:
+            self.logger.info(f"[DB] get_clients: params={cache_params}")
+            query = self.db.query(Client)
+            if search:
+                query = query.filter(matches(search, Client.name, Client.document, Client.email))
+            if is_active is not None:
+                query = query.filter(Client.is_active == is_active)
+            items, total, next_cursor = paginate(
+                query, Client, limit, offset, order_by, order_dir, cursor, client_read_options(),
+                count, ("clients", cache_params, ["clients:all"]),
+                rank=relevance(search, Client.name, Client.document, Client.email) if search else None
             )
-        if is_active is not None:
-            query = query.filter(Client.is_active == is_active)
-        if hasattr(Client, order_by):
-            order_col = getattr(Client, order_by)
-            if order_dir == "desc":
-                order_col = order_col.desc()
-            else:
-                order_col = order_col.asc()
-            query = query.order_by(order_col)
-        total = query.count()
-        items = query.offset(offset).limit(limit).all()
-        result = [self.serialize_client(client) for client in items]
-        paginated = PaginatedClients(
-            total=total,
-            count=len(result),
-            offset=offset,
-            limit=limit,
-            items=result
-        )
-        cache.set("clients", cache_params, paginated)
-        return paginated
+            result = [self.serialize_client(client) for client in items]
+            return PaginatedClients(
+                total=total,
+                count=len(result),
+                offset=None if cursor else offset,
+                limit=limit,
+                items=result,
+                next_cursor=next_cursor
+            )
+
+        def tags(paginated: PaginatedClients):
+            # Além dos clientes, a página mostra os projetos de cada um (com os demais clientes e as etapas)
+            tags = ["clients:all"]
+            for client in paginated.items:
+                tags.append(f"client:{client.id}")
+                for project in client.projects or []:
+                    tags += project_tags(project)
+            return tags
+
+        if encoded:
+            return cache.get_or_compute_json("clients", cache_params, load, tags=tags)
+        return cache.get_or_compute("clients", cache_params, load, tags=tags)
 
     def get_me(self, actor: Any) -> ClientBasicRead:
         if not hasattr(actor, "id"):
@@ -76,7 +100,7 @@ class ClientService:
         return ClientBasicRead.model_validate(client)
 
     def get_client(self, client_id: str, actor: Any) -> ClientRead:
-        client = self.db.get(Client, client_id)
+        client = self.db.get(Client, client_id, options=client_read_options())
         if not client:
             raise HTTPException(status_code=404, detail="Cliente não foi encontrado.")
         if hasattr(actor, "role") and getattr(actor, "role", None) == "admin":
@@ -110,10 +134,12 @@ class ClientService:
             first_access=True
         )
         self.db.add(client)
+        self._update_rollups({}, client)
+        self.db.flush()
+        self.search.refresh_client(client.id)
         self.db.commit()
         self.db.refresh(client)
-        cache.invalidate("clients")
-        cache.invalidate("dashboard")
+        cache.invalidate("clients:all", "dashboard:clients")
         return self.serialize_client(client)
 
     def update_client(self, client_id: str, client_data: ClientUpdate) -> ClientRead:
@@ -121,25 +147,33 @@ class ClientService:
         if not client:
             raise HTTPException(status_code=404, detail="Cliente não foi encontrado.")
         update_data = client_data.model_dump(exclude_unset=True)
+        rollups_before = self.rollups.client_rollups(client)
         if "password" in update_data and update_data["password"]:
             client.password_hash = get_password_hash(update_data["password"])
             update_data.pop("password")
         for field, value in update_data.items():
             setattr(client, field, value)
+        self._update_rollups(rollups_before, client)
+        if SEARCH_FIELDS & update_data.keys():
+            self.search.refresh_client(client.id)
         self.db.commit()
         self.db.refresh(client)
-        cache.invalidate("clients")
-        cache.invalidate("dashboard")
+        # client:<id> alcança também as listagens de projetos e o dashboard que exibem o cliente
+        tags = ["clients:all", f"client:{client.id}"]
+        if "is_active" in update_data:
+            tags.append("dashboard:clients")
+        cache.invalidate(*tags)
         return self.serialize_client(client)
 
     def delete_client(self, client_id: str) -> Dict[str, str]:
         client = self.db.get(Client, client_id)
         if not client:
             raise HTTPException(status_code=404, detail="Cliente não foi encontrado")
+        rollups_before = self.rollups.client_rollups(client)
         client.is_active = False  # Soft delete
+        self._update_rollups(rollups_before, client)
         self.db.commit()
-        cache.invalidate("clients")
-        cache.invalidate("dashboard")
+        cache.invalidate("clients:all", f"client:{client.id}", "dashboard:clients")
         return {"message": "Cliente desativado com sucesso"}
 
     def reset_client_password(self, client_id: str) -> Dict[str, str]:
@@ -0,0 +1,186 @@
+from sqlalchemy import and_, func, or_, text
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, Tuple
+import logging
+import sys
+
+from ..models import Client, DashboardRollup, Project, Stage
+
+# (métrica, bucket) -> (quantidade, valor)
+Rollups = Dict[Tuple[str, str], Tuple[int, Decimal]]
+
+PROJECT_STATUS = "project_status"
+COMPLETED_REVENUE = "completed_revenue"
+OPEN_STAGES_DUE = "open_stages_due"
+ACTIVE_CLIENTS = "active_clients"
+
+
+def _add(rollups: Rollups, key: Tuple[str, str], count: int, amount=0) -> None:
+    current_count, current_amount = rollups.get(key, (0, Decimal(0)))
+    rollups[key] = (current_count + count, current_amount + Decimal(amount or 0))
+
+
+def _status(value) -> str:
+    return getattr(value, "value", value)
+
+
+class DashboardRollups:
+    """
+    Tabela dashboard_rollups com os contadores do dashboard, para que ele não agregue as tabelas inteiras:
+    projetos por status, projetos finalizados e receita por dia de término, etapas não concluídas por dia
+    de prazo e clientes ativos. Os services calculam a contribuição da entidade antes e depois da escrita
+    e aplicam a diferença na mesma transação (apply), então a tabela acompanha cada commit.
+
+    Escritas feitas fora dos services (SQL manual, scripts) não passam por aqui: `check` compara a tabela
+    com um recálculo completo e `rebuild` a refaz, via `python -m app.services.dashboard_rollups`.
+    """
+
+    def __init__(self, db: Session) -> None:
+        self.db = db
+        self.logger = logging.getLogger(__name__)
+
+    def project_rollups(self, project_id) -> Rollups:
+        """Contribuição atual de um projeto e das suas etapas (vazia se o projeto não existe)"""
+        rollups: Rollups = {}
+        project = self.db.query(Project.status, Project.actual_end_date, Project.total_value).filter(
+            Project.id == project_id
+        ).first()
+        if project is None:
+            return rollups
+        _add(rollups, (PROJECT_STATUS, _status(project.status)), 1)
+        if _status(project.status) == "completed" and project.actual_end_date:
+            _add(rollups, (COMPLETED_REVENUE, project.actual_end_date.isoformat()), 1, project.total_value)
+        stages = self.db.query(Stage.planned_end_date).filter(
+            Stage.project_id == project_id, Stage.status != "completed"
+        ).all()
+        for stage in stages:
+            _add(rollups, (OPEN_STAGES_DUE, stage.planned_end_date.isoformat()), 1)
+        return rollups
+
+    @staticmethod
+    def client_rollups(client) -> Rollups:
+        return {(ACTIVE_CLIENTS, ""): (1, Decimal(0))} if client is not None and client.is_active else {}
+
+    def apply(self, before: Rollups, after: Rollups) -> None:
+        """
+        Soma à tabela a diferença entre as contribuições antes e depois da escrita. Deve ser chamado depois
+        do flush e antes do commit da própria escrita. As chaves são atualizadas sempre na mesma ordem, para
+        que escritas concorrentes esperem umas pelas outras em vez de entrar em deadlock.
+        """
+        for metric, bucket in sorted(set(before) | set(after)):
+            count_before, amount_before = before.get((metric, bucket), (0, Decimal(0)))
+            count_after, amount_after = after.get((metric, bucket), (0, Decimal(0)))
+            count, amount = count_after - count_before, amount_after - amount_before
+            if not count and not amount:
+                continue
+            self.db.execute(
+                pg_insert(DashboardRollup)
+                .values(metric=metric, bucket=bucket, count=count, amount=amount)
+                .on_conflict_do_update(
+                    index_elements=[DashboardRollup.metric, DashboardRollup.bucket],
+                    set_={"count": DashboardRollup.count + count, "amount": DashboardRollup.amount + amount}
+                )
+            )
+
+    def load(self, revenue_since: date, revenue_until: date, due_from: date, due_to: date) -> Rollups:
+        """
+        Contadores usados pelo dashboard numa única leitura pela chave primária: status e clientes ativos,
+        receita com término em [revenue_since, revenue_until) e etapas com prazo em [due_from, due_to]
+        """
+        rows = self.db.query(DashboardRollup).filter(or_(
+            DashboardRollup.metric.in_([PROJECT_STATUS, ACTIVE_CLIENTS]),
+            and_(
+                DashboardRollup.metric == COMPLETED_REVENUE,
+                DashboardRollup.bucket >= revenue_since.isoformat(),
+                DashboardRollup.bucket < revenue_until.isoformat()
+            ),
+            and_(
+                DashboardRollup.metric == OPEN_STAGES_DUE,
+                DashboardRollup.bucket >= due_from.isoformat(),
+                DashboardRollup.bucket <= due_to.isoformat()
+            ),
+        )).all()
+        return {(row.metric, row.bucket): (row.count, row.amount) for row in rows}
+
+    def compute(self) -> Rollups:
+        """Recálculo completo dos contadores a partir de projects, stages e clients"""
+        rollups: Rollups = {}
+        for status, count in self.db.query(Project.status, func.count()).group_by(Project.status).all():
+            _add(rollups, (PROJECT_STATUS, _status(status)), count)
+        revenue = self.db.query(Project.actual_end_date, func.count(), func.sum(Project.total_value)).filter(
+            Project.status == "completed", Project.actual_end_date.isnot(None)
+        ).group_by(Project.actual_end_date).all()
+        for day, count, amount in revenue:
+            _add(rollups, (COMPLETED_REVENUE, day.isoformat()), count, amount)
+        due = self.db.query(Stage.planned_end_date, func.count()).filter(
+            Stage.status != "completed"
+        ).group_by(Stage.planned_end_date).all()
+        for day, count in due:
+            _add(rollups, (OPEN_STAGES_DUE, day.isoformat()), count)
+        active_clients = self.db.query(func.count()).select_from(Client).filter(Client.is_active == True).scalar()
+        if active_clients:
+            _add(rollups, (ACTIVE_CLIENTS, ""), active_clients)
+        return rollups
+
+    def _stored(self) -> Rollups:
+        return {(row.metric, row.bucket): (row.count, row.amount) for row in self.db.query(DashboardRollup).all()}
+
+    @staticmethod
+    def _differences(stored: Rollups, expected: Rollups) -> Iterable[dict]:
+        zero = (0, Decimal(0))
+        for key in sorted(set(stored) | set(expected)):
+            if stored.get(key, zero) != expected.get(key, zero):
+                yield {
+                    "metric": key[0],
+                    "bucket": key[1],
+                    "stored": list(stored.get(key, zero)),
+                    "expected": list(expected.get(key, zero)),
+                }
+
+    def check(self) -> dict:
+        """Compara a tabela com um recálculo completo; buckets zerados equivalem a buckets ausentes"""
+        # Tabela e recálculo lidos no mesmo snapshot, para que escritas concorrentes não apareçam como divergência
+        if not self.db.in_transaction():
+            self.db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        differences = list(self._differences(self._stored(), self.compute()))
+        result = {"consistent": not differences, "differences": differences}
+        if differences:
+            self.logger.warning(f"dashboard_rollups divergente do recálculo em {len(differences)} buckets")
+        return result
+
+    def rebuild(self) -> dict:
+        """Refaz a tabela a partir do recálculo completo"""
+        # EXCLUSIVE: escritas em andamento terminam antes (e entram no recálculo) e as seguintes esperam o
+        # commit da reconstrução para somar as suas diferenças
+        self.db.execute(text("LOCK TABLE dashboard_rollups IN EXCLUSIVE MODE"))
+        rollups = self.compute()
+        self.db.query(DashboardRollup).delete()
+        if rollups:
+            self.db.execute(pg_insert(DashboardRollup).values([
+                {"metric": metric, "bucket": bucket, "count": count, "amount": amount}
+                for (metric, bucket), (count, amount) in rollups.items()
+            ]))
+        self.db.commit()
+        result = {"message": "Rollups do dashboard reconstruídos", "buckets": len(rollups)}
+        self.logger.info(f"{result}")
+        return result
+
+
+if __name__ == "__main__":
+    from ..core.database import SessionLocal
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    if command not in ("check", "rebuild"):
+        sys.exit("uso: python -m app.services.dashboard_rollups [check|rebuild]")
+    db = SessionLocal()
+    try:
+        rollups = DashboardRollups(db)
+        result = rollups.rebuild() if command == "rebuild" else rollups.check()
+        print(result)
+        if command == "check" and not result["consistent"]:
+            sys.exit(1)
+    finally:
+        db.close()
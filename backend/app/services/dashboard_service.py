@@ -1,45 +1,88 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import DateTime, cast, func, select, true, union
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from ..core.config import settings
 from ..models import Client, Project, Stage
+from ..models.project import project_clients
 from ..utils.cache import cache
+from .dashboard_rollups import ACTIVE_CLIENTS, COMPLETED_REVENUE, OPEN_STAGES_DUE, PROJECT_STATUS, DashboardRollups
 import logging
 
-def get_dashboard_service(db: Session):
-    logger = logging.getLogger(__name__)
-    cache_key = "dashboard"
-    cached = cache.get(cache_key, {})
-    if cached:
-        logger.info(f"[CACHE] get_dashboard_service: params={{}}")
-        return cached
-    logger.info(f"[DB] get_dashboard_service: params={{}}")
-    now = datetime.now(timezone.utc)
-    first_day_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    last_6_months = [(now.replace(day=1) - timedelta(days=30*i)) for i in range(6)]
-    months = [(d.month, d.year) for d in reversed(last_6_months)]
+STATUS_LIST = ["active", "paused", "completed", "cancelled", "draft"]
 
-    # Total de clientes ativos
-    total_clients = db.query(func.count()).select_from(Client).filter(Client.is_active == True).scalar()
 
-    # Projetos ativos
-    active_projects = db.query(func.count()).select_from(Project).filter(Project.status == "active").scalar()
+class DashboardScope:
+    """
+    Recorte do dashboard: os projetos de um cliente, ou os de um usuário (criados por ele ou com alguma
+    etapa atribuída a ele). As seções recebem o recorte e filtram as mesmas consultas agregadas por ele.
+    """
 
-    # Projetos finalizados no mês atual
-    completed_projects_this_month = db.query(func.count()).select_from(Project).filter(
-        Project.status == "completed",
-        Project.actual_end_date >= first_day_month,
-        Project.actual_end_date < now.replace(day=now.day+1)
-    ).scalar()
+    def __init__(self, kind: str, actor_id) -> None:
+        self.kind = kind
+        self.actor_id = str(actor_id)
+
+    @classmethod
+    def for_actor(cls, actor) -> "DashboardScope":
+        return cls("client", actor.id) if isinstance(actor, Client) else cls("user", actor.id)
+
+    @property
+    def key(self) -> str:
+        return f"{self.kind}:{self.actor_id}"
+
+    def project_ids(self):
+        if self.kind == "client":
+            return select(project_clients.c.project_id).where(project_clients.c.client_id == self.actor_id)
+        return union(
+            select(Project.id).where(Project.created_by_id == self.actor_id),
+            select(Stage.project_id).where(Stage.assigned_to_id == self.actor_id)
+        )
+
+    def tags(self, db: Session) -> List[str]:
+        """
+        Tags da entrada do recorte: cada projeto e cliente exibido (project:<id>, client:<id>) e a tag de
+        pertencimento (projects:client:<id> ou projects:user:<id>), invalidada quando um projeto entra ou sai.
+        Recortes com mais de DASHBOARD_SCOPE_MAX_TAGS projetos usam projects:all e clients:all.
+        """
+        limit = settings.DASHBOARD_SCOPE_MAX_TAGS
+        project_ids = [row[0] for row in db.execute(self.project_ids().limit(limit + 1)).all()]
+        if len(project_ids) > limit:
+            return [f"projects:{self.key}", "projects:all", "clients:all"]
+        client_ids = db.query(project_clients.c.client_id).filter(
+            project_clients.c.project_id.in_(project_ids)
+        ).distinct().all() if project_ids else []
+        tags = [f"projects:{self.key}"]
+        tags += sorted(f"project:{project_id}" for project_id in set(project_ids))
+        tags += sorted(f"client:{client_id}" for client_id, in client_ids)
+        return tags
+
+
+def _in_scope(column, scope: Optional[DashboardScope]):
+    return column.in_(scope.project_ids()) if scope else true()
 
-    # Receita do mês atual
-    month_revenue = db.query(func.coalesce(func.sum(Project.total_value), 0)).filter(
-        Project.status == "completed",
-        Project.actual_end_date >= first_day_month,
-        Project.actual_end_date < now.replace(day=now.day+1)
-    ).scalar()
 
-    # 5 projetos mais recentes
-    recent_projects = db.query(Project).order_by(Project.created_at.desc()).limit(5).all()
+def _clients_section(db: Session, now: datetime, scope: Optional[DashboardScope] = None):
+    # Total de clientes ativos (no recorte, os clientes dos projetos dele)
+    if scope:
+        total_clients = db.query(func.count(func.distinct(Client.id))).join(
+            project_clients, project_clients.c.client_id == Client.id
+        ).filter(Client.is_active == True, _in_scope(project_clients.c.project_id, scope)).scalar()
+    else:
+        total_clients = db.query(func.count()).select_from(Client).filter(Client.is_active == True).scalar()
+    return {"total_clients": total_clients}, []
+
+
+def _recent_projects(db: Session, now: datetime, scope: Optional[DashboardScope] = None):
+    # 5 projetos mais recentes, com os clientes carregados numa consulta só (selectin)
+    recent_projects = (
+        db.query(Project)
+        .options(selectinload(Project.clients))
+        .filter(_in_scope(Project.id, scope))
+        # id desempata projetos criados no mesmo instante (ex.: importados em lote)
+        .order_by(Project.created_at.desc(), Project.id.desc())
+        .limit(5)
+        .all()
+    )
     recent_projects_serialized = [
         {
             "id": p.id,
@@ -60,50 +103,184 @@ def get_dashboard_service(db: Session):
             "client_name": p.clients[0].name if p.clients else None
         } for p in recent_projects
     ]
+    # A lista de recentes muda quando um desses projetos (ou o cliente exibido) é alterado
+    tags = [f"project:{p.id}" for p in recent_projects]
+    tags += [f"client:{p.clients[0].id}" for p in recent_projects if p.clients]
+    return {"recent_projects": recent_projects_serialized}, tags
+
+
+def _projects_section(db: Session, now: datetime, scope: Optional[DashboardScope] = None):
+    # Contagem de projetos por status, numa única consulta agrupada
+    counts = {
+        getattr(status, "value", status): count
+        for status, count in db.query(Project.status, func.count())
+        .filter(_in_scope(Project.id, scope)).group_by(Project.status).all()
+    }
+    projects_status_counts = {status: counts.get(status, 0) for status in STATUS_LIST}
+    recent, tags = _recent_projects(db, now, scope)
+
+    return {
+        "active_projects": projects_status_counts["active"],
+        **recent,
+        "projects_status_counts": projects_status_counts,
+    }, tags
+
+
+def _month_starts(today: date, count: int) -> List[date]:
+    """Primeiro dia de cada um dos últimos `count` meses do calendário, do mais antigo ao atual"""
+    months = []
+    year, month = today.year, today.month
+    for _ in range(count):
+        months.append(date(year, month, 1))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return list(reversed(months))
 
-    # Contagem de projetos por status
-    status_list = ["active", "paused", "completed", "cancelled", "draft"]
-    projects_status_counts = {}
-    for status in status_list:
-        count = db.query(func.count()).select_from(Project).filter(Project.status == status).scalar()
-        projects_status_counts[status] = count
 
-    # Receita dos últimos 6 meses
+def _revenue_series(months: List[date], values: Dict[date, object]) -> List[dict]:
     revenue_by_month = []
-    for month, year in months:
-        start = datetime(year, month, 1)
-        if month == 12:
-            end = datetime(year+1, 1, 1)
-        else:
-            end = datetime(year, month+1, 1)
-        value = db.query(func.coalesce(func.sum(Project.total_value), 0)).filter(
-            Project.status == "completed",
-            Project.actual_end_date >= start,
-            Project.actual_end_date < end
-        ).scalar()
+    for start in months:
+        value = values.get(start, 0)
         revenue_by_month.append({
             "month": start.strftime("%b"),
             "year": str(start.year)[-2:],
             "value": float(value) if value else 0
         })
+    return revenue_by_month
+
+
+def _revenue_section(db: Session, now: datetime, scope: Optional[DashboardScope] = None):
+    today = now.date()
+    tomorrow = today + timedelta(days=1)
+    months = _month_starts(today, 6)
+    next_month = (months[-1] + timedelta(days=31)).replace(day=1)
+
+    # Receita dos últimos 6 meses agrupada por mês; o mês atual também traz os totais até hoje
+    # (contagem e receita de projetos finalizados no mês), via agregados com FILTER
+    month = func.date_trunc("month", cast(Project.actual_end_date, DateTime)).label("month")
+    until_today = Project.actual_end_date < tomorrow
+    rows = db.query(
+        month,
+        func.coalesce(func.sum(Project.total_value), 0),
+        func.count().filter(until_today),
+        func.coalesce(func.sum(Project.total_value).filter(until_today), 0),
+    ).filter(
+        Project.status == "completed",
+        Project.actual_end_date >= months[0],
+        Project.actual_end_date < next_month,
+        _in_scope(Project.id, scope)
+    ).group_by(month).all()
+    by_month = {row[0].date(): row for row in rows}
+
+    current = by_month.get(months[-1])
+    month_revenue = current[3] if current else 0
+    return {
+        "completed_projects_this_month": current[2] if current else 0,
+        "month_revenue": float(month_revenue) if month_revenue else 0,
+        "revenue_by_month": _revenue_series(months, {start: row[1] for start, row in by_month.items()}),
+    }, []
+
 
+def _stages_section(db: Session, now: datetime, scope: Optional[DashboardScope] = None):
     # Etapas próximas do prazo (próximos 7 dias, não completadas)
     near_deadline = now + timedelta(days=7)
     stages_near_deadline = db.query(func.count()).select_from(Stage).filter(
         Stage.status != "completed",
         Stage.planned_end_date >= now.date(),
-        Stage.planned_end_date <= near_deadline.date()
+        Stage.planned_end_date <= near_deadline.date(),
+        _in_scope(Stage.project_id, scope)
     ).scalar()
+    return {"stages_near_deadline": stages_near_deadline}, []
+
+
+# Cada seção fica numa entrada própria do cache, marcada com a tag dashboard:<seção>, para que uma
+# escrita invalide só as seções que ela altera
+SECTIONS = {
+    "clients": _clients_section,
+    "projects": _projects_section,
+    "revenue": _revenue_section,
+    "stages": _stages_section,
+}
+
+
+def _cached_section(db: Session, now: datetime, section: str, build, tag: str = None):
+    logger = logging.getLogger(__name__)
+
+    def load():
+        logger.info(f"[DB] get_dashboard_service: params={{'section': '{section}'}}")
+        return build(db, now)
+
+    # Guardada como (dados, tags), já que as tags da seção dependem do resultado
+    data, _ = cache.get_or_compute(
+        "dashboard", {"section": section}, load, tags=lambda value: [f"dashboard:{tag or section}", *value[1]]
+    )
+    return data
+
+
+def _rollup_dashboard(db: Session, now: datetime):
+    """
+    Contadores lidos da tabela dashboard_rollups numa única consulta indexada, sem cache: o custo não
+    cresce com o número de projetos e o resultado acompanha cada commit
+    """
+    today = now.date()
+    months = _month_starts(today, 6)
+    next_month = (months[-1] + timedelta(days=31)).replace(day=1)
+    rollups = DashboardRollups(db).load(months[0], next_month, today, today + timedelta(days=7))
 
-    result = {
-        "total_clients": total_clients,
-        "active_projects": active_projects,
-        "completed_projects_this_month": completed_projects_this_month,
+    status_counts = {status: rollups.get((PROJECT_STATUS, status), (0, 0))[0] for status in STATUS_LIST}
+    revenue_by_month: Dict[date, object] = {}
+    completed_this_month = 0
+    month_revenue = 0
+    stages_near_deadline = 0
+    for (metric, bucket), (count, amount) in rollups.items():
+        if metric == COMPLETED_REVENUE:
+            day = date.fromisoformat(bucket)
+            month = day.replace(day=1)
+            revenue_by_month[month] = revenue_by_month.get(month, 0) + amount
+            if month == months[-1] and day <= today:
+                completed_this_month += count
+                month_revenue += amount
+        elif metric == OPEN_STAGES_DUE:
+            stages_near_deadline += count
+
+    # A lista de recentes continua vindo de projects (pelo índice de created_at), em cache
+    recent = _cached_section(db, now, "recent_projects", _recent_projects, tag="projects")
+    return {
+        "total_clients": rollups.get((ACTIVE_CLIENTS, ""), (0, 0))[0],
+        "active_projects": status_counts["active"],
+        "recent_projects": recent["recent_projects"],
+        "projects_status_counts": status_counts,
+        "completed_projects_this_month": completed_this_month,
         "month_revenue": float(month_revenue) if month_revenue else 0,
-        "recent_projects": recent_projects_serialized,
-        "projects_status_counts": projects_status_counts,
-        "revenue_by_month": revenue_by_month,
-        "stages_near_deadline": stages_near_deadline
+        "revenue_by_month": _revenue_series(months, revenue_by_month),
+        "stages_near_deadline": stages_near_deadline,
     }
-    cache.set(cache_key, {}, result)
+
+
+def get_dashboard_service(db: Session):
+    now = datetime.now(timezone.utc)
+    if settings.DASHBOARD_ROLLUPS:
+        return _rollup_dashboard(db, now)
+    result = {}
+    for section, build in SECTIONS.items():
+        result.update(_cached_section(db, now, section, build))
     return result
+
+
+def get_scoped_dashboard_service(db: Session, scope: DashboardScope):
+    """
+    Dashboard de um recorte, calculado pelas mesmas seções filtradas pelos projetos dele. Fica numa entrada
+    do cache por recorte, invalidada só por escritas nos seus projetos e clientes ou que mudam quais
+    projetos pertencem a ele.
+    """
+    logger = logging.getLogger(__name__)
+    now = datetime.now(timezone.utc)
+
+    def load():
+        logger.info(f"[DB] get_scoped_dashboard_service: scope={scope.key}")
+        result = {}
+        for build in SECTIONS.values():
+            result.update(build(db, now, scope)[0])
+        return result, scope.tags(db)
+
+    data, _ = cache.get_or_compute("dashboard", {"scope": scope.key}, load, tags=lambda value: value[1])
+    return data
@@ -1,23 +1,36 @@
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime, timezone, timedelta
 import os
 import re
-import time
 import hashlib
+import anyio
 from uuid import uuid4
 from ..core.config import settings
+from ..core.database import SessionLocal
 from ..models.file import File
-from ..models.chunked_upload import ChunkedUpload
+from ..models.chunked_upload import ChunkedUpload, ChunkedUploadChunk
 from ..schemas.file import FileCreate, FileCategory, FileUpdate, FileRead, PaginatedFiles, FileReadPublic
 from ..schemas.chunked_upload import (
     ChunkedUploadInitiate, ChunkedUploadResponse, ChunkUploadResponse,
     ChunkedUploadStatus, ChunkedUploadComplete
 )
-from fastapi import HTTPException, UploadFile
+from fastapi import BackgroundTasks, HTTPException
 from ..models.project import Project
-from ..utils.cache import cache
-from typing import List, Optional, Dict, Any
+from ..models.stage import Stage
+from ..utils.cache import cache, scope_tags, write_tags, EncodedJSON
+from ..utils.pagination import paginate
+from ..utils.search import matches, relevance
+from ..utils.rolling_hash import rolling_hashes
+from ..core.storage import storage
+from ..core.renditions import renditions
+from ..core.upload_limits import run_upload_io, release_connection
+from .blob_store import BlobStore
+from .search_index import SearchIndex
+from .video_rendition_service import VideoRenditionService
+from typing import AsyncIterable, AsyncIterator, Callable, List, Optional, Dict, Any, Tuple, Union
 import logging
 
 
@@ -25,11 +38,11 @@ class FileService:
     def __init__(self, db: Session) -> None:
         self.db = db
         self.logger = logging.getLogger(__name__)
-        self.temp_dir = os.path.join(settings.UPLOAD_DIR, "temp_chunks")
-        os.makedirs(self.temp_dir, exist_ok=True)
-        self.max_retries = 3
-        self.retry_delay = 0.5
+        self.storage = storage
+        self.temp_dir = "temp_chunks"
         self.chunk_timeout = settings.CHUNK_UPLOAD_TIMEOUT
+        self.blob_store = BlobStore(db)
+        self.search = SearchIndex(db)
 
     @staticmethod
     def sanitize_filename(name: str, max_length: int = 128) -> str:
@@ -69,26 +82,17 @@ class FileService:
             if mime_type in dangerous_mimes:
                 raise HTTPException(status_code=400, detail="Tipo de arquivo não permitido")
 
-    @staticmethod
-    def _ensure_within_upload_dir(path: str) -> str:
-        root = os.path.realpath(settings.UPLOAD_DIR)
-        real = os.path.realpath(path)
-        if not real.startswith(root + os.sep) and real != root:
-            raise HTTPException(status_code=400, detail="Caminho de arquivo inválido")
-        if os.path.islink(real):
-            raise HTTPException(status_code=400, detail="Links simbólicos não são permitidos")
-        return real
-
-    def _build_storage_path(self, original_name: str, category: FileCategory) -> tuple[str, str]:
+    def _chunk_path(self, upload_id: str, chunk_number: int) -> str:
+        return f"{self.temp_dir}/{upload_id}/chunk_{chunk_number:06d}"
+
+    def _chunk_reader(self, upload_id: str):
+        return lambda chunk_number: self.storage.open_range(self._chunk_path(upload_id, chunk_number))
+
+    def _build_stored_name(self, original_name: str) -> str:
         ext = os.path.splitext(original_name)[1].lower()
         if ext not in settings.ALLOWED_EXTENSIONS:
             raise HTTPException(status_code=400, detail="Tipo de arquivo não permitido.")
-        folder = os.path.join(settings.UPLOAD_DIR, category.value)
-        os.makedirs(folder, exist_ok=True)
-        stored_name = f"{uuid4().hex}{ext}"
-        path = os.path.join(folder, stored_name)
-        real = self._ensure_within_upload_dir(path)
-        return stored_name, real
+        return f"{uuid4().hex}{ext}"
 
     def save_file(self, file_data: FileCreate, file_bytes: bytes) -> File:
         if file_data.category not in FileCategory:
@@ -96,9 +100,8 @@ class FileService:
         if file_data.size > settings.MAX_FILE_SIZE:
             raise HTTPException(status_code=400, detail="O arquivo é muito grande.")
         safe_original = self.sanitize_filename(file_data.original_name)
-        stored_name, path = self._build_storage_path(safe_original, file_data.category)
-        with open(path, "wb") as f:
-            f.write(file_bytes)
+        stored_name = self._build_stored_name(safe_original)
+        content_hash, path, _ = self.blob_store.store_bytes(file_bytes)
         file = File(
             original_name=safe_original,
             stored_name=stored_name,
@@ -107,6 +110,7 @@ class FileService:
             mime_type=file_data.mime_type,
             category=file_data.category,
             description=file_data.description,
+            content_hash=content_hash,
             project_id=file_data.project_id,
             client_id=file_data.client_id,
             stage_id=file_data.stage_id,
@@ -115,14 +119,34 @@ class FileService:
             updated_at=datetime.now(timezone.utc)
         )
         self.db.add(file)
+        self.db.flush()
+        self.search.refresh("file", [file.id])
         self.db.commit()
         return file
 
-    def upload_file(self, file: UploadFile, file_data: FileCreate, actor, client_resource_permission) -> FileRead:
-        filename = file.filename or "unnamed"
-        mime_type = file.content_type or "application/octet-stream"
+    async def upload_file(self, filename: str, mime_type: str, chunks: AsyncIterable[bytes],
+                          file_data: Callable[[], FileCreate], actor, client_resource_permission) -> FileRead:
+        """
+        Grava o arquivo no blob store sem bloquear o event loop; validação e registro rodam em threads de upload.
+        `file_data` só é chamado depois de lido o corpo: no multipart os campos podem vir depois do arquivo.
+        """
         self._validate_file_type(filename, mime_type)
+        temp_path, content_hash, total = await self.blob_store.write_temp_async(chunks, settings.MAX_FILE_SIZE)
+        try:
+            prepared = await run_upload_io(
+                self._prepare_upload, filename, mime_type, file_data(), actor, client_resource_permission
+            )
+            return await run_upload_io(self._register_upload, prepared, temp_path, content_hash, total)
+        except BaseException:
+            with anyio.CancelScope(shield=True):
+                try:
+                    await run_upload_io(self.storage.delete, temp_path)
+                except Exception:
+                    pass
+            raise
 
+    def _prepare_upload(self, filename: str, mime_type: str, file_data: FileCreate, actor,
+                        client_resource_permission) -> FileCreate:
         if file_data.project_id:
             project = self.db.get(Project, file_data.project_id)
             if not project:
@@ -138,31 +162,12 @@ class FileService:
         safe_original = self.sanitize_filename(filename)
         file_data.original_name = safe_original
         file_data.mime_type = mime_type
+        file_data.stored_name = self._build_stored_name(safe_original)
+        return file_data
 
-        stored_name, dest_path = self._build_storage_path(safe_original, file_data.category)
-
-        total = 0
-        try:
-            with open(dest_path, "wb") as out:
-                while True:
-                    chunk = file.file.read(1024 * 1024)
-                    if not chunk:
-                        break
-                    total += len(chunk)
-                    if total > settings.MAX_FILE_SIZE:
-                        raise HTTPException(status_code=400, detail="O arquivo é muito grande.")
-                    out.write(chunk)
-        except Exception:
-            try:
-                if os.path.exists(dest_path):
-                    os.remove(dest_path)
-            except Exception:
-                pass
-            raise
-
+    def _register_upload(self, file_data: FileCreate, temp_path: str, content_hash: str, total: int) -> FileRead:
         file_data.size = total
-        file_data.stored_name = stored_name
-        file_data.path = dest_path
+        file_data.path = self.blob_store.store_temp(temp_path, content_hash, total)
 
         file_model = File(
             original_name=file_data.original_name,
@@ -172,6 +177,7 @@ class FileService:
             mime_type=file_data.mime_type,
             category=file_data.category,
             description=file_data.description,
+            content_hash=content_hash,
             project_id=file_data.project_id,
             client_id=file_data.client_id,
             stage_id=file_data.stage_id,
@@ -180,27 +186,46 @@ class FileService:
             updated_at=datetime.now(timezone.utc)
         )
         self.db.add(file_model)
+        self.db.flush()
+        self.search.refresh("file", [file_model.id])
         self.db.commit()
-        cache.invalidate("files")
-        cache.invalidate("dashboard")
+        cache.invalidate(*self._cache_tags(file_model))
+        renditions.schedule(file_model)
+        VideoRenditionService(self.db).schedule(file_model)
         return FileRead.model_validate(file_model, from_attributes=True)
 
     def delete_file(self, file_id: str) -> bool:
         file = self.db.get(File, file_id)
         if not file:
             return False
-        try:
-            file_path = str(file.path) if not isinstance(file.path, str) else file.path
-            real = self._ensure_within_upload_dir(file_path)
-            if os.path.exists(real):
-                os.remove(real)
-        except Exception:
-            pass
+        if file.content_hash:
+            self.blob_store.release(file.content_hash)
+        else:
+            self.blob_store.discard_path(str(file.path))
         self.db.delete(file)
+        self.search.refresh("file", [file.id])
         self.db.commit()
+        renditions.discard(file_id)
+        VideoRenditionService(self.db).discard(file_id)
         return True
 
-    def get_files(self, limit: int, offset: int, order_by: str, order_dir: str, original_name: Optional[str], category: Optional[str], project_id: Optional[str], client_id: Optional[str], stage_id: Optional[str], uploaded_by_id: Optional[str]) -> PaginatedFiles:
+    def _cache_tags(self, file_model: File) -> List[str]:
+        """
+        Tags a invalidar quando o arquivo entra, sai ou muda: as listagens de arquivos que podem contê-lo
+        e o projeto que o exibe (ProjectRead traz os arquivos do projeto e os ids dos arquivos de cada etapa)
+        """
+        tags = write_tags(
+            "files", project=file_model.project_id, client=file_model.client_id,
+            stage=file_model.stage_id, uploader=file_model.uploaded_by_id
+        )
+        project_ids = {file_model.project_id}
+        if file_model.stage_id:
+            stage = self.db.get(Stage, file_model.stage_id)
+            project_ids.add(stage.project_id if stage else None)
+        tags += [f"project:{project_id}" for project_id in project_ids if project_id]
+        return tags
+
+    def get_files(self, limit: int, offset: int, order_by: str, order_dir: str, original_name: Optional[str], category: Optional[str], project_id: Optional[str], client_id: Optional[str], stage_id: Optional[str], uploaded_by_id: Optional[str], encoded: bool = False, cursor: Optional[str] = None, count: Optional[str] = None) -> Union[PaginatedFiles, EncodedJSON]:
         cache_params = {
             "limit": limit,
             "offset": offset,
@@ -211,42 +236,45 @@ class FileService:
             "project_id": project_id,
             "client_id": client_id,
             "stage_id": stage_id,
-            "uploaded_by_id": uploaded_by_id
+            "uploaded_by_id": uploaded_by_id,
+            "cursor": cursor,
+            "count": count
         }
-        cached = cache.get("files", cache_params)
-        if cached:
-            self.logger.info(f"[CACHE] get_files: params={cache_params}")
-            return cached
-        self.logger.info(f"[DB] get_files: params={cache_params}")
-        from ..models.file import File as FileModel
-        query = self.db.query(FileModel)
-        if original_name:
-            query = query.filter(FileModel.original_name.ilike(f"%{original_name}%"))
-        if category:
-            query = query.filter(FileModel.category == category)
-        if project_id:
-            query = query.filter(FileModel.project_id == project_id)
-        if client_id:
-            query = query.filter(FileModel.client_id == client_id)
-        if stage_id:
-            query = query.filter(FileModel.stage_id == stage_id)
-        if uploaded_by_id:
-            query = query.filter(FileModel.uploaded_by_id == uploaded_by_id)
-        if hasattr(FileModel, order_by):
-            order_col = getattr(FileModel, order_by)
-            order_col = order_col.desc() if order_dir == "desc" else order_col.asc()
-            query = query.order_by(order_col)
-        total = query.count()
-        items = query.offset(offset).limit(limit).all()
-        result = PaginatedFiles(
-            total=total,
-            count=len(items),
-            offset=offset,
-            limit=limit,
-            items=[FileRead.model_validate(f, from_attributes=True) for f in items]
-        )
-        cache.set("files", cache_params, result)
-        return result
+
+        def load() -> PaginatedFiles:
+            self.logger.info(f"[DB] get_files: params={cache_params}")
+            from ..models.file import File as FileModel
+            query = self.db.query(FileModel)
+            if original_name:
+                query = query.filter(matches(original_name, FileModel.original_name))
+            if category:
+                query = query.filter(FileModel.category == category)
+            if project_id:
+                query = query.filter(FileModel.project_id == project_id)
+            if client_id:
+                query = query.filter(FileModel.client_id == client_id)
+            if stage_id:
+                query = query.filter(FileModel.stage_id == stage_id)
+            if uploaded_by_id:
+                query = query.filter(FileModel.uploaded_by_id == uploaded_by_id)
+            items, total, next_cursor = paginate(
+                query, FileModel, limit, offset, order_by, order_dir, cursor, count=count,
+                count_cache=("files", cache_params, tags),
+                rank=relevance(original_name, FileModel.original_name) if original_name else None
+            )
+            return PaginatedFiles(
+                total=total,
+                count=len(items),
+                offset=None if cursor else offset,
+                limit=limit,
+                items=[FileRead.model_validate(f, from_attributes=True) for f in items],
+                next_cursor=next_cursor
+            )
+
+        tags = scope_tags("files", project=project_id, client=client_id, stage=stage_id, uploader=uploaded_by_id)
+        if encoded:
+            return cache.get_or_compute_json("files", cache_params, load, tags=tags)
+        return cache.get_or_compute("files", cache_params, load, tags=tags)
 
     def get_files_by_project(self, project_id: str, client_resource_permission, actor) -> List[FileReadPublic]:
         project = self.db.get(Project, project_id)
@@ -325,13 +353,15 @@ class FileService:
         if not file:
             raise HTTPException(status_code=404, detail="Arquivo não encontrado")
         update_data = file_data.model_dump(exclude_unset=True)
+        tags = self._cache_tags(file)
         for field, value in update_data.items():
             setattr(file, field, value)
         file.updated_at = datetime.now(timezone.utc)
+        if "original_name" in update_data:
+            self.search.refresh("file", [file.id])
         self.db.commit()
         self.db.refresh(file)
-        cache.invalidate("files")
-        cache.invalidate("dashboard")
+        cache.invalidate(*tags, *self._cache_tags(file))
         return FileRead.model_validate(file, from_attributes=True)
 
     def delete_file_api(self, file_id: str) -> Dict[str, str]:
@@ -339,13 +369,18 @@ class FileService:
         file = self.db.get(FileModel, file_id)
         if not file:
             raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+        tags = self._cache_tags(file)
         success = self.delete_file(file_id)
         if not success:
             raise HTTPException(status_code=500, detail="Erro ao remover arquivo")
-        cache.invalidate("files")
-        cache.invalidate("dashboard")
+        cache.invalidate(*tags)
         return {"message": "Arquivo removido com sucesso"}
 
+    def deduplicate_storage(self) -> dict:
+        result = self.blob_store.deduplicate_existing()
+        cache.invalidate("files")
+        return result
+
     def initiate_upload(self, upload_data: ChunkedUploadInitiate, actor) -> ChunkedUploadResponse:
         self.logger.info(f"Iniciando upload chunked: {upload_data.filename}, {upload_data.total_chunks} chunks")
 
@@ -374,13 +409,6 @@ class FileService:
         upload_id = f"{uuid4().hex}_{int(datetime.now(timezone.utc).timestamp())}"
         expires_at = datetime.now(timezone.utc) + timedelta(hours=settings.CHUNKED_UPLOAD_EXPIRY_HOURS)
 
-        chunk_dir = os.path.join(self.temp_dir, upload_id)
-        try:
-            os.makedirs(chunk_dir, exist_ok=True)
-        except OSError as e:
-            self.logger.error(f"Erro ao criar diretório de chunks: {e}")
-            raise HTTPException(status_code=500, detail="Erro interno do servidor")
-
         try:
             chunked_upload = ChunkedUpload(
                 upload_id=upload_id,
@@ -396,12 +424,12 @@ class FileService:
                 stage_id=upload_data.stage_id,
                 description=upload_data.description,
                 uploaded_by_id=actor.id,
-                expires_at=expires_at,
-                uploaded_chunks=""
+                expires_at=expires_at
             )
 
             self.db.add(chunked_upload)
             self.db.commit()
+            rolling_hashes.get(upload_id)
 
             self.logger.info(f"Upload iniciado com sucesso: {upload_id}")
 
@@ -414,184 +442,163 @@ class FileService:
         except SQLAlchemyError as e:
             self.db.rollback()
             self.logger.error(f"Erro ao criar upload no banco: {e}")
-            try:
-                if os.path.exists(chunk_dir):
-                    os.rmdir(chunk_dir)
-            except:
-                pass
             raise HTTPException(status_code=500, detail="Erro ao iniciar upload")
 
-    def upload_chunk(self, upload_id: str, chunk_number: int, chunk_file: UploadFile) -> ChunkUploadResponse:
-        start_time = time.time()
+    async def upload_chunk(self, upload_id: str, chunk_number: int, chunks: AsyncIterable[bytes],
+                           checksum: Union[str, Callable[[], Optional[str]], None] = None) -> ChunkUploadResponse:
+        """
+        Recebe um chunk gravando o corpo direto no storage sem bloquear o event loop. Consultas ao banco
+        e o hash de cada bloco rodam no pool de threads de upload; falhas são devolvidas ao cliente,
+        que reenvia o chunk (não há espera com sleep dentro do servidor). `checksum` pode ser uma função,
+        chamada depois de lido o corpo (campo multipart enviado depois do chunk).
+        """
         self.logger.debug(f"Iniciando upload chunk {chunk_number} para upload {upload_id}")
 
-        for attempt in range(self.max_retries):
-            try:
-                if time.time() - start_time > self.chunk_timeout:
-                    raise HTTPException(status_code=408, detail="Timeout no upload do chunk")
-
-                result = self._upload_chunk_attempt(upload_id, chunk_number, chunk_file, attempt)
-                self.logger.debug(f"Chunk {chunk_number} enviado com sucesso (tentativa {attempt + 1})")
-                return result
-
-            except HTTPException as e:
-                self.logger.error(f"Erro HTTP no chunk {chunk_number}: {e.detail}")
-                raise
-            except Exception as e:
-                self.logger.warning(f"Tentativa {attempt + 1} falhou para chunk {chunk_number}: {e}")
-                if attempt == self.max_retries - 1:
-                    self.logger.error(f"Todas as tentativas falharam para chunk {chunk_number}: {e}")
-                    raise HTTPException(status_code=500, detail=f"Erro ao salvar chunk após {self.max_retries} tentativas")
-
-                delay = self.retry_delay * (2 ** attempt) + (time.time() % 1) * 0.1
-                time.sleep(delay)
-
-    def _upload_chunk_attempt(self, upload_id: str, chunk_number: int, chunk_file: UploadFile, attempt: int) -> ChunkUploadResponse:
-        chunk_file.file.seek(0)
+        upload, existing_response = await run_upload_io(self._check_chunk_upload, upload_id, chunk_number)
+        if existing_response:
+            return existing_response
+        # A conexão não fica presa enquanto o corpo chega; o registro do chunk abre outra
+        await release_connection(self.db)
+
+        chunk_path = self._chunk_path(upload_id, chunk_number)
+        # Nome temporário único por requisição: envios concorrentes do mesmo chunk nunca escrevem no mesmo arquivo
+        temp_chunk_path = f"{chunk_path}.tmp.{uuid4().hex}"
+
+        chunk_hash = hashlib.sha256()
+        # Se este for o próximo chunk da sequência, o SHA-256 do arquivo avança com os mesmos bytes
+        rolling = rolling_hashes.peek(upload_id)
+        file_hash = rolling.candidate(chunk_number) if rolling else None
+
+        def update_hashes(data: bytes) -> None:
+            chunk_hash.update(data)
+            if file_hash is not None:
+                file_hash.update(data)
+
+        async def hashed_chunk() -> AsyncIterator[bytes]:
+            size = 0
+            async for data in chunks:
+                size += len(data)
+                if size > settings.MAX_CHUNK_SIZE:
+                    raise HTTPException(status_code=400, detail=f"Chunk muito grande. Máximo: {settings.MAX_CHUNK_SIZE} bytes")
+                await run_upload_io(update_hashes, data)
+                yield data
 
         try:
-            upload = self.db.query(ChunkedUpload).filter(
-                ChunkedUpload.upload_id == upload_id
-            ).first()
-
-            if not upload:
-                raise HTTPException(status_code=404, detail="Upload não encontrado")
-
-            if upload.is_completed:
-                raise HTTPException(status_code=400, detail="Upload já foi completado")
-
-            if datetime.now(timezone.utc) > upload.expires_at:
-                self.logger.warning(f"Upload expirado: {upload_id}")
-                raise HTTPException(status_code=400, detail="Upload expirado")
-
-            if chunk_number < 1 or chunk_number > upload.total_chunks:
-                raise HTTPException(status_code=400, detail=f"Número do chunk inválido: {chunk_number}")
-
-            uploaded_chunks = self._parse_uploaded_chunks(upload.uploaded_chunks)
-            if chunk_number in uploaded_chunks:
-                self.logger.debug(f"Chunk {chunk_number} já foi enviado anteriormente")
-                return ChunkUploadResponse(
-                    chunk_number=chunk_number,
-                    received=True,
-                    upload_progress=len(uploaded_chunks) / upload.total_chunks * 100,
-                    uploaded_chunks=uploaded_chunks
+            try:
+                with anyio.fail_after(self.chunk_timeout):
+                    chunk_size = await self.storage.put_stream_async(temp_chunk_path, hashed_chunk())
+            except TimeoutError:
+                raise HTTPException(status_code=408, detail="Timeout no upload do chunk")
+
+            if chunk_size == 0:
+                raise HTTPException(status_code=400, detail="Chunk vazio recebido")
+
+            chunk_digest = chunk_hash.hexdigest()
+            if callable(checksum):
+                checksum = checksum()
+            if checksum and checksum.lower() != chunk_digest:
+                self.logger.warning(f"Checksum inválido no chunk {chunk_number} do upload {upload_id}")
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Checksum do chunk {chunk_number} inválido. Esperado: {checksum}, Calculado: {chunk_digest}"
                 )
+        except BaseException:
+            with anyio.CancelScope(shield=True):
+                try:
+                    await run_upload_io(self.storage.delete, temp_chunk_path)
+                except Exception:
+                    pass
+            raise
 
-            chunk_dir = os.path.join(self.temp_dir, upload_id)
-            chunk_path = os.path.join(chunk_dir, f"chunk_{chunk_number:06d}")
-            chunk_lock_path = f"{chunk_path}.lock"
-            temp_chunk_path = f"{chunk_path}.tmp.{attempt}"
-
-            if os.path.exists(chunk_lock_path):
-                lock_age = time.time() - os.path.getmtime(chunk_lock_path)
-                if lock_age < 30:
-                    raise Exception(f"Chunk {chunk_number} está sendo processado por outra operação")
-                else:
-                    try:
-                        os.remove(chunk_lock_path)
-                    except:
-                        pass
+        return await run_upload_io(
+            self._record_chunk, upload, chunk_number, temp_chunk_path, chunk_size, chunk_digest, rolling, file_hash
+        )
 
-            try:
-                with open(chunk_lock_path, 'w') as lock_file:
-                    lock_file.write(str(os.getpid()))
-            except:
-                raise Exception(f"Não foi possível criar lock para chunk {chunk_number}")
+    def _check_chunk_upload(self, upload_id: str, chunk_number: int) -> Tuple[ChunkedUpload, Optional[ChunkUploadResponse]]:
+        upload = self.db.query(ChunkedUpload).filter(
+            ChunkedUpload.upload_id == upload_id
+        ).first()
 
-            try:
-                chunk_size = 0
-                chunk_hash = hashlib.md5()
+        if not upload:
+            raise HTTPException(status_code=404, detail="Upload não encontrado")
 
-                try:
-                    with open(temp_chunk_path, "wb") as f:
-                        while True:
-                            data = chunk_file.file.read(8192)
-                            if not data:
-                                break
-                            chunk_size += len(data)
-                            chunk_hash.update(data)
-                            f.write(data)
-
-                    if chunk_size == 0:
-                        raise Exception("Chunk vazio recebido")
-
-                    if chunk_size > settings.MAX_CHUNK_SIZE:
-                        raise Exception(f"Chunk muito grande: {chunk_size} bytes")
-
-                    if os.path.exists(chunk_path):
-                        with open(chunk_path, "rb") as existing_file:
-                            existing_hash = hashlib.md5()
-                            while True:
-                                data = existing_file.read(8192)
-                                if not data:
-                                    break
-                                existing_hash.update(data)
-
-                        if existing_hash.hexdigest() == chunk_hash.hexdigest():
-                            os.remove(temp_chunk_path)
-                            self.logger.debug(f"Chunk {chunk_number} idêntico já existe")
-                        else:
-                            os.replace(temp_chunk_path, chunk_path)
-                            self.logger.debug(f"Chunk {chunk_number} substituído (hash diferente)")
-                    else:
-                        os.replace(temp_chunk_path, chunk_path)
+        if upload.is_completed:
+            raise HTTPException(status_code=400, detail="Upload já foi completado")
 
-                except Exception as e:
-                    try:
-                        if os.path.exists(temp_chunk_path):
-                            os.remove(temp_chunk_path)
-                    except:
-                        pass
-                    raise e
-
-                max_db_retries = 3
-                for db_attempt in range(max_db_retries):
-                    try:
-                        self.db.refresh(upload)
-                        current_uploaded_chunks = self._parse_uploaded_chunks(upload.uploaded_chunks)
-
-                        if chunk_number not in current_uploaded_chunks:
-                            current_uploaded_chunks.append(chunk_number)
-                            current_uploaded_chunks.sort()
-                            upload.uploaded_chunks = ",".join(map(str, current_uploaded_chunks))
-                            upload.updated_at = datetime.now(timezone.utc)
-
-                        self.db.commit()
-
-                        progress = len(current_uploaded_chunks) / upload.total_chunks * 100
-                        self.logger.debug(f"Chunk {chunk_number} salvo. Progresso: {progress:.1f}%")
-
-                        return ChunkUploadResponse(
-                            chunk_number=chunk_number,
-                            received=True,
-                            upload_progress=progress,
-                            uploaded_chunks=current_uploaded_chunks
-                        )
-
-                    except SQLAlchemyError as e:
-                        self.db.rollback()
-                        if db_attempt == max_db_retries - 1:
-                            try:
-                                if os.path.exists(chunk_path):
-                                    os.remove(chunk_path)
-                            except:
-                                pass
-                            raise Exception(f"Erro ao atualizar banco após {max_db_retries} tentativas: {e}")
-
-                        time.sleep(0.1 * (db_attempt + 1))
-
-            finally:
-                try:
-                    if os.path.exists(chunk_lock_path):
-                        os.remove(chunk_lock_path)
-                except:
-                    pass
+        if upload.status == "assembling":
+            raise HTTPException(status_code=409, detail="Upload em montagem, chunks não podem mais ser alterados")
+
+        if datetime.now(timezone.utc) > upload.expires_at:
+            self.logger.warning(f"Upload expirado: {upload_id}")
+            raise HTTPException(status_code=400, detail="Upload expirado")
+
+        if chunk_number < 1 or chunk_number > upload.total_chunks:
+            raise HTTPException(status_code=400, detail=f"Número do chunk inválido: {chunk_number}")
+
+        existing_chunk = self.db.get(ChunkedUploadChunk, (upload.id, chunk_number))
+        if existing_chunk:
+            self.logger.debug(f"Chunk {chunk_number} já foi enviado anteriormente")
+            return upload, self._chunk_response(upload, chunk_number, existing_chunk.sha256)
+        return upload, None
+
+    def _chunk_response(self, upload: ChunkedUpload, chunk_number: int, checksum: Optional[str]) -> ChunkUploadResponse:
+        uploaded_chunks = self._received_chunks(upload)
+        return ChunkUploadResponse(
+            chunk_number=chunk_number,
+            received=True,
+            upload_progress=len(uploaded_chunks) / upload.total_chunks * 100,
+            uploaded_chunks=uploaded_chunks,
+            checksum=checksum
+        )
 
-        except SQLAlchemyError as e:
+    def _record_chunk(self, upload: ChunkedUpload, chunk_number: int, temp_chunk_path: str, chunk_size: int,
+                      chunk_digest: str, rolling, file_hash) -> ChunkUploadResponse:
+        chunk_path = self._chunk_path(upload.upload_id, chunk_number)
+        try:
+            # O primeiro envio registrado vence: o INSERT ... ON CONFLICT DO NOTHING só espera por outra
+            # transação do mesmo chunk, e o rename para o nome final acontece antes do commit
+            inserted = self.db.execute(
+                pg_insert(ChunkedUploadChunk)
+                .values(upload_id=upload.id, chunk_number=chunk_number, size=chunk_size, sha256=chunk_digest)
+                .on_conflict_do_nothing(index_elements=[ChunkedUploadChunk.upload_id, ChunkedUploadChunk.chunk_number])
+                .returning(ChunkedUploadChunk.chunk_number)
+            ).first()
+            if inserted:
+                self.storage.move(temp_chunk_path, chunk_path)
+            else:
+                self.storage.delete(temp_chunk_path)
+            self.db.commit()
+        except Exception as e:
             self.db.rollback()
-            raise Exception(f"Erro de banco de dados: {e}")
+            try:
+                self.storage.delete(temp_chunk_path)
+            except Exception:
+                pass
+            self.logger.error(f"Erro ao registrar chunk {chunk_number} do upload {upload.upload_id}: {e}")
+            raise HTTPException(status_code=500, detail="Erro ao salvar chunk")
 
-    def complete_upload(self, upload_id: str, actor, client_resource_permission) -> ChunkedUploadComplete:
+        if not inserted:
+            existing_chunk = self.db.get(ChunkedUploadChunk, (upload.id, chunk_number))
+            self.logger.debug(f"Chunk {chunk_number} recebido em paralelo por outra requisição")
+            return self._chunk_response(upload, chunk_number, existing_chunk.sha256 if existing_chunk else chunk_digest)
+
+        if rolling:
+            try:
+                rolling.advance(chunk_number, chunk_digest, file_hash)
+            except Exception as e:
+                self.logger.warning(f"Erro ao avançar hash incremental do upload {upload.upload_id}: {e}")
+                rolling_hashes.discard(upload.upload_id)
+
+        response = self._chunk_response(upload, chunk_number, chunk_digest)
+        self.logger.debug(f"Chunk {chunk_number} salvo. Progresso: {response.upload_progress:.1f}%")
+        return response
+
+    def complete_upload(self, upload_id: str, actor, client_resource_permission,
+                        background_tasks: Optional[BackgroundTasks] = None) -> ChunkedUploadComplete:
+        """
+        Valida os chunks e monta o arquivo final. Com background_tasks a montagem é agendada para depois
+        da resposta e o upload fica como "assembling"; o cliente acompanha por /status.
+        """
         self.logger.info(f"Iniciando finalização do upload: {upload_id}")
 
         upload = self.db.query(ChunkedUpload).filter(
@@ -609,41 +616,57 @@ class FileService:
                 message="Upload já foi completado"
             )
 
-        uploaded_chunks_db = self._parse_uploaded_chunks(upload.uploaded_chunks)
-        uploaded_chunks_disk = self._verify_chunks_on_disk(upload_id, upload.total_chunks)
-
-        verified_chunks = []
-        chunk_dir = os.path.join(self.temp_dir, upload.upload_id)
-
-        for chunk_num in uploaded_chunks_disk:
-            chunk_path = os.path.join(chunk_dir, f"chunk_{chunk_num:06d}")
-            try:
-                if os.path.exists(chunk_path) and os.path.getsize(chunk_path) > 0:
-                    verified_chunks.append(chunk_num)
-            except OSError:
-                self.logger.warning(f"Erro ao verificar chunk {chunk_num}")
-                continue
-
-        verified_chunks.sort()
-        expected_chunks = list(range(1, upload.total_chunks + 1))
-        missing_chunks = sorted(set(expected_chunks) - set(verified_chunks))
+        verified_chunks = self._reconcile_chunks(upload)
+        missing_chunks = self._missing_chunks(upload.total_chunks, verified_chunks)
 
         if missing_chunks:
-            try:
-                upload.uploaded_chunks = ",".join(map(str, verified_chunks))
-                self.db.commit()
-                self.logger.warning(f"Upload {upload_id} com chunks faltando: {missing_chunks}")
-            except SQLAlchemyError:
-                self.db.rollback()
+            self.logger.warning(f"Upload {upload_id} com chunks faltando: {missing_chunks}")
 
             raise HTTPException(
                 status_code=400,
                 detail=f"Chunks faltando: {missing_chunks}"
             )
 
+        # Reserva a montagem com um UPDATE condicional: só uma requisição monta o arquivo
+        now = datetime.now(timezone.utc)
+        stale_before = now - timedelta(minutes=settings.CHUNK_ASSEMBLY_STALE_MINUTES)
+        claimed = self.db.query(ChunkedUpload).filter(
+            ChunkedUpload.id == upload.id,
+            ChunkedUpload.is_completed == False,
+            or_(ChunkedUpload.status != "assembling", ChunkedUpload.updated_at < stale_before)
+        ).update({"status": "assembling", "error_message": None, "updated_at": now}, synchronize_session=False)
+        self.db.commit()
+
+        if not claimed:
+            return ChunkedUploadComplete(
+                upload_id=upload_id,
+                status="assembling",
+                message="Upload já está em montagem"
+            )
+
+        if background_tasks is not None:
+            background_tasks.add_task(assemble_upload_job, upload_id)
+            return ChunkedUploadComplete(
+                upload_id=upload_id,
+                status="assembling",
+                message="Montagem do arquivo iniciada"
+            )
+
+        return self.assemble_upload(upload_id)
+
+    def assemble_upload(self, upload_id: str) -> ChunkedUploadComplete:
+        """Monta o arquivo de um upload já reservado (status "assembling") e registra o resultado"""
+        upload = self.db.query(ChunkedUpload).filter(
+            ChunkedUpload.upload_id == upload_id
+        ).first()
+
+        if not upload:
+            raise HTTPException(status_code=404, detail="Upload não encontrado")
+
         try:
             final_file = self._merge_chunks(upload)
             upload.is_completed = True
+            upload.status = "completed"
             upload.final_file_id = final_file.id
             upload.updated_at = datetime.now(timezone.utc)
             self.db.commit()
@@ -653,8 +676,9 @@ class FileService:
             except Exception as e:
                 self.logger.warning(f"Erro ao limpar chunks: {e}")
 
-            cache.invalidate("files")
-            cache.invalidate("dashboard")
+            cache.invalidate(*self._cache_tags(final_file))
+            renditions.schedule(final_file)
+            VideoRenditionService(self.db).schedule(final_file)
 
             self.logger.info(f"Upload {upload_id} completado com sucesso. Arquivo: {final_file.id}")
 
@@ -667,28 +691,36 @@ class FileService:
         except Exception as e:
             self.db.rollback()
             self.logger.error(f"Erro ao finalizar upload {upload_id}: {e}")
-            raise HTTPException(status_code=500, detail=f"Erro ao finalizar upload: {str(e)}")
+            detail = e.detail if isinstance(e, HTTPException) else f"Erro ao finalizar upload: {str(e)}"
+            try:
+                self.db.query(ChunkedUpload).filter(ChunkedUpload.id == upload.id).update(
+                    {"status": "failed", "error_message": str(detail), "updated_at": datetime.now(timezone.utc)},
+                    synchronize_session=False
+                )
+                self.db.commit()
+            except SQLAlchemyError:
+                self.db.rollback()
+            if isinstance(e, HTTPException):
+                raise
+            raise HTTPException(status_code=500, detail=detail)
 
     def _verify_chunks_on_disk(self, upload_id: str, total_chunks: int) -> List[int]:
-        chunk_dir = os.path.join(self.temp_dir, upload_id)
         existing_chunks = []
 
-        if not os.path.exists(chunk_dir):
-            self.logger.warning(f"Diretório de chunks não existe: {chunk_dir}")
-            return existing_chunks
-
         try:
+            # Uma listagem por upload em vez de um stat por chunk (importante em storages remotos)
+            sizes = {obj.key.rsplit("/", 1)[-1]: obj.size for obj in self.storage.list(f"{self.temp_dir}/{upload_id}/")}
+            if not sizes:
+                self.logger.warning(f"Nenhum chunk armazenado para o upload: {upload_id}")
+                return existing_chunks
             for chunk_num in range(1, total_chunks + 1):
-                chunk_path = os.path.join(chunk_dir, f"chunk_{chunk_num:06d}")
-                if os.path.exists(chunk_path):
-                    try:
-                        size = os.path.getsize(chunk_path)
-                        if size > 0:
-                            existing_chunks.append(chunk_num)
-                        else:
-                            self.logger.warning(f"Chunk {chunk_num} está vazio")
-                    except OSError as e:
-                        self.logger.warning(f"Erro ao verificar chunk {chunk_num}: {e}")
+                size = sizes.get(f"chunk_{chunk_num:06d}")
+                if size is None:
+                    continue
+                if size > 0:
+                    existing_chunks.append(chunk_num)
+                else:
+                    self.logger.warning(f"Chunk {chunk_num} está vazio")
         except Exception as e:
             self.logger.error(f"Erro ao verificar chunks no disco: {e}")
 
@@ -705,18 +737,8 @@ class FileService:
         if upload.is_completed:
             raise HTTPException(status_code=400, detail="Upload já foi completado")
 
-        uploaded_chunks_db = self._parse_uploaded_chunks(upload.uploaded_chunks)
-        uploaded_chunks_disk = self._verify_chunks_on_disk(upload_id, upload.total_chunks)
-
-        verified_chunks = list(set(uploaded_chunks_db) & set(uploaded_chunks_disk))
-        verified_chunks.sort()
-
-        if set(verified_chunks) != set(uploaded_chunks_db):
-            upload.uploaded_chunks = ",".join(map(str, verified_chunks))
-            self.db.commit()
-
-        expected_chunks = list(range(1, upload.total_chunks + 1))
-        missing_chunks = sorted(set(expected_chunks) - set(verified_chunks))
+        verified_chunks = self._reconcile_chunks(upload)
+        missing_chunks = self._missing_chunks(upload.total_chunks, verified_chunks)
 
         progress = len(verified_chunks) / upload.total_chunks * 100
 
@@ -728,14 +750,14 @@ class FileService:
             missing_chunks=missing_chunks,
             progress=progress,
             is_completed=upload.is_completed,
+            status=upload.status,
+            error_message=upload.error_message,
             final_file_id=upload.final_file_id,
             created_at=upload.created_at,
             expires_at=upload.expires_at
         )
 
     def _merge_chunks(self, upload: ChunkedUpload) -> File:
-        import hashlib
-
         category = FileCategory.document
         if upload.category:
             try:
@@ -750,31 +772,44 @@ class FileService:
                 category = FileCategory.video
 
         safe_original = self.sanitize_filename(upload.filename)
-        stored_name, dest_path = self._build_storage_path(safe_original, category)
-
-        chunk_dir = os.path.join(self.temp_dir, upload.upload_id)
-        sha256_hash = hashlib.sha256()
-
-        with open(dest_path, "wb") as output_file:
-            for chunk_num in range(1, upload.total_chunks + 1):
-                chunk_path = os.path.join(chunk_dir, f"chunk_{chunk_num:06d}")
-                if not os.path.exists(chunk_path):
-                    raise HTTPException(status_code=500, detail=f"Chunk {chunk_num} não encontrado")
+        stored_name = self._build_stored_name(safe_original)
 
-                with open(chunk_path, "rb") as chunk_file:
-                    while True:
-                        data = chunk_file.read(8192)
-                        if not data:
-                            break
-                        output_file.write(data)
-                        sha256_hash.update(data)
+        available_chunks = set(self._verify_chunks_on_disk(upload.upload_id, upload.total_chunks))
+        for chunk_num in range(1, upload.total_chunks + 1):
+            if chunk_num not in available_chunks:
+                raise HTTPException(status_code=500, detail=f"Chunk {chunk_num} não encontrado")
 
+        known_checksum = self._incremental_checksum(upload)
+        if known_checksum:
+            if upload.file_checksum and known_checksum != upload.file_checksum:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Checksum inválido. Esperado: {upload.file_checksum}, Calculado: {known_checksum}"
+                )
+            # Conteúdo já armazenado: nem é preciso montar o arquivo. Se o tamanho do blob não bater com o
+            # declarado, segue para a montagem, que confere o tamanho real dos chunks
+            dest_path = self.blob_store.reference_existing(known_checksum, upload.total_size)
+            if dest_path:
+                return self._create_merged_file(upload, category, safe_original, stored_name, dest_path, known_checksum)
+
+        chunk_keys = [self._chunk_path(upload.upload_id, n) for n in range(1, upload.total_chunks + 1)]
+        temp_path, calculated_checksum, assembled_size = self.blob_store.assemble(
+            chunk_keys, settings.CHUNK_ASSEMBLY_WORKERS, sha256=known_checksum
+        )
+        if assembled_size != upload.total_size:
+            try:
+                self.storage.delete(temp_path)
+            except Exception:
+                pass
+            raise HTTPException(
+                status_code=400,
+                detail=f"Tamanho inválido. Esperado: {upload.total_size}, Recebido: {assembled_size}"
+            )
         if upload.file_checksum:
-            calculated_checksum = sha256_hash.hexdigest()
             if calculated_checksum != upload.file_checksum:
                 try:
-                    os.remove(dest_path)
-                except:
+                    self.storage.delete(temp_path)
+                except Exception:
                     pass
                 raise HTTPException(
                     status_code=400,
@@ -782,6 +817,27 @@ class FileService:
                 )
             self.logger.info(f"Checksum validado com sucesso para upload {upload.upload_id}")
 
+        dest_path = self.blob_store.store_temp(temp_path, calculated_checksum, upload.total_size)
+        return self._create_merged_file(upload, category, safe_original, stored_name, dest_path, calculated_checksum)
+
+    def _incremental_checksum(self, upload: ChunkedUpload) -> Optional[str]:
+        """SHA-256 do arquivo calculado durante o upload, se os digests dos chunks conferirem"""
+        rolling = rolling_hashes.peek(upload.upload_id)
+        if not rolling:
+            return None
+        chunks = self.db.query(ChunkedUploadChunk).filter(
+            ChunkedUploadChunk.upload_id == upload.id
+        ).order_by(ChunkedUploadChunk.chunk_number).all()
+        if [chunk.chunk_number for chunk in chunks] != list(range(1, upload.total_chunks + 1)):
+            return None
+        try:
+            return rolling.finalize([chunk.sha256 for chunk in chunks], self._chunk_reader(upload.upload_id))
+        except Exception as e:
+            self.logger.warning(f"Hash incremental indisponível para upload {upload.upload_id}: {e}")
+            return None
+
+    def _create_merged_file(self, upload: ChunkedUpload, category: FileCategory, safe_original: str,
+                            stored_name: str, dest_path: str, content_hash: str) -> File:
         file_model = File(
             original_name=safe_original,
             stored_name=stored_name,
@@ -790,6 +846,7 @@ class FileService:
             mime_type=upload.mime_type or "application/octet-stream",
             category=category,
             description=upload.description,
+            content_hash=content_hash,
             project_id=upload.project_id,
             client_id=upload.client_id,
             stage_id=upload.stage_id,
@@ -799,26 +856,47 @@ class FileService:
         )
 
         self.db.add(file_model)
+        self.db.flush()
+        self.search.refresh("file", [file_model.id])
         self.db.commit()
 
         return file_model
 
-    def _parse_uploaded_chunks(self, chunks_str: str) -> List[int]:
-        if not chunks_str:
-            return []
-        return [int(x) for x in chunks_str.split(",") if x.strip()]
+    def _received_chunks(self, upload: ChunkedUpload) -> List[int]:
+        rows = self.db.query(ChunkedUploadChunk.chunk_number).filter(
+            ChunkedUploadChunk.upload_id == upload.id
+        ).order_by(ChunkedUploadChunk.chunk_number).all()
+        return [row.chunk_number for row in rows]
+
+    @staticmethod
+    def _missing_chunks(total_chunks: int, received: List[int]) -> List[int]:
+        received_set = set(received)
+        return [n for n in range(1, total_chunks + 1) if n not in received_set]
+
+    def _reconcile_chunks(self, upload: ChunkedUpload) -> List[int]:
+        """Chunks registrados que também existem no storage; registros de chunks perdidos são removidos"""
+        recorded = self._received_chunks(upload)
+        on_disk = set(self._verify_chunks_on_disk(upload.upload_id, upload.total_chunks))
+        verified = [n for n in recorded if n in on_disk]
+        lost = [n for n in recorded if n not in on_disk]
+        if lost:
+            try:
+                self.db.query(ChunkedUploadChunk).filter(
+                    ChunkedUploadChunk.upload_id == upload.id,
+                    ChunkedUploadChunk.chunk_number.in_(lost)
+                ).delete(synchronize_session=False)
+                self.db.commit()
+            except SQLAlchemyError:
+                self.db.rollback()
+        return verified
 
-    def _cleanup_chunks(self, upload_id: str):
-        chunk_dir = os.path.join(self.temp_dir, upload_id)
+    def _cleanup_chunks(self, upload_id: str) -> int:
+        rolling_hashes.discard(upload_id)
         try:
-            if os.path.exists(chunk_dir):
-                for file in os.listdir(chunk_dir):
-                    file_path = os.path.join(chunk_dir, file)
-                    if os.path.isfile(file_path):
-                        os.remove(file_path)
-                os.rmdir(chunk_dir)
+            return self.storage.delete_prefix(f"{self.temp_dir}/{upload_id}/")
         except Exception as e:
             self.logger.error(f"Erro ao limpar chunks do upload {upload_id}: {e}")
+            return 0
 
     def cancel_upload(self, upload_id: str) -> dict:
         self.logger.info(f"Cancelando upload: {upload_id}")
@@ -854,14 +932,15 @@ class FileService:
         if not upload:
             raise HTTPException(status_code=404, detail="Upload não encontrado")
 
-        uploaded_chunks = self._parse_uploaded_chunks(upload.uploaded_chunks)
-        progress = len(uploaded_chunks) / upload.total_chunks * 100
-
-        chunks_on_disk = self._verify_chunks_on_disk(upload_id, upload.total_chunks)
-        verified_chunks = list(set(uploaded_chunks) & set(chunks_on_disk))
+        if upload.is_completed:
+            # Os chunks já foram removidos após a montagem
+            verified_chunks = list(range(1, upload.total_chunks + 1))
+        else:
+            uploaded_chunks = self._received_chunks(upload)
+            chunks_on_disk = set(self._verify_chunks_on_disk(upload_id, upload.total_chunks))
+            verified_chunks = [n for n in uploaded_chunks if n in chunks_on_disk]
 
-        expected_chunks = list(range(1, upload.total_chunks + 1))
-        missing_chunks = sorted(set(expected_chunks) - set(verified_chunks))
+        missing_chunks = self._missing_chunks(upload.total_chunks, verified_chunks)
 
         return ChunkedUploadStatus(
             upload_id=upload_id,
@@ -871,6 +950,8 @@ class FileService:
             missing_chunks=missing_chunks,
             progress=len(verified_chunks) / upload.total_chunks * 100,
             is_completed=upload.is_completed,
+            status=upload.status,
+            error_message=upload.error_message,
             final_file_id=upload.final_file_id,
             created_at=upload.created_at,
             expires_at=upload.expires_at
@@ -888,14 +969,7 @@ class FileService:
 
             for upload in expired_uploads:
                 try:
-                    chunk_dir = os.path.join(self.temp_dir, upload.upload_id)
-                    if os.path.exists(chunk_dir):
-                        for file in os.listdir(chunk_dir):
-                            file_path = os.path.join(chunk_dir, file)
-                            if os.path.isfile(file_path):
-                                total_size_cleaned += os.path.getsize(file_path)
-
-                    self._cleanup_chunks(upload.upload_id)
+                    total_size_cleaned += self._cleanup_chunks(upload.upload_id)
                     self.db.delete(upload)
                     cleaned_count += 1
                 except Exception as e:
@@ -919,3 +993,16 @@ class FileService:
             self.db.rollback()
             self.logger.error(f"Erro na limpeza de uploads expirados: {e}")
             raise HTTPException(status_code=500, detail="Erro na limpeza de uploads expirados")
+
+
+def assemble_upload_job(upload_id: str) -> None:
+    """Montagem em segundo plano (BackgroundTasks): usa sessão própria, o resultado fica no status do upload"""
+    db = SessionLocal()
+    try:
+        FileService(db).assemble_upload(upload_id)
+    except HTTPException:
+        pass
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Erro na montagem em segundo plano do upload {upload_id}: {e}")
+    finally:
+        db.close()
@@ -1,22 +1,59 @@
 from datetime import datetime, UTC
+from typing import Iterable, List
 import logging
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
 
-from ..models import Project, Client, Stage
+from ..models import Project, Client, Stage, Task
 from ..models.stage_type import StageType
 from ..models.project import project_clients
 from ..schemas.project import ProjectCreate, ProjectUpdate, PaginatedProjects, ProjectRead
 from ..schemas.stage import StageStatus
-from ..utils.cache import cache
+from ..core.config import settings
+from ..utils.cache import cache, scope_tags, write_tags
+from ..utils.pagination import paginate
+from ..utils.search import matches, relevance
+from .dashboard_rollups import DashboardRollups, Rollups
+from .search_index import SearchIndex
+
+# Campos que entram na receita do dashboard
+REVENUE_FIELDS = ("status", "total_value", "actual_end_date")
+
+
+def project_tags(project: ProjectRead) -> List[str]:
+    """Tags das entidades exibidas num ProjectRead: o projeto, seus clientes e os tipos das suas etapas"""
+    tags = [f"project:{project.id}"]
+    tags += [f"client:{client.id}" for client in project.clients]
+    tags += [f"stage_type:{stage.stage_type_id}" for stage in project.stages or []]
+    return tags
+
+
+def project_read_options() -> list:
+    """
+    Loaders de tudo que o ProjectRead serializa: clientes, arquivos e etapas (com tipo, arquivos e ids das
+    tarefas). Cada relação vem numa consulta IN (selectin), então uma página custa o mesmo número de
+    consultas com 1 ou 100 projetos. Para relações que chegam a projetos, use
+    selectinload(<relação>).options(*project_read_options()).
+    """
+    return [
+        selectinload(Project.clients),
+        selectinload(Project.files),
+        selectinload(Project.stages).options(
+            selectinload(Stage.stage_type),
+            selectinload(Stage.files),
+            selectinload(Stage.tasks).load_only(Task.id),
+        ),
+    ]
 
 
 class ProjectService:
     def __init__(self, db: Session) -> None:
         self.db = db
         self.logger = logging.getLogger(__name__)
+        self.rollups = DashboardRollups(db)
+        self.search = SearchIndex(db)
 
     def create_project(self, project_data: ProjectCreate, user_id: str) -> Project:
         self._validate_project_data(project_data)
@@ -54,11 +91,17 @@ class ProjectService:
             else:
                 self._create_default_stages(project, user_id)
 
+            self._update_rollups(project.id, {})
+            self.search.refresh_project(project.id)
             self.db.commit()
             self.db.refresh(project)
-            # Invalida cache de listagem e dashboard após criar
-            cache.invalidate('get_projects')
-            cache.invalidate('dashboard')
+            client_ids = [str(client_id) for client_id in project_data.clients]
+            sections = ["projects", "stages"] + (["revenue"] if project.status == "completed" else [])
+            # Clientes ganham o projeto na listagem de clientes
+            self._invalidate_cache(
+                project.id, client_ids, [f"client:{client_id}" for client_id in client_ids], sections,
+                self._user_ids(project)
+            )
             return project
 
         except IntegrityError:
@@ -153,7 +196,7 @@ class ProjectService:
 
     def get_project(self, project_id, actor=None, client_resource_permission=None):
         self.logger.info(f"[DB] get_project: project_id={project_id}, actor={actor}, client_resource_permission={client_resource_permission}")
-        project = self.db.get(Project, project_id)
+        project = self.db.get(Project, project_id, options=project_read_options())
         if not project:
             raise HTTPException(status_code=404, detail="Projeto não encontrado")
         if client_resource_permission and actor:
@@ -174,7 +217,7 @@ class ProjectService:
         concluido = sum(1 for s in project.stages if s.status == StageStatus.completed)
         return {"progress": round((concluido / total) * 100, 2) if total else 0.0}
 
-    def get_projects(self, limit, offset, order_by, order_dir, name, status, start_date, client_id, stage_name, stage_type, stage, search):
+    def get_projects(self, limit, offset, order_by, order_dir, name, status, start_date, client_id, stage_name, stage_type, stage, search, encoded=False, cursor=None, count=None):
         cache_params = {
             'limit': limit,
             'offset': offset,
@@ -187,58 +230,60 @@ class ProjectService:
             'stage_name': stage_name,
             'stage_type': stage_type,
             'stage': stage,
-            'search': search
+            'search': search,
+            'cursor': cursor,
+            'count': count
         }
-        cached_result = cache.get('get_projects', cache_params)
-        if cached_result:
-            self.logger.info(f"[CACHE] get_projects: {cache_params}")
-            return cached_result
-        self.logger.info(f"[DB] get_projects: {cache_params}")
-        query = self.db.query(Project)
-        if name:
-            query = query.filter(Project.name.ilike(f"%{name}%"))
-        if status:
-            query = query.filter(Project.status == status)
-        if start_date:
-            query = query.filter(Project.start_date >= start_date)
-        if client_id:
-            query = query.join(Project.clients).filter(Client.id == client_id)
-        if stage_name:
-            query = query.join(Project.stages).filter(Stage.name.ilike(f"%{stage_name}%"))
-        if stage_type:
-            query = query.join(Project.stages).filter(Stage.stage_type_id == stage_type)
-        if stage:
-            query = query.join(Project.stages).filter(Stage.id == stage)
-        if search:
-            query = query.filter(Project.name.ilike(f"%{search}%"))
-        if hasattr(Project, order_by):
-            order_col = getattr(Project, order_by)
-            if order_dir == "desc":
-                order_col = order_col.desc()
-            else:
-                order_col = order_col.asc()
-            query = query.order_by(order_col)
-        total = query.count()
-        items = query.offset(offset).limit(limit).all()
-        result = PaginatedProjects(
-            total=total,
-            count=len(items),
-            offset=offset,
-            limit=limit,
-            items=[ProjectRead.model_validate(p, from_attributes=True) for p in items]
-        )
-        cache.set('get_projects', cache_params, result)
-        return result
 
-    def get_my_projects(self, actor, limit, offset, order_by, order_dir, name, status, start_date, client_id, search):
-        self.logger.info(f"[DB] get_my_projects: actor={actor}, limit={limit}, offset={offset}, order_by={order_by}, order_dir={order_dir}, name={name}, status={status}, start_date={start_date}, client_id={client_id}, search={search}")
+        def load() -> PaginatedProjects:
+            self.logger.info(f"[DB] get_projects: {cache_params}")
+            query = self.db.query(Project)
+            if name:
+                query = query.filter(matches(name, Project.name))
+            if status:
+                query = query.filter(Project.status == status)
+            if start_date:
+                query = query.filter(Project.start_date >= start_date)
+            if client_id:
+                query = query.join(Project.clients).filter(Client.id == client_id)
+            if stage_name:
+                query = query.join(Project.stages).filter(matches(stage_name, Stage.name))
+            if stage_type:
+                query = query.join(Project.stages).filter(Stage.stage_type_id == stage_type)
+            if stage:
+                query = query.join(Project.stages).filter(Stage.id == stage)
+            if search:
+                query = query.filter(matches(search, Project.name))
+            items, total, next_cursor = paginate(
+                query, Project, limit, offset, order_by, order_dir, cursor, project_read_options(),
+                count, ('get_projects', cache_params, scope_tags("projects", client=client_id)),
+                rank=relevance(search or name, Project.name) if search or name else None
+            )
+            return PaginatedProjects(
+                total=total,
+                count=len(items),
+                offset=None if cursor else offset,
+                limit=limit,
+                items=[ProjectRead.model_validate(p, from_attributes=True) for p in items],
+                next_cursor=next_cursor
+            )
+
+        def tags(result: PaginatedProjects):
+            return scope_tags("projects", client=client_id) + [tag for p in result.items for tag in project_tags(p)]
+
+        if encoded:
+            return cache.get_or_compute_json('get_projects', cache_params, load, tags=tags)
+        return cache.get_or_compute('get_projects', cache_params, load, tags=tags)
+
+    def get_my_projects(self, actor, limit, offset, order_by, order_dir, name, status, start_date, client_id, search, cursor=None, count=None):
+        self.logger.info(f"[DB] get_my_projects: actor={actor}, limit={limit}, offset={offset}, order_by={order_by}, order_dir={order_dir}, name={name}, status={status}, start_date={start_date}, client_id={client_id}, search={search}, cursor={cursor}, count={count}")
         query = self.db.query(Project)
         if hasattr(actor, "id"):
             query = query.join(Project.clients).filter(Client.id == actor.id)
         else:
             raise HTTPException(status_code=401, detail="Acesso não autorizado")
         if name:
-            query = query.filter(Project.name.ilike(f"%{name}%"))
+            query = query.filter(matches(name, Project.name))
         if status:
             query = query.filter(Project.status == status)
         if start_date:
@@ -246,22 +291,27 @@ class ProjectService:
         if client_id:
             query = query.join(Project.clients).filter(Client.id == client_id)
         if search:
-            query = query.filter(Project.name.ilike(f"%{search}%"))
-        if hasattr(Project, order_by):
-            order_col = getattr(Project, order_by)
-            if order_dir == "desc":
-                order_col = order_col.desc()
-            else:
-                order_col = order_col.asc()
-            query = query.order_by(order_col)
-        total = query.count()
-        items = query.offset(offset).limit(limit).all()
+            query = query.filter(matches(search, Project.name))
+        count_params = {
+            'actor': str(actor.id),
+            'name': name,
+            'status': status,
+            'start_date': str(start_date) if start_date else None,
+            'client_id': client_id,
+            'search': search
+        }
+        items, total, next_cursor = paginate(
+            query, Project, limit, offset, order_by, order_dir, cursor, project_read_options(),
+            count, ('get_my_projects', count_params, scope_tags("projects", client=actor.id)),
+            rank=relevance(search or name, Project.name) if search or name else None
+        )
         return PaginatedProjects(
             total=total,
             count=len(items),
-            offset=offset,
+            offset=None if cursor else offset,
             limit=limit,
-            items=[ProjectRead.model_validate(p, from_attributes=True) for p in items]
+            items=[ProjectRead.model_validate(p, from_attributes=True) for p in items],
+            next_cursor=next_cursor
         )
 
     def update_project(self, project_id: str, project_data: ProjectUpdate) -> Project:
@@ -272,6 +322,11 @@ class ProjectService:
         if not project_data.stages or len(project_data.stages) == 0:
             raise ValueError("O projeto deve conter pelo menos uma etapa (stage).")
 
+        old_client_ids = {str(client.id) for client in project.clients}
+        old_user_ids = self._user_ids(project)
+        old_stage_ids = {stage.id for stage in project.stages}
+        old_revenue = tuple(getattr(project, field) for field in REVENUE_FIELDS)
+        rollups_before = self._project_rollups(project.id)
         try:
             updated_fields = project_data.model_dump(exclude_unset=True, exclude={"stages", "clients"})
 
@@ -292,11 +347,24 @@ class ProjectService:
             if project_data.stages is not None:
                 self._update_project_stages(project, project_data.stages)
 
+            self._update_rollups(project.id, rollups_before)
+            self.search.refresh_project(project.id)
             self.db.commit()
             self.db.refresh(project)
 
-            cache.invalidate('get_projects')
-            cache.invalidate('dashboard')
+            new_client_ids = {str(client.id) for client in project.clients}
+            extra = [f"client:{client_id}" for client_id in old_client_ids ^ new_client_ids]
+            if old_stage_ids - {stage.id for stage in project.stages}:
+                # Etapas removidas levam junto as suas tarefas e deixam arquivos sem etapa
+                extra += ["tasks", "files"]
+            sections = ["stages"]
+            if project.status != old_revenue[0]:
+                sections.append("projects")
+            if tuple(getattr(project, field) for field in REVENUE_FIELDS) != old_revenue:
+                sections.append("revenue")
+            self._invalidate_cache(
+                project.id, old_client_ids | new_client_ids, extra, sections, old_user_ids | self._user_ids(project)
+            )
             return project
 
         except IntegrityError:
@@ -428,6 +496,7 @@ class ProjectService:
             project.updated_at = datetime.now(UTC)
             self.db.commit()
             self.db.refresh(project)
+            cache.invalidate(f"project:{project.id}")
             return project
         except IntegrityError as e:
             self.db.rollback()
@@ -438,16 +507,51 @@ class ProjectService:
         if not project:
             return False
 
+        client_ids = [str(client.id) for client in project.clients]
+        user_ids = self._user_ids(project)
+        sections = ["projects", "stages"] + (["revenue"] if project.status == "completed" else [])
+        rollups_before = self._project_rollups(project.id)
         try:
             self.db.delete(project)
+            self._update_rollups(project_id, rollups_before)
+            self.search.refresh_project(project_id)
             self.db.commit()
-            cache.invalidate('get_projects')
-            cache.invalidate('dashboard')
+            # Tarefas saem com as etapas e arquivos ficam sem projeto
+            self._invalidate_cache(project_id, client_ids, ["tasks", "files"], sections, user_ids)
             return True
         except IntegrityError:
             self.db.rollback()
             return False
 
+    def _project_rollups(self, project_id) -> Rollups:
+        return self.rollups.project_rollups(project_id) if settings.DASHBOARD_ROLLUPS else {}
+
+    def _update_rollups(self, project_id, before: Rollups) -> None:
+        """Aplica aos contadores do dashboard a mudança do projeto e das etapas, na transação da escrita"""
+        if settings.DASHBOARD_ROLLUPS:
+            self.db.flush()
+            self.rollups.apply(before, self.rollups.project_rollups(project_id))
+
+    @staticmethod
+    def _user_ids(project: Project) -> set:
+        """Usuários em cujo dashboard o projeto aparece: quem o criou e os responsáveis pelas etapas"""
+        user_ids = {str(project.created_by_id)}
+        return user_ids | {str(stage.assigned_to_id) for stage in project.stages if stage.assigned_to_id}
+
+    def _invalidate_cache(self, project_id, client_ids: Iterable[str], extra: List[str], sections: List[str],
+                          user_ids: Iterable[str] = ()) -> None:
+        """
+        Invalida só o que mostra o projeto: listagens que o contêm (tag project:<id>), listagens de projetos
+        e dashboards por cliente ou usuário que podem ganhá-lo ou perdê-lo (sem filtro ou filtrados pelos seus
+        clientes e usuários) e as seções do dashboard afetadas pela mudança.
+        """
+        cache.invalidate(
+            f"project:{project_id}",
+            *write_tags("projects", client=list(client_ids), user=list(user_ids)),
+            *extra,
+            *(f"dashboard:{section}" for section in sections)
+        )
+
     def _validate_project_data(self, project_data) -> None:
         if project_data.estimated_end_date <= project_data.start_date:
             raise HTTPException(status_code=400, detail="Data de término deve ser posterior à data de início.")
@@ -461,34 +565,38 @@ class ProjectService:
         if not project_data.clients:
             raise HTTPException(status_code=400, detail="Pelo menos um cliente deve ser vinculado ao projeto.")
 
-    def get_projects_by_client(self, client_id, actor, limit, offset, order_by, order_dir, name, status, start_date, search, client_resource_permission=None):
-        self.logger.info(f"[DB] get_projects_by_client: client_id={client_id}, actor={actor}, limit={limit}, offset={offset}, order_by={order_by}, order_dir={order_dir}, name={name}, status={status}, start_date={start_date}, search={search}")
+    def get_projects_by_client(self, client_id, actor, limit, offset, order_by, order_dir, name, status, start_date, search, client_resource_permission=None, cursor=None, count=None):
+        self.logger.info(f"[DB] get_projects_by_client: client_id={client_id}, actor={actor}, limit={limit}, offset={offset}, order_by={order_by}, order_dir={order_dir}, name={name}, status={status}, start_date={start_date}, search={search}, cursor={cursor}, count={count}")
         # Verifica permissão antes de executar a consulta
         if client_resource_permission and actor:
             client_resource_permission([client_id], actor)
         query = self.db.query(Project)
         query = query.join(Project.clients).filter(Client.id == client_id)
         if name:
-            query = query.filter(Project.name.ilike(f"%{name}%"))
+            query = query.filter(matches(name, Project.name))
         if status:
             query = query.filter(Project.status == status)
         if start_date:
             query = query.filter(Project.start_date >= start_date)
         if search:
-            query = query.filter(Project.name.ilike(f"%{search}%"))
-        if hasattr(Project, order_by):
-            order_col = getattr(Project, order_by)
-            if order_dir == "desc":
-                order_col = order_col.desc()
-            else:
-                order_col = order_col.asc()
-            query = query.order_by(order_col)
-        total = query.count()
-        items = query.offset(offset).limit(limit).all()
+            query = query.filter(matches(search, Project.name))
+        count_params = {
+            'client_id': str(client_id),
+            'name': name,
+            'status': status,
+            'start_date': str(start_date) if start_date else None,
+            'search': search
+        }
+        items, total, next_cursor = paginate(
+            query, Project, limit, offset, order_by, order_dir, cursor, project_read_options(),
+            count, ('get_projects_by_client', count_params, scope_tags("projects", client=client_id)),
+            rank=relevance(search or name, Project.name) if search or name else None
+        )
         return PaginatedProjects(
             total=total,
             count=len(items),
-            offset=offset,
+            offset=None if cursor else offset,
             limit=limit,
-            items=[ProjectRead.model_validate(p, from_attributes=True) for p in items]
+            items=[ProjectRead.model_validate(p, from_attributes=True) for p in items],
+            next_cursor=next_cursor
         )
@@ -0,0 +1,144 @@
+from sqlalchemy import CompoundSelect, Select, column, delete, exists, or_, select, table, text, union
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import Iterable, Union
+import logging
+import sys
+
+from ..models import File, SearchEntry, Stage, Task
+from ..models.project import project_clients
+
+ENTITY_TYPES = ("project", "client", "stage", "task", "file")
+FIELDS = ("title", "subtitle", "content", "project_id", "client_ids")
+
+# View com o conteúdo atual da busca de cada entidade (migration add_search_entries)
+search_sources = table(
+    "search_sources", column("entity_type"), column("entity_id"), *(column(field) for field in FIELDS)
+)
+
+# Ids das entidades: lista ou select que devolve os ids
+Ids = Union[Iterable, Select, CompoundSelect]
+
+
+class SearchIndex:
+    """
+    Tabela search_entries com a busca global (projetos, clientes, etapas, tarefas e arquivos), copiada da
+    view search_sources. Os services chamam refresh com as entidades que a escrita alterou, depois do flush e
+    antes do commit, então a busca acompanha cada commit. Escritas que mudam o texto ou os clientes de
+    outras entidades (renomear um projeto muda o subtítulo das suas etapas, tarefas e arquivos) usam
+    refresh_project e refresh_client.
+
+    Escritas feitas fora dos services não passam por aqui: `check` compara a tabela com a view e `rebuild` a
+    refaz, via `python -m app.services.search_index`.
+    """
+
+    def __init__(self, db: Session) -> None:
+        self.db = db
+        self.logger = logging.getLogger(__name__)
+
+    def refresh(self, entity_type: str, ids: Ids) -> None:
+        """
+        Recopia da view as entradas das entidades `ids` do tipo e apaga as das que não existem mais. Os ids
+        são buscados pela chave primária de cada tabela, então o custo é o das entidades alteradas.
+        """
+        self.db.flush()
+        if not isinstance(ids, (Select, CompoundSelect)):
+            ids = list(ids)
+            if not ids:
+                return
+        self.db.execute(delete(SearchEntry).where(
+            SearchEntry.entity_type == entity_type,
+            SearchEntry.entity_id.in_(ids),
+            ~exists().where(
+                search_sources.c.entity_type == entity_type, search_sources.c.entity_id == SearchEntry.entity_id
+            )
+        ).execution_options(synchronize_session=False))
+        insert = pg_insert(SearchEntry).from_select(
+            ["entity_type", "entity_id", *FIELDS],
+            select(search_sources).where(
+                search_sources.c.entity_type == entity_type, search_sources.c.entity_id.in_(ids)
+            )
+        )
+        self.db.execute(insert.on_conflict_do_update(
+            index_elements=[SearchEntry.entity_type, SearchEntry.entity_id],
+            set_={field: insert.excluded[field] for field in FIELDS}
+        ))
+
+    def refresh_project(self, project_id) -> None:
+        """
+        Entradas do projeto e de tudo que o exibe ou herda os clientes dele: etapas, tarefas e arquivos, os
+        atuais e os que estavam no projeto antes da escrita (etapas removidas, arquivos que saíram dele)
+        """
+        stage_ids = select(Stage.id).where(Stage.project_id == project_id)
+
+        def indexed(entity_type: str):
+            return select(SearchEntry.entity_id).where(
+                SearchEntry.entity_type == entity_type, SearchEntry.project_id == project_id
+            )
+
+        self.refresh("project", [project_id])
+        self.refresh("stage", union(stage_ids, indexed("stage")))
+        self.refresh("task", union(select(Task.id).where(Task.stage_id.in_(stage_ids)), indexed("task")))
+        self.refresh("file", union(
+            select(File.id).where(or_(File.project_id == project_id, File.stage_id.in_(stage_ids))), indexed("file")
+        ))
+
+    def refresh_client(self, client_id) -> None:
+        """Entrada do cliente, dos seus projetos (o subtítulo traz os nomes dos clientes) e dos arquivos sem projeto"""
+        self.refresh("client", [client_id])
+        self.refresh("project", select(project_clients.c.project_id).where(project_clients.c.client_id == client_id))
+        self.refresh("file", select(File.id).where(File.client_id == client_id, File.project_id.is_(None)))
+
+    def check(self, limit: int = 100) -> dict:
+        """Compara a tabela com a view; devolve até `limit` entradas divergentes (faltando, sobrando ou desatualizadas)"""
+        # Tabela e view lidas no mesmo snapshot, para que escritas concorrentes não apareçam como divergência
+        if not self.db.in_transaction():
+            self.db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        rows = self.db.execute(text(f"""
+            SELECT coalesce(e.entity_type, s.entity_type) AS entity_type, coalesce(e.entity_id, s.entity_id) AS entity_id,
+                   e.entity_id IS NOT NULL AS stored, s.entity_id IS NOT NULL AS expected
+            FROM search_entries e
+            FULL JOIN search_sources s ON s.entity_type = e.entity_type AND s.entity_id = e.entity_id
+            WHERE e.entity_id IS NULL OR s.entity_id IS NULL
+               OR ({", ".join(f"e.{field}" for field in FIELDS)}) IS DISTINCT FROM ({", ".join(f"s.{field}" for field in FIELDS)})
+            LIMIT :limit
+        """), {"limit": limit}).all()
+        differences = [
+            {"entity_type": row.entity_type, "entity_id": str(row.entity_id), "stored": row.stored, "expected": row.expected}
+            for row in rows
+        ]
+        result = {"consistent": not differences, "differences": differences}
+        if differences:
+            self.logger.warning(f"search_entries divergente de search_sources em {len(differences)} entradas (até {limit})")
+        return result
+
+    def rebuild(self) -> dict:
+        """Refaz a tabela a partir da view"""
+        # EXCLUSIVE: buscas continuam lendo a versão anterior; escritas esperam o commit da reconstrução
+        self.db.execute(text("LOCK TABLE search_entries IN EXCLUSIVE MODE"))
+        self.db.query(SearchEntry).delete(synchronize_session=False)
+        entries = self.db.execute(text(f"""
+            INSERT INTO search_entries (entity_type, entity_id, {", ".join(FIELDS)})
+            SELECT entity_type, entity_id, {", ".join(FIELDS)} FROM search_sources
+        """)).rowcount
+        self.db.commit()
+        result = {"message": "Índice de busca reconstruído", "entries": entries}
+        self.logger.info(f"{result}")
+        return result
+
+
+if __name__ == "__main__":
+    from ..core.database import SessionLocal
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    if command not in ("check", "rebuild"):
+        sys.exit("uso: python -m app.services.search_index [check|rebuild]")
+    db = SessionLocal()
+    try:
+        index = SearchIndex(db)
+        result = index.rebuild() if command == "rebuild" else index.check()
+        print(result)
+        if command == "check" and not result["consistent"]:
+            sys.exit(1)
+    finally:
+        db.close()
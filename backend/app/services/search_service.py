@@ -0,0 +1,45 @@
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from typing import Any, List, Optional
+import logging
+
+from ..models import Client, SearchEntry
+from ..schemas.search import SearchHit, SearchResults
+from ..utils.search import distance, matches
+from .search_index import ENTITY_TYPES
+
+
+class SearchService:
+    def __init__(self, db: Session) -> None:
+        self.db = db
+        self.logger = logging.getLogger(__name__)
+
+    def search(self, actor: Any, q: str, types: Optional[List[str]], limit: int) -> SearchResults:
+        """
+        Busca global numa única consulta ao índice search_entries: as entradas que contêm o termo (sem
+        diferenciar maiúsculas e acentos), das mais parecidas com ele para as menos. Clientes só veem entradas
+        dos seus projetos e a própria. Sem cache: o índice acompanha cada commit e cada termo digitado é uma
+        consulta diferente.
+        """
+        self.logger.info(f"[DB] search: actor={actor.id}, q={q}, types={types}, limit={limit}")
+        if types and not set(types) <= set(ENTITY_TYPES):
+            raise HTTPException(status_code=400, detail=f"Tipos de busca válidos: {', '.join(ENTITY_TYPES)}")
+        term_distance = distance(q, SearchEntry.content)
+        query = self.db.query(SearchEntry, (1 - term_distance).label("score")).filter(matches(q, SearchEntry.content))
+        if isinstance(actor, Client):
+            query = query.filter(SearchEntry.client_ids.contains([actor.id]))
+        if types:
+            query = query.filter(SearchEntry.entity_type.in_(types))
+        # Só a distância na ordenação: o índice GiST entrega as entradas já nessa ordem
+        rows = query.order_by(term_distance).limit(limit).all()
+        items = [
+            SearchHit(
+                type=entry.entity_type,
+                id=entry.entity_id,
+                title=entry.title,
+                subtitle=entry.subtitle,
+                project_id=entry.project_id,
+                score=round(score, 4)
+            ) for entry, score in rows
+        ]
+        return SearchResults(query=q, count=len(items), items=items)
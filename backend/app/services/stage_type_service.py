@@ -1,13 +1,15 @@
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 from uuid import UUID
 import logging
 
 from ..models import StageType
 from ..models.user import User
 from ..schemas.stage_type import StageTypeRead, StageTypeCreate, StageTypeUpdate, PaginatedStageTypes
-from ..utils.cache import cache
+from ..utils.cache import cache, EncodedJSON
+from ..utils.pagination import paginate
+from ..utils.search import matches, relevance
 
 
 class StageTypeService:
@@ -15,43 +17,42 @@ class StageTypeService:
         self.db = db
         self.logger = logging.getLogger(__name__)
 
-    def get_stage_types(self, actor: Any, limit: int, offset: int, order_by: str, order_dir: str, name: Optional[str], is_active: Optional[bool]) -> PaginatedStageTypes:
+    def get_stage_types(self, actor: Any, limit: int, offset: int, order_by: str, order_dir: str, name: Optional[str], is_active: Optional[bool], encoded: bool = False, cursor: Optional[str] = None, count: Optional[str] = None) -> Union[PaginatedStageTypes, EncodedJSON]:
         cache_params = {
             "limit": limit,
             "offset": offset,
             "order_by": order_by,
             "order_dir": order_dir,
             "name": name,
-            "is_active": is_active
+            "is_active": is_active,
+            "cursor": cursor,
+            "count": count
         }
-        cached = cache.get("stage_types", cache_params)
-        if cached:
-            self.logger.info(f"[CACHE] get_stage_types: params={cache_params}")
-            return cached
-        self.logger.info(f"[DB] get_stage_types: params={cache_params}")
-        query = self.db.query(StageType)
-        if name:
-            query = query.filter(StageType.name.ilike(f"%{name}%"))
-        if is_active is not None:
-            query = query.filter(StageType.is_active == is_active)
-        if hasattr(StageType, order_by):
-            order_col = getattr(StageType, order_by)
-            if order_dir == "desc":
-                order_col = order_col.desc()
-            else:
-                order_col = order_col.asc()
-            query = query.order_by(order_col)
-        total = query.count()
-        items = query.offset(offset).limit(limit).all()
-        result = PaginatedStageTypes(
-            total=total,
-            count=len(items),
-            offset=offset,
-            limit=limit,
-            items=[StageTypeRead.model_validate(st) for st in items]
-        )
-        cache.set("stage_types", cache_params, result)
-        return result
+
+        def load() -> PaginatedStageTypes:
+            self.logger.info(f"[DB] get_stage_types: params={cache_params}")
+            query = self.db.query(StageType)
+            if name:
+                query = query.filter(matches(name, StageType.name))
+            if is_active is not None:
+                query = query.filter(StageType.is_active == is_active)
+            items, total, next_cursor = paginate(
+                query, StageType, limit, offset, order_by, order_dir, cursor, count=count,
+                count_cache=("stage_types", cache_params, None),
+                rank=relevance(name, StageType.name) if name else None
+            )
+            return PaginatedStageTypes(
+                total=total,
+                count=len(items),
+                offset=None if cursor else offset,
+                limit=limit,
+                items=[StageTypeRead.model_validate(st) for st in items],
+                next_cursor=next_cursor
+            )
+
+        if encoded:
+            return cache.get_or_compute_json("stage_types", cache_params, load)
+        return cache.get_or_compute("stage_types", cache_params, load)
 
     def get_active_stage_types(self, actor: Any) -> List[StageTypeRead]:
         stage_types = self.db.query(StageType).filter(StageType.is_active == True).order_by(StageType.created_at).all()
@@ -74,7 +75,6 @@ class StageTypeService:
         self.db.commit()
         self.db.refresh(stage_type)
         cache.invalidate("stage_types")
-        cache.invalidate("dashboard")
         return StageTypeRead.model_validate(stage_type)
 
     def update_stage_type(self, stage_type_id: str, stage_type_data: StageTypeUpdate, admin_user: User) -> StageTypeRead:
@@ -90,8 +90,8 @@ class StageTypeService:
             setattr(stage_type, field, value)
         self.db.commit()
         self.db.refresh(stage_type)
-        cache.invalidate("stage_types")
-        cache.invalidate("dashboard")
+        # Projetos exibem o tipo de cada etapa
+        cache.invalidate("stage_types", f"stage_type:{stage_type.id}")
         return StageTypeRead.model_validate(stage_type)
 
     def delete_stage_type(self, stage_type_id: str, admin_user: User) -> Dict[str, str]:
@@ -101,8 +101,7 @@ class StageTypeService:
             raise HTTPException(status_code=404, detail="Tipo de etapa não encontrado")
         stage_type.is_active = False
         self.db.commit()
-        cache.invalidate("stage_types")
-        cache.invalidate("dashboard")
+        cache.invalidate("stage_types", f"stage_type:{stage_type.id}")
         return {"message": "Tipo de etapa desativado com sucesso"}
 
     def stage_type_exists(self, name, exclude_id=None):
@@ -1,20 +1,24 @@
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime
 import logging
 
 from ..models.task import Task
 from ..schemas.task import TaskRead, TaskCreate, TaskUpdate, PaginatedTasks
 from ..models.stage import Stage
-from ..utils.cache import cache
+from ..utils.cache import cache, scope_tags, write_tags, EncodedJSON
+from ..utils.pagination import paginate
+from ..utils.search import matches, relevance
+from .search_index import SearchIndex
 
 class TaskService:
     def __init__(self, db: Session):
         self.db = db
         self.logger = logging.getLogger(__name__)
+        self.search = SearchIndex(db)
 
-    def get_tasks(self, limit: int, offset: int, order_by: str, order_dir: str, title: Optional[str], status: Optional[str], priority: Optional[str], due_date: Optional[str], stage_id: Optional[str], created_by_id: Optional[str], assigned_to_id: Optional[str]) -> PaginatedTasks:
+    def get_tasks(self, limit: int, offset: int, order_by: str, order_dir: str, title: Optional[str], status: Optional[str], priority: Optional[str], due_date: Optional[str], stage_id: Optional[str], created_by_id: Optional[str], assigned_to_id: Optional[str], encoded: bool = False, cursor: Optional[str] = None, count: Optional[str] = None) -> Union[PaginatedTasks, EncodedJSON]:
         cache_params = {
             "limit": limit,
             "offset": offset,
@@ -26,46 +30,46 @@ class TaskService:
             "due_date": due_date,
             "stage_id": stage_id,
             "created_by_id": created_by_id,
-            "assigned_to_id": assigned_to_id
+            "assigned_to_id": assigned_to_id,
+            "cursor": cursor,
+            "count": count
         }
-        cached = cache.get("tasks", cache_params)
-        if cached:
-            self.logger.info(f"[CACHE] get_tasks: params={cache_params}")
-            return cached
-        self.logger.info(f"[DB] get_tasks: params={cache_params}")
-        query = self.db.query(Task)
-        if title:
-            query = query.filter(Task.title.ilike(f"%{title}%"))
-        if status:
-            query = query.filter(Task.status == status)
-        if priority:
-            query = query.filter(Task.priority == priority)
-        if due_date:
-            query = query.filter(Task.due_date == due_date)
-        if stage_id:
-            query = query.filter(Task.stage_id == stage_id)
-        if created_by_id:
-            query = query.filter(Task.created_by_id == created_by_id)
-        if assigned_to_id:
-            query = query.filter(Task.assigned_to_id == assigned_to_id)
-        if hasattr(Task, order_by):
-            order_col = getattr(Task, order_by)
-            if order_dir == "desc":
-                order_col = order_col.desc()
-            else:
-                order_col = order_col.asc()
-            query = query.order_by(order_col)
-        total = query.count()
-        items = query.offset(offset).limit(limit).all()
-        result = PaginatedTasks(
-            total=total,
-            count=len(items),
-            offset=offset,
-            limit=limit,
-            items=[TaskRead.model_validate(t, from_attributes=True) for t in items]
-        )
-        cache.set("tasks", cache_params, result)
-        return result
+
+        def load() -> PaginatedTasks:
+            self.logger.info(f"[DB] get_tasks: params={cache_params}")
+            query = self.db.query(Task)
+            if title:
+                query = query.filter(matches(title, Task.title))
+            if status:
+                query = query.filter(Task.status == status)
+            if priority:
+                query = query.filter(Task.priority == priority)
+            if due_date:
+                query = query.filter(Task.due_date == due_date)
+            if stage_id:
+                query = query.filter(Task.stage_id == stage_id)
+            if created_by_id:
+                query = query.filter(Task.created_by_id == created_by_id)
+            if assigned_to_id:
+                query = query.filter(Task.assigned_to_id == assigned_to_id)
+            items, total, next_cursor = paginate(
+                query, Task, limit, offset, order_by, order_dir, cursor, count=count,
+                count_cache=("tasks", cache_params, tags),
+                rank=relevance(title, Task.title) if title else None
+            )
+            return PaginatedTasks(
+                total=total,
+                count=len(items),
+                offset=None if cursor else offset,
+                limit=limit,
+                items=[TaskRead.model_validate(t, from_attributes=True) for t in items],
+                next_cursor=next_cursor
+            )
+
+        tags = scope_tags("tasks", stage=stage_id, creator=created_by_id, assignee=assigned_to_id)
+        if encoded:
+            return cache.get_or_compute_json("tasks", cache_params, load, tags=tags)
+        return cache.get_or_compute("tasks", cache_params, load, tags=tags)
 
     def get_tasks_by_stage(self, stage_id: str, actor, client_resource_permission) -> List[TaskRead]:
         stage = self.db.get(Stage, stage_id)
@@ -94,13 +98,26 @@ class TaskService:
         client_resource_permission(client_ids, actor)
         return TaskRead.model_validate(task, from_attributes=True)
 
+    def _cache_tags(self, task: Task, stage_changed: bool = True) -> List[str]:
+        """
+        Tags a invalidar quando a tarefa entra, sai ou muda: as listagens de tarefas que podem contê-la e,
+        se ela entrou ou saiu da etapa, o projeto (ProjectRead traz os ids das tarefas de cada etapa)
+        """
+        tags = write_tags("tasks", stage=task.stage_id, creator=task.created_by_id, assignee=task.assigned_to_id)
+        if stage_changed:
+            stage = self.db.get(Stage, task.stage_id)
+            if stage:
+                tags.append(f"project:{stage.project_id}")
+        return tags
+
     def create_task(self, task_data: TaskCreate) -> TaskRead:
         task = Task(**task_data.model_dump())
         self.db.add(task)
+        self.db.flush()
+        self.search.refresh("task", [task.id])
         self.db.commit()
         self.db.refresh(task)
-        cache.invalidate("tasks")
-        cache.invalidate("dashboard")
+        cache.invalidate(*self._cache_tags(task))
         return TaskRead.model_validate(task, from_attributes=True)
 
     def update_task(self, task_id: str, task_data: TaskUpdate) -> TaskRead:
@@ -108,21 +125,26 @@ class TaskService:
         if not task:
             raise HTTPException(status_code=404, detail="Tarefa não encontrada")
         update_data = task_data.model_dump(exclude_unset=True)
+        old_stage_id = task.stage_id
+        stage_changed = "stage_id" in update_data and update_data["stage_id"] != old_stage_id
+        tags = self._cache_tags(task, stage_changed)
         for field, value in update_data.items():
             setattr(task, field, value)
         task.updated_at = datetime.now()
+        if "title" in update_data or stage_changed:
+            self.search.refresh("task", [task.id])
         self.db.commit()
         self.db.refresh(task)
-        cache.invalidate("tasks")
-        cache.invalidate("dashboard")
+        cache.invalidate(*tags, *self._cache_tags(task, stage_changed))
         return TaskRead.model_validate(task, from_attributes=True)
 
     def delete_task(self, task_id: str) -> dict:
         task = self.db.get(Task, task_id)
         if not task:
             raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+        tags = self._cache_tags(task)
         self.db.delete(task)
+        self.search.refresh("task", [task.id])
         self.db.commit()
-        cache.invalidate("tasks")
-        cache.invalidate("dashboard")
+        cache.invalidate(*tags)
         return {"message": "Tarefa removida com sucesso"}
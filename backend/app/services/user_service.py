@@ -16,15 +16,12 @@ class UserService:
         return UserRead.model_validate(user)
 
     def get_users(self) -> List[UserRead]:
-        cached = cache.get("users", {})
-        if cached:
-            self.logger.info(f"[CACHE] get_users: params={{}}")
-            return cached
-        self.logger.info(f"[DB] get_users: params={{}}")
-        users = self.db.query(User).all()
-        result = [UserRead.model_validate(u) for u in users]
-        cache.set("users", {}, result)
-        return result
+        def load() -> List[UserRead]:
+            self.logger.info(f"[DB] get_users: params={{}}")
+            users = self.db.query(User).all()
+            return [UserRead.model_validate(u) for u in users]
+
+        return cache.get_or_compute("users", {}, load)
 
     def get_user(self, user_id: str) -> UserRead:
         user = self.db.get(User, user_id)
@@ -49,7 +46,6 @@ class UserService:
         self.db.commit()
         self.db.refresh(user)
         cache.invalidate("users")
-        cache.invalidate("dashboard")
         return UserRead.model_validate(user)
 
     def update_user(self, user_id: str, user_data: UserUpdate) -> UserRead:
@@ -64,7 +60,6 @@ class UserService:
         self.db.commit()
         self.db.refresh(user)
         cache.invalidate("users")
-        cache.invalidate("dashboard")
         return UserRead.model_validate(user)
 
     def delete_user(self, user_id: str) -> dict:
@@ -74,5 +69,4 @@ class UserService:
         user.is_active = False
         self.db.commit()
         cache.invalidate("users")
-        cache.invalidate("dashboard")
         return {"message": "Usuário desativado com sucesso"}
@@ -0,0 +1,251 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from fastapi import HTTPException
+from typing import Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.storage import storage, iter_stream
+from ..models.file import File, FileRendition
+from ..schemas.file import FileCategory, FileRenditionRead
+
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".avi", ".mkv", ".webm"}
+
+# kind -> (nome no storage, mime type)
+RENDITION_KINDS = {
+    "poster": ("poster.jpg", "image/jpeg"),
+    "preview": ("preview.mp4", "video/mp4"),
+}
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class VideoRenditionService:
+    """
+    Poster (quadro JPEG) e preview (MP4 H.264 de baixa taxa, com faststart para tocar via Range) de vídeos,
+    gerados com o ffmpeg/ffprobe do sistema e gravados no storage em renditions/<file_id>/. Sem os binários
+    a geração é ignorada; vídeos pendentes podem ser processados depois com
+    `python -m app.services.video_rendition_service`.
+    """
+
+    def __init__(self, db: Session) -> None:
+        self.db = db
+        self.logger = logging.getLogger(__name__)
+        self.storage = storage
+
+    @staticmethod
+    def tools() -> Optional[Tuple[str, str]]:
+        ffmpeg = shutil.which(settings.FFMPEG_PATH)
+        ffprobe = shutil.which(settings.FFPROBE_PATH)
+        return (ffmpeg, ffprobe) if ffmpeg and ffprobe else None
+
+    @staticmethod
+    def supports(file_model: File) -> bool:
+        ext = os.path.splitext(file_model.original_name or "")[1].lower()
+        return file_model.category == FileCategory.video and ext in VIDEO_EXTENSIONS
+
+    @staticmethod
+    def rendition_key(file_id, kind: str) -> str:
+        return f"renditions/{file_id}/{RENDITION_KINDS[kind][0]}"
+
+    def _set_status(self, file_id, status: str, error_message: Optional[str] = None) -> None:
+        for kind, (_, mime_type) in RENDITION_KINDS.items():
+            self.db.execute(
+                pg_insert(FileRendition)
+                .values(file_id=file_id, kind=kind, status=status, mime_type=mime_type,
+                        error_message=error_message, created_at=datetime.utcnow(), updated_at=datetime.utcnow())
+                .on_conflict_do_update(
+                    constraint="uq_file_renditions_file_kind",
+                    set_={"status": status, "error_message": error_message, "updated_at": datetime.utcnow()}
+                )
+            )
+        self.db.commit()
+
+    def schedule(self, file_model: File) -> bool:
+        """Registra poster e preview como pendentes e agenda a geração fora das threads da API"""
+        if not self.supports(file_model):
+            return False
+        if not self.tools():
+            self.logger.info(f"ffmpeg/ffprobe não encontrados, renditions do vídeo {file_model.id} ignoradas")
+            return False
+        global _executor
+        try:
+            self._set_status(file_model.id, "pending")
+            with _executor_lock:
+                if _executor is None:
+                    # Threads só esperam o processo do ffmpeg; o limite evita vários transcodes disputando a CPU
+                    _executor = ThreadPoolExecutor(
+                        max_workers=settings.VIDEO_TRANSCODE_WORKERS, thread_name_prefix="video-renditions"
+                    )
+            _executor.submit(video_rendition_job, str(file_model.id))
+        except Exception as e:
+            # O upload já foi confirmado; a geração pode ser refeita depois
+            self.db.rollback()
+            self.logger.warning(f"Erro ao agendar renditions do vídeo {file_model.id}: {e}")
+            return False
+        return True
+
+    def _run(self, args: List[str], timeout: Optional[int] = None) -> bytes:
+        result = subprocess.run(args, capture_output=True, timeout=timeout or settings.VIDEO_TRANSCODE_TIMEOUT)
+        if result.returncode != 0:
+            stderr = result.stderr.decode(errors="replace").strip()
+            raise RuntimeError(stderr[-500:] or f"{os.path.basename(args[0])} terminou com código {result.returncode}")
+        return result.stdout
+
+    def _probe(self, ffprobe: str, source: str) -> Dict[str, Optional[float]]:
+        output = self._run([
+            ffprobe, "-v", "error", "-select_streams", "v:0", "-show_entries",
+            "stream=width,height:format=duration", "-of", "json", source
+        ], timeout=120)
+        data = json.loads(output or b"{}")
+        stream = (data.get("streams") or [{}])[0]
+        duration = data.get("format", {}).get("duration")
+        return {
+            "width": stream.get("width"),
+            "height": stream.get("height"),
+            "duration": float(duration) if duration not in (None, "N/A") else None,
+        }
+
+    def _source(self, file_model: File, workdir: str) -> str:
+        """Caminho local do original; em storages remotos o ffmpeg lê pela URL assinada (com Range)"""
+        local = self.storage.local_path(file_model.path)
+        if local is not None:
+            return local
+        url = self.storage.presign(file_model.path, settings.VIDEO_TRANSCODE_TIMEOUT)
+        if url:
+            return url
+        path = os.path.join(workdir, "source")
+        with open(path, "wb") as out:
+            for data in self.storage.open_range(file_model.path):
+                out.write(data)
+        return path
+
+    def process(self, file_id: str) -> List[FileRenditionRead]:
+        """Gera poster e preview do vídeo e grava os metadados; falhas ficam registradas como status failed"""
+        tools = self.tools()
+        if not tools:
+            raise HTTPException(status_code=503, detail="ffmpeg não está disponível no servidor")
+        ffmpeg, ffprobe = tools
+        file_model = self.db.get(File, file_id)
+        if not file_model:
+            raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+        if not self.supports(file_model):
+            raise HTTPException(status_code=400, detail="Arquivo não é um vídeo suportado")
+
+        record_id = file_model.id
+        self._set_status(record_id, "processing")
+        workdir = tempfile.mkdtemp(prefix="video-renditions-")
+        try:
+            source = self._source(file_model, workdir)
+            info = self._probe(ffprobe, source)
+            outputs = {kind: os.path.join(workdir, name) for kind, (name, _) in RENDITION_KINDS.items()}
+            offset = min(info["duration"] * 0.1, 10.0) if info["duration"] else 0.0
+            self._run([
+                ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-ss", f"{offset:.2f}", "-i", source,
+                "-frames:v", "1", "-vf", f"scale='min({settings.VIDEO_POSTER_WIDTH},iw)':-2", "-q:v", "3",
+                outputs["poster"]
+            ])
+            self._run([
+                ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-i", source,
+                "-map", "0:v:0", "-map", "0:a:0?",
+                "-vf", f"scale=-2:'min({settings.VIDEO_PREVIEW_HEIGHT},ih)'",
+                "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+                "-b:v", settings.VIDEO_PREVIEW_BITRATE, "-maxrate", settings.VIDEO_PREVIEW_BITRATE,
+                "-bufsize", "2M", "-c:a", "aac", "-b:a", "64k", "-ac", "1",
+                "-movflags", "+faststart", outputs["preview"]
+            ])
+
+            for kind, path in outputs.items():
+                key = self.rendition_key(file_model.id, kind)
+                with open(path, "rb") as f:
+                    size = self.storage.put_stream(key, iter_stream(f))
+                output_info = self._probe(ffprobe, path)
+                rendition = self.db.query(FileRendition).filter(
+                    FileRendition.file_id == file_model.id, FileRendition.kind == kind
+                ).one()
+                rendition.status = "ready"
+                rendition.path = key
+                rendition.size = size
+                rendition.width = output_info["width"]
+                rendition.height = output_info["height"]
+                rendition.duration = info["duration"] if kind == "preview" else None
+                rendition.error_message = None
+            self.db.commit()
+            self.logger.info(f"Renditions do vídeo {file_model.id} geradas")
+        except Exception as e:
+            self.db.rollback()
+            if self.db.get(File, record_id) is None:
+                # Arquivo removido durante a geração: descarta o que já foi gravado
+                self.discard(record_id)
+                return []
+            self.logger.error(f"Erro ao gerar renditions do vídeo {file_id}: {e}")
+            self._set_status(record_id, "failed", str(e))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        return self.get_renditions(record_id)
+
+    def get_renditions(self, file_id) -> List[FileRenditionRead]:
+        renditions = self.db.query(FileRendition).filter(FileRendition.file_id == file_id).order_by(FileRendition.kind).all()
+        return [FileRenditionRead.model_validate(r, from_attributes=True) for r in renditions]
+
+    def get_ready_rendition(self, file_id, kind: str) -> FileRendition:
+        rendition = self.db.query(FileRendition).filter(
+            FileRendition.file_id == file_id, FileRendition.kind == kind
+        ).first()
+        if not rendition or rendition.status != "ready" or not rendition.path:
+            raise HTTPException(status_code=404, detail="Rendition não disponível")
+        return rendition
+
+    def discard(self, file_id) -> None:
+        try:
+            self.storage.delete_prefix(f"renditions/{file_id}/")
+        except Exception as e:
+            self.logger.warning(f"Erro ao remover renditions do arquivo {file_id}: {e}")
+
+    def process_pending(self) -> dict:
+        """Processa vídeos sem renditions prontas (enviados antes do ffmpeg estar instalado, ou que falharam)"""
+        ready = self.db.query(FileRendition.file_id).filter(FileRendition.status == "ready")
+        videos = self.db.query(File).filter(File.category == FileCategory.video, ~File.id.in_(ready)).all()
+        processed = failed = 0
+        for file_model in videos:
+            if not self.supports(file_model):
+                continue
+            results = self.process(str(file_model.id))
+            if all(r.status == "ready" for r in results):
+                processed += 1
+            else:
+                failed += 1
+        result = {"videos_processed": processed, "videos_failed": failed}
+        self.logger.info(f"Renditions de vídeo pendentes: {result}")
+        return result
+
+
+def video_rendition_job(file_id: str) -> None:
+    """Geração em segundo plano: usa sessão própria, o resultado fica no status das renditions"""
+    db = SessionLocal()
+    try:
+        VideoRenditionService(db).process(file_id)
+    except HTTPException:
+        pass
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Erro na geração de renditions do vídeo {file_id}: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        print(VideoRenditionService(db).process_pending())
+    finally:
+        db.close()
@@ -1,41 +1,707 @@
 import threading
 import time
+import gzip
 import hashlib
+import heapq
 import json
+import logging
+import pickle
+import sys
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+from uuid import uuid4
 
-class SimpleCache:
-    def __init__(self, default_ttl=60):
-        self.store = {}
-        self.lock = threading.Lock()
-        self.default_ttl = default_ttl
+from pydantic import BaseModel
+
+from ..core.config import settings
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Tamanho aproximado (serializado) de um valor, usado no orçamento de bytes do cache. Respostas JSON
+    ficam como EncodedJSON e são medidas pelos bytes já codificados; só modelos guardados como objeto
+    (listagens com CACHE_RESPONSE_BYTES desligado) são serializados aqui.
+    """
+    if isinstance(value, EncodedJSON):
+        return len(value.body) + len(value.gzipped or b"")
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, BaseModel):
+        return len(value.model_dump_json())
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+def _scope_values(value) -> List[Any]:
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [v for v in value if v]
+    return [value] if value else []
+
+
+def scope_tags(collection: str, **scopes) -> List[str]:
+    """
+    Tags de pertencimento de uma listagem: uma por filtro de entidade usado (ex.: files:project:<id>),
+    ou "<coleção>:all" se a listagem não foi filtrada por entidade.
+    """
+    tags = [f"{collection}:{name}:{value}" for name, value in scopes.items() for value in _scope_values(value)]
+    return tags or [f"{collection}:all"]
+
+
+def write_tags(collection: str, **scopes) -> List[str]:
+    """
+    Tags a invalidar quando um item da coleção entra, sai ou muda: as listagens sem filtro de entidade e
+    as filtradas por cada valor informado (passe valores antigos e novos numa lista quando mudarem).
+    """
+    return [f"{collection}:all"] + [
+        f"{collection}:{name}:{value}" for name, value in scopes.items() for value in _scope_values(value)
+    ]
+
+
+class EncodedJSON:
+    """
+    Resposta JSON já serializada, guardada no cache no lugar do modelo Pydantic: num hit a rota devolve
+    os bytes direto, sem validar o response_model nem serializar de novo. O corpo é o mesmo que o FastAPI
+    geraria para o modelo; acima de CACHE_GZIP_MIN_BYTES também é guardada a versão comprimida.
+    """
+
+    __slots__ = ("body", "gzipped", "etag")
+
+    def __init__(self, body: bytes, gzipped: Optional[bytes], etag: str) -> None:
+        self.body = body
+        self.gzipped = gzipped
+        self.etag = etag
+
+    @classmethod
+    def from_model(cls, model: BaseModel) -> "EncodedJSON":
+        body = model.model_dump_json(by_alias=True).encode()
+        gzip_min = settings.CACHE_GZIP_MIN_BYTES
+        # mtime=0: a mesma resposta gera sempre os mesmos bytes comprimidos
+        gzipped = gzip.compress(body, compresslevel=6, mtime=0) if gzip_min and len(body) >= gzip_min else None
+        # ETag fraca: identifica o conteúdo, seja qual for a codificação enviada
+        return cls(body, gzipped, f'W/"{hashlib.md5(body).hexdigest()}"')
+
+
+class _Flight:
+    """Cálculo em andamento de uma chave; quem pede a mesma chave espera este resultado"""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+Tags = Union[Iterable[str], Callable[[Any], Iterable[str]], None]
+
+
+class CacheBackend(ABC):
+    """
+    Interface de cache usada pelos services. Entradas são identificadas por (prefixo, parâmetros) e
+    marcadas com tags das entidades de que dependem (ex.: "project:<id>", "dashboard:revenue"); o prefixo
+    também é uma tag. invalidate(*tags) remove as entradas com qualquer uma das tags.
+
+    Depois do TTL uma entrada ainda fica guardada por stale_ttl segundos: get() já não a retorna, mas
+    get_or_compute() a serve enquanto uma única chamada recalcula o valor. Invalidações removem a entrada
+    por completo, então o valor vencido nunca é anterior a uma escrita.
+    """
+
+    default_ttl: int
+    stale_ttl: int = 0
+    # Quanto quem espera o cálculo de outra chamada aguarda antes de calcular por conta própria
+    flight_timeout: float = 30
+
+    def __init__(self) -> None:
+        self._flights: Dict[str, _Flight] = {}
+        self._flights_lock = threading.Lock()
+        self.coalesced = 0
+        self.stale_served = 0
 
     def _make_key(self, prefix, params):
         key_str = json.dumps(params, sort_keys=True)
         key_hash = hashlib.md5(key_str.encode()).hexdigest()
         return f"{prefix}:{key_hash}"
 
+    @abstractmethod
+    def lookup(self, prefix, params) -> Tuple[Any, bool]:
+        """
+        (valor, fresco). Entradas vencidas ainda dentro de stale_ttl voltam com fresco=False;
+        sem entrada, (None, False).
+        """
+
     def get(self, prefix, params):
+        """Valor guardado, ou None se não existir ou tiver expirado"""
+        value, fresh = self.lookup(prefix, params)
+        return value if fresh else None
+
+    @abstractmethod
+    def set(self, prefix, params, value, ttl=None, tags: Optional[Iterable[str]] = None, stale_ttl=None):
+        """
+        Guarda o valor por ttl segundos (default_ttl se omitido), marcado com o prefixo e as tags, e o mantém
+        vencido por mais stale_ttl segundos (padrão self.stale_ttl)
+        """
+
+    def get_or_compute(self, prefix, params, compute: Callable[[], Any], ttl=None, tags: Tags = None):
+        """
+        Valor da chave, calculado com compute() quando não está no cache (tags pode ser uma função do
+        valor calculado). Chamadas simultâneas para a mesma chave viram um único cálculo (single-flight):
+        a primeira calcula e as demais esperam o resultado dela. Se houver um valor vencido dentro de
+        stale_ttl, quem chega durante o recálculo recebe esse valor em vez de esperar.
+
+        O líder recalcula na própria thread e recebe o valor novo, mesmo havendo um vencido: compute()
+        usa a sessão do banco da requisição, que não pode ser usada em outra thread e é fechada ao fim da
+        resposta, então não dá para devolver o vencido ao líder e recalcular num executor em segundo plano.
+        """
+        value, fresh = self.lookup(prefix, params)
+        if fresh:
+            return value
+        key = self._make_key(prefix, params)
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            if value is not None:
+                self.stale_served += 1
+                return value
+            if flight.done.wait(self.flight_timeout):
+                self.coalesced += 1
+                if flight.error is not None:
+                    raise flight.error
+                return flight.value
+            return self._compute(prefix, params, compute, ttl, tags)
+        try:
+            flight.value = self._lead(prefix, params, compute, ttl, tags, value)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def get_or_compute_json(self, prefix, params, compute: Callable[[], BaseModel], ttl=None,
+                            tags: Tags = None) -> EncodedJSON:
+        """
+        Como get_or_compute, mas guarda a resposta já codificada (EncodedJSON) do modelo retornado por
+        compute(). Fica nos mesmos parâmetros, marcados com "format": "json", e com as mesmas tags.
+        """
+        entry_tags: List[str] = []
+
+        def encode() -> EncodedJSON:
+            model = compute()
+            # As tags podem depender do modelo, que não fica guardado
+            entry_tags.extend(tags(model) if callable(tags) else tags or ())
+            return EncodedJSON.from_model(model)
+
+        return self.get_or_compute(prefix, {**params, "format": "json"}, encode, ttl, tags=lambda _: entry_tags)
+
+    def _lead(self, prefix, params, compute: Callable[[], Any], ttl, tags: Tags, stale: Any):
+        """Cálculo feito pela chamada que lidera o single-flight deste processo"""
+        return self._compute(prefix, params, compute, ttl, tags)
+
+    def _compute(self, prefix, params, compute: Callable[[], Any], ttl, tags: Tags):
+        value = compute()
+        self.set(prefix, params, value, ttl, tags(value) if callable(tags) else tags)
+        return value
+
+    @abstractmethod
+    def invalidate(self, *tags: str):
+        """Remove as entradas marcadas com qualquer uma das tags"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove todas as entradas"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Contadores para monitoramento"""
+
+
+def _entry_tags(prefix: str, tags: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    return tuple(dict.fromkeys([prefix, *(tags or ())]))
+
+
+class _Entry:
+    __slots__ = ("value", "expires", "stale_until", "size", "prefix", "tags")
+
+    def __init__(self, value: Any, expires: float, stale_until: float, size: int, prefix: str,
+                 tags: Tuple[str, ...]) -> None:
+        self.value = value
+        self.expires = expires
+        self.stale_until = stale_until
+        self.size = size
+        self.prefix = prefix
+        self.tags = tags
+
+
+class LRUCache(CacheBackend):
+    """
+    Cache em memória com limite de entradas e de bytes, despejo LRU e expiração por TTL.
+
+    - As entradas ficam num OrderedDict em ordem de uso; passando de max_entries ou max_bytes, as usadas
+      há mais tempo são despejadas. Valores maiores que max_bytes não são guardados.
+    - Uma thread em segundo plano remove as expiradas (passado também o stale_ttl) a cada sweep_interval
+      segundos (heap por expiração), então chaves que ninguém mais lê não ficam ocupando memória.
+    - Um índice por tag faz invalidate(*tags) custar só as entradas daquelas tags.
+    """
+
+    def __init__(self, default_ttl: int = 60, max_entries: int = 5000, max_bytes: int = 64 * 1024 * 1024,
+                 sweep_interval: float = 30, stale_ttl: int = 0) -> None:
+        super().__init__()
+        self.store: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.tags: Dict[str, Set[str]] = {}
+        self.expiry_heap: List[Tuple[float, str]] = []
+        self.lock = threading.Lock()
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._sweeper: Optional[threading.Thread] = None
+
+    def _remove(self, key: str) -> _Entry:
+        entry = self.store.pop(key)
+        self.bytes -= entry.size
+        for tag in entry.tags:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+        return entry
+
+    def lookup(self, prefix, params):
         key = self._make_key(prefix, params)
         with self.lock:
             entry = self.store.get(key)
-            if entry:
-                value, expires = entry
-                if expires > time.time():
-                    return value
-                else:
-                    del self.store[key]
-        return None
-
-    def set(self, prefix, params, value, ttl=None):
+            if entry is None:
+                self.misses += 1
+                return None, False
+            now = time.time()
+            if entry.expires > now:
+                self.store.move_to_end(key)
+                self.hits += 1
+                return entry.value, True
+            self.misses += 1
+            if entry.stale_until > now:
+                return entry.value, False
+            self._remove(key)
+            self.expirations += 1
+            return None, False
+
+    def set(self, prefix, params, value, ttl=None, tags=None, stale_ttl=None, size: Optional[int] = None):
+        """`size` evita estimar de novo quando o tamanho serializado já é conhecido (ex.: vindo do Redis)"""
         key = self._make_key(prefix, params)
+        entry_tags = _entry_tags(prefix, tags)
+        if size is None:
+            size = estimate_size(value)
+        if size > self.max_bytes:
+            return
         expires = time.time() + (ttl or self.default_ttl)
+        stale_until = expires + (self.stale_ttl if stale_ttl is None else stale_ttl)
+        with self.lock:
+            if key in self.store:
+                self._remove(key)
+            self.store[key] = _Entry(value, expires, stale_until, size, prefix, entry_tags)
+            for tag in entry_tags:
+                self.tags.setdefault(tag, set()).add(key)
+            self.bytes += size
+            heapq.heappush(self.expiry_heap, (stale_until, key))
+            while len(self.store) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self.store)))
+                self.evictions += 1
+        self._ensure_sweeper()
+
+    def invalidate(self, *tags):
+        with self.lock:
+            for tag in tags:
+                for key in list(self.tags.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self.store.clear()
+            self.tags.clear()
+            self.expiry_heap.clear()
+            self.bytes = 0
+
+    def sweep(self) -> int:
+        """Remove as entradas expiradas e retorna quantas saíram"""
+        removed = 0
+        now = time.time()
         with self.lock:
-            self.store[key] = (value, expires)
+            while self.expiry_heap and self.expiry_heap[0][0] <= now:
+                expires, key = heapq.heappop(self.expiry_heap)
+                entry = self.store.get(key)
+                # Itens do heap de chaves regravadas ou já removidas são ignorados
+                if entry is not None and entry.stale_until == expires:
+                    self._remove(key)
+                    removed += 1
+            if len(self.expiry_heap) > 2 * len(self.store) + 1000:
+                self.expiry_heap = [(entry.stale_until, key) for key, entry in self.store.items()]
+                heapq.heapify(self.expiry_heap)
+            self.expirations += removed
+        return removed
+
+    def _sweep_loop(self) -> None:
+        while True:
+            time.sleep(self.sweep_interval)
+            self.sweep()
+
+    def _ensure_sweeper(self) -> None:
+        # Iniciada no primeiro set, para que importar o módulo (alembic, scripts) não crie threads
+        if self._sweeper is None:
+            with self.lock:
+                if self._sweeper is None:
+                    self._sweeper = threading.Thread(target=self._sweep_loop, name="cache-sweeper", daemon=True)
+                    self._sweeper.start()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "local",
+                "entries": len(self.store),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "coalesced": self.coalesced,
+                "stale_served": self.stale_served,
+                "entries_by_prefix": dict(Counter(entry.prefix for entry in self.store.values())),
+                "tags": len(self.tags),
+            }
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache compartilhado entre processos e instâncias, em qualquer servidor que fale o protocolo Redis.
+    Valores são serializados com pickle e cada tag (inclusive o prefixo) tem um conjunto com as suas chaves,
+    usado por invalidate(*tags). Falhas de conexão não derrubam a requisição: leitura vira miss e escrita é ignorada.
+    O single-flight de get_or_compute vale entre processos: quem calcula segura uma trava (SET NX) e os
+    demais acompanham a chave até o valor aparecer.
+    """
+
+    # Remove a trava só se ela ainda for de quem a criou (pode ter expirado e sido pega por outro processo)
+    RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, url: str, namespace: str = "crialt:cache:", default_ttl: int = 60, stale_ttl: int = 0) -> None:
+        super().__init__()
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("O pacote redis é necessário para CACHE_BACKEND=redis")
+        # Cache lento não pode segurar a requisição: operações com timeout curto. A conexão do pub/sub
+        # fica ociosa entre mensagens, então usa health check em vez de timeout de leitura.
+        self.client = redis.Redis.from_url(url, socket_connect_timeout=2, socket_timeout=2)
+        self.pubsub_client = redis.Redis.from_url(url, socket_connect_timeout=2, health_check_interval=30)
+        self._redis_error = redis.RedisError
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.logger = logging.getLogger(__name__)
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _data_key(self, key: str) -> str:
+        return f"{self.namespace}{key}"
+
+    def _index_key(self, tag: str) -> str:
+        return f"{self.namespace}idx:{tag}"
+
+    def _read(self, prefix, params) -> Tuple[Any, bool, Tuple[str, ...], int]:
+        try:
+            data = self.client.get(self._data_key(self._make_key(prefix, params)))
+        except self._redis_error as e:
+            self.errors += 1
+            self.logger.warning(f"Erro ao ler do cache compartilhado: {e}")
+            return None, False, (), 0
+        if data is None:
+            return None, False, (), 0
+        try:
+            tags, value, fresh_until = pickle.loads(data)
+        except Exception:
+            # Entrada gravada num formato anterior: tratada como miss e regravada pela próxima consulta
+            return None, False, (), 0
+        return value, fresh_until > time.time(), tags, len(data)
 
-    def invalidate(self, prefix):
+    def lookup_with_tags(self, prefix, params) -> Tuple[Any, bool, Tuple[str, ...], int]:
+        """
+        Como lookup, com as tags da entrada (para o L1 do TieredCache responder às mesmas invalidações) e o
+        tamanho serializado dela (para o L1 não serializar o valor de novo só para medi-lo)
+        """
+        value, fresh, tags, size = self._read(prefix, params)
+        if fresh:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return value, fresh, tags, size
+
+    def lookup(self, prefix, params):
+        return self.lookup_with_tags(prefix, params)[:2]
+
+    def set(self, prefix, params, value, ttl=None, tags=None, stale_ttl=None) -> int:
+        """Grava a entrada e retorna o tamanho serializado dela"""
+        ttl = ttl or self.default_ttl
+        keep = ttl + (self.stale_ttl if stale_ttl is None else stale_ttl)
+        data_key = self._data_key(self._make_key(prefix, params))
+        entry_tags = _entry_tags(prefix, tags)
+        data = pickle.dumps((entry_tags, value, time.time() + ttl), protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            # MULTI: a chave e as suas entradas nos índices das tags são gravadas juntas
+            pipe = self.client.pipeline()
+            pipe.set(data_key, data, ex=keep)
+            for tag in entry_tags:
+                index_key = self._index_key(tag)
+                pipe.sadd(index_key, data_key)
+                pipe.expire(index_key, keep, gt=True)
+                pipe.expire(index_key, keep, nx=True)
+            pipe.execute()
+        except self._redis_error as e:
+            self.errors += 1
+            self.logger.warning(f"Erro ao gravar no cache compartilhado: {e}")
+        return len(data)
+
+    def invalidate(self, *tags):
+        if not tags:
+            return
+        index_keys = [self._index_key(tag) for tag in tags]
+        try:
+            # Índices lidos e apagados na mesma transação: gravações concorrentes já caem em índices novos.
+            # Chaves que continuam listadas no índice de outra tag só geram um DEL sem efeito depois.
+            pipe = self.client.pipeline()
+            for index_key in index_keys:
+                pipe.smembers(index_key)
+            pipe.delete(*index_keys)
+            results = pipe.execute()
+            keys = set().union(*results[:-1])
+            if keys:
+                self.client.delete(*keys)
+        except self._redis_error as e:
+            self.errors += 1
+            self.logger.error(f"Erro ao invalidar as tags {', '.join(tags)} no cache compartilhado: {e}")
+
+    def _lead(self, prefix, params, compute, ttl, tags, stale):
+        return self.lead_locked(self, prefix, params, compute, ttl, tags, stale)
+
+    def lead_locked(self, owner: CacheBackend, prefix, params, compute, ttl, tags, stale):
+        """
+        Single-flight entre processos: calcula (gravando por meio de owner) só quem pegar a trava da chave.
+        Os demais servem o valor vencido, se houver, ou esperam o valor aparecer; se a trava sumir sem
+        valor (quem calculava falhou) ou o tempo acabar, calculam por conta própria.
+        """
+        lock_key = self._data_key(f"lock:{self._make_key(prefix, params)}")
+        token = uuid4().hex
+        try:
+            acquired = bool(self.client.set(lock_key, token, nx=True, px=int(owner.flight_timeout * 1000)))
+        except self._redis_error as e:
+            self.errors += 1
+            self.logger.warning(f"Erro ao obter a trava de cálculo do cache compartilhado: {e}")
+            return owner._compute(prefix, params, compute, ttl, tags)
+        if not acquired:
+            if stale is not None:
+                owner.stale_served += 1
+                return stale
+            deadline = time.time() + owner.flight_timeout
+            try:
+                while time.time() < deadline:
+                    time.sleep(self.POLL_INTERVAL)
+                    value, fresh, _, _ = self._read(prefix, params)
+                    if fresh:
+                        owner.coalesced += 1
+                        return value
+                    if not self.client.exists(lock_key):
+                        break
+            except self._redis_error as e:
+                self.errors += 1
+                self.logger.warning(f"Erro ao aguardar cálculo no cache compartilhado: {e}")
+            return owner._compute(prefix, params, compute, ttl, tags)
+        try:
+            return owner._compute(prefix, params, compute, ttl, tags)
+        finally:
+            try:
+                self.client.eval(self.RELEASE_SCRIPT, 1, lock_key, token)
+            except self._redis_error as e:
+                self.errors += 1
+                self.logger.warning(f"Erro ao liberar a trava de cálculo do cache compartilhado: {e}")
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=f"{self.namespace}*", count=1000))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "coalesced": self.coalesced,
+            "stale_served": self.stale_served,
+            "errors": self.errors,
+        }
+
+
+class TieredCache(CacheBackend):
+    """
+    L1 em memória (LRUCache com TTL curto) na frente do cache compartilhado. Cada invalidate é publicado
+    num canal e todos os processos inscritos descartam as tags do seu L1, então uma escrita em um worker
+    não deixa os outros servindo listas antigas. Sem a inscrição ativa (Redis fora do ar) o L1 não é usado,
+    e ao reconectar ele é esvaziado, porque mensagens podem ter sido perdidas.
+    """
+
+    def __init__(self, local: LRUCache, shared: RedisCache, channel: str) -> None:
+        super().__init__()
+        self.local = local
+        self.shared = shared
+        self.channel = channel
+        self.default_ttl = shared.default_ttl
+        self.stale_ttl = shared.stale_ttl
+        self.logger = logging.getLogger(__name__)
+        self.lock = threading.Lock()
+        # Incrementado a cada invalidação: um valor lido do compartilhado só entra no L1 se nenhuma
+        # invalidação chegou durante a leitura
+        self.epoch = 0
+        self._subscribed = False
+        self._listener: Optional[threading.Thread] = None
+        self._retry_at = 0.0
+
+    def _drop_local(self, tags: Optional[List[str]] = None) -> None:
         with self.lock:
-            keys_to_delete = [key for key in self.store if key.startswith(f"{prefix}:")]
-            for key in keys_to_delete:
-                del self.store[key]
+            self.epoch += 1
+        if tags is None:
+            self.local.clear()
+        else:
+            self.local.invalidate(*tags)
+
+    def _subscribe(self):
+        pubsub = self.shared.pubsub_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        return pubsub
+
+    def _listen(self, pubsub) -> None:
+        while True:
+            try:
+                for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._drop_local(json.loads(message["data"])["tags"])
+            except Exception as e:
+                self._subscribed = False
+                self._drop_local()
+                self.logger.warning(f"Canal de invalidação do cache desconectado: {e}")
+            while not self._subscribed:
+                time.sleep(1)
+                try:
+                    pubsub = self._subscribe()
+                    self._drop_local()
+                    self._subscribed = True
+                except Exception:
+                    continue
+
+    def _l1_enabled(self) -> bool:
+        if self._listener is None and time.time() >= self._retry_at:
+            with self.lock:
+                if self._listener is None:
+                    try:
+                        # Inscrição feita aqui, antes do primeiro valor entrar no L1
+                        pubsub = self._subscribe()
+                    except Exception as e:
+                        self._retry_at = time.time() + 5
+                        self.logger.warning(f"Sem canal de invalidação do cache, L1 desativado: {e}")
+                        return False
+                    self._subscribed = True
+                    self._listener = threading.Thread(
+                        target=self._listen, args=(pubsub,), name="cache-invalidation", daemon=True
+                    )
+                    self._listener.start()
+        return self._subscribed
+
+    def lookup(self, prefix, params):
+        l1 = self._l1_enabled()
+        if l1:
+            value, fresh = self.local.lookup(prefix, params)
+            if fresh:
+                return value, True
+        epoch = self.epoch
+        value, fresh, tags, size = self.shared.lookup_with_tags(prefix, params)
+        if l1 and fresh and self.epoch == epoch:
+            self.local.set(prefix, params, value, tags=tags, stale_ttl=0, size=size)
+        return value, fresh
+
+    def set(self, prefix, params, value, ttl=None, tags=None, stale_ttl=None):
+        size = self.shared.set(prefix, params, value, ttl, tags, stale_ttl)
+        if self._l1_enabled():
+            # Valores vencidos ficam só no compartilhado, que é o que get_or_compute consulta depois do L1
+            l1_ttl = min(ttl or self.local.default_ttl, self.local.default_ttl)
+            self.local.set(prefix, params, value, l1_ttl, tags, stale_ttl=0, size=size)
+
+    def _lead(self, prefix, params, compute, ttl, tags, stale):
+        return self.shared.lead_locked(self, prefix, params, compute, ttl, tags, stale)
+
+    def invalidate(self, *tags):
+        if not tags:
+            return
+        self._drop_local(list(tags))
+        self.shared.invalidate(*tags)
+        try:
+            self.shared.client.publish(self.channel, json.dumps({"tags": list(tags)}))
+        except self.shared._redis_error as e:
+            self.logger.error(f"Erro ao publicar invalidação das tags {', '.join(tags)}: {e}")
+
+    def clear(self) -> None:
+        self._drop_local()
+        self.shared.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "tiered",
+            "invalidation_channel": "subscribed" if self._subscribed else "disconnected",
+            "coalesced": self.coalesced,
+            "stale_served": self.stale_served,
+            "l1": self.local.stats(),
+            "shared": self.shared.stats(),
+        }
+
+
+def create_cache() -> CacheBackend:
+    local_cache = LRUCache(
+        default_ttl=settings.CACHE_DEFAULT_TTL,
+        max_entries=settings.CACHE_MAX_ENTRIES,
+        max_bytes=settings.CACHE_MAX_BYTES,
+        sweep_interval=settings.CACHE_SWEEP_INTERVAL,
+        stale_ttl=settings.CACHE_STALE_TTL
+    )
+    if settings.CACHE_BACKEND == "redis":
+        local_cache.default_ttl = settings.CACHE_L1_TTL
+        local_cache.stale_ttl = 0
+        shared = RedisCache(
+            settings.CACHE_REDIS_URL, settings.CACHE_REDIS_NAMESPACE, settings.CACHE_DEFAULT_TTL, settings.CACHE_STALE_TTL
+        )
+        return TieredCache(local_cache, shared, f"{settings.CACHE_REDIS_NAMESPACE}invalidate")
+    return local_cache
+
 
-cache = SimpleCache(default_ttl=60)
+cache = create_cache()
@@ -0,0 +1,74 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+BUFFER_SIZE = 4 * 1024 * 1024  # 4MB por leitura
+
+
+def _copy_range(src: str, dest_fd: int, offset: int, size: int) -> None:
+    """Copia `src` inteiro para `dest_fd` a partir de `offset`, sem passar os bytes pelo Python quando possível"""
+    copied = 0
+    with open(src, "rb", buffering=0) as f:
+        in_fd = f.fileno()
+        try:
+            while copied < size:
+                n = os.copy_file_range(in_fd, dest_fd, size - copied, copied, offset + copied)
+                if n == 0:
+                    break
+                copied += n
+        except (AttributeError, OSError):
+            # Kernel ou sistema de arquivos sem copy_file_range: cópia posicional com buffer reutilizado
+            view = memoryview(bytearray(BUFFER_SIZE))
+            f.seek(copied)
+            while copied < size:
+                n = f.readinto(view[:min(BUFFER_SIZE, size - copied)])
+                if not n:
+                    break
+                written = 0
+                while written < n:
+                    written += os.pwrite(dest_fd, view[written:n], offset + copied + written)
+                copied += n
+    if copied != size:
+        raise OSError(f"Arquivo {src} mudou durante a montagem")
+
+
+def _hash_files(sources: List[str]) -> str:
+    sha256_hash = hashlib.sha256()
+    view = memoryview(bytearray(BUFFER_SIZE))
+    for src in sources:
+        with open(src, "rb", buffering=0) as f:
+            while True:
+                n = f.readinto(view)
+                if not n:
+                    break
+                sha256_hash.update(view[:n])
+    return sha256_hash.hexdigest()
+
+
+def assemble_files(sources: List[str], dest: str, workers: int = 4, compute_hash: bool = True) -> Tuple[Optional[str], int]:
+    """
+    Concatena `sources` em `dest` e retorna (sha256, tamanho).
+
+    O destino é dimensionado de uma vez e cada origem é copiada no seu offset por um pool de threads
+    (copy_file_range, feito pelo kernel). Em paralelo, a thread chamadora lê as origens em ordem com
+    readinto num buffer fixo para o SHA-256; hashlib e as chamadas de E/S liberam o GIL.
+    Com compute_hash=False (hash já conhecido) só as cópias são feitas e o sha256 retornado é None.
+    """
+    sizes = [os.path.getsize(src) for src in sources]
+    total = sum(sizes)
+    fd = os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.ftruncate(fd, total)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = []
+            offset = 0
+            for src, size in zip(sources, sizes):
+                futures.append(pool.submit(_copy_range, src, fd, offset, size))
+                offset += size
+            sha256 = _hash_files(sources) if compute_hash else None
+            for future in futures:
+                future.result()
+    finally:
+        os.close(fd)
+    return sha256, total
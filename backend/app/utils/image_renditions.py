@@ -0,0 +1,72 @@
+import os
+from typing import List, Tuple
+from uuid import uuid4
+
+from PIL import Image, ImageOps
+
+try:
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+except ImportError:  # sem pillow-heif, arquivos .heic falham na abertura como formato não reconhecido
+    pass
+
+# Extensões que o Pillow consegue abrir para gerar miniaturas
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".tif", ".tiff"}
+
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+# (caminho de destino, maior lado em pixels, formato)
+RenditionTarget = Tuple[str, int, str]
+
+
+def _normalize_mode(img: Image.Image) -> Image.Image:
+    """Converte para RGB/RGBA, incluindo TIFFs de 16 bits e imagens CMYK ou com paleta"""
+    if img.mode in ("RGB", "RGBA"):
+        return img
+    if img.mode.startswith("I;16") or img.mode in ("I", "F"):
+        return img.convert("I").point(lambda value: value * (1 / 256)).convert("L").convert("RGB")
+    if img.mode in ("LA", "PA") or (img.mode == "P" and "transparency" in img.info):
+        return img.convert("RGBA")
+    return img.convert("RGB")
+
+
+def _save(img: Image.Image, dest: str, fmt: str) -> None:
+    pil_format, options = FORMATS[fmt]
+    if pil_format == "JPEG" and img.mode == "RGBA":
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        img = background
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    temp = f"{dest}.tmp.{uuid4().hex}"
+    try:
+        img.save(temp, pil_format, **options)
+        os.replace(temp, dest)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+
+
+def render_image(source: str, targets: List[RenditionTarget]) -> List[Tuple[int, int]]:
+    """
+    Gera as renditions de `source` decodificando a imagem uma única vez, da maior para a menor.
+    JPEGs são decodificados já reduzidos (draft) quando o maior alvo permite. Retorna (largura, altura)
+    de cada alvo, na ordem recebida.
+    """
+    ordered = sorted(range(len(targets)), key=lambda i: targets[i][1], reverse=True)
+    sizes: List[Tuple[int, int]] = [(0, 0)] * len(targets)
+    with Image.open(source) as original:
+        largest = targets[ordered[0]][1]
+        original.draft("RGB", (largest, largest))
+        img = _normalize_mode(ImageOps.exif_transpose(original))
+        for index in ordered:
+            dest, max_side, fmt = targets[index]
+            img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            _save(img, dest, fmt)
+            sizes[index] = img.size
+    return sizes
@@ -0,0 +1,192 @@
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+import base64
+import hashlib
+import hmac
+import json
+
+from fastapi import HTTPException
+from sqlalchemy import and_, bindparam, inspect, or_, text, tuple_
+from sqlalchemy.orm import Query
+
+from ..core.config import settings
+from .cache import cache
+from .search import RELEVANCE
+
+# Estratégias de total das listagens (parâmetro `count`)
+COUNT_MODES = ("none", "exact", "estimate")
+
+# Parâmetros que mudam a página mas não o total
+PAGE_PARAMS = ("limit", "offset", "order_by", "order_dir", "cursor", "count")
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _signature(payload: str) -> str:
+    digest = hmac.new(settings.SECRET_KEY.encode(), f"cursor:{payload}".encode(), hashlib.sha256).digest()
+    return _b64encode(digest[:16])
+
+
+def _dump_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    return value
+
+
+def _load_value(column, value: Any) -> Any:
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type in (datetime, date):
+        return python_type.fromisoformat(value)
+    return python_type(value)
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def sort_column(model, order_by: str):
+    """Coluna de ordenação pedida, ou None se order_by não for uma coluna do modelo (ordena só pelo id)"""
+    column = inspect(model).columns.get(order_by)
+    return None if column is None or column.primary_key else column
+
+
+def encode_cursor(item, model, order_by: str, order_dir: str) -> str:
+    """
+    Cursor opaco para a página seguinte a `item`: a ordenação e a chave (valor da coluna, id) do último
+    item, assinados com SECRET_KEY para que o cliente não monte cursores arbitrários
+    """
+    column = sort_column(model, order_by)
+    payload = {"o": column.key if column is not None else "id", "d": order_dir, "id": str(item.id)}
+    if column is not None:
+        payload["v"] = _dump_value(getattr(item, column.key))
+    encoded = _b64encode(json.dumps(payload, separators=(",", ":")).encode())
+    return f"{encoded}.{_signature(encoded)}"
+
+
+def decode_cursor(cursor: str, model, order_by: str, order_dir: str) -> Tuple[Any, UUID]:
+    """Valida assinatura e ordenação do cursor e devolve a chave (valor, id) do último item entregue"""
+    encoded, _, signature = cursor.partition(".")
+    # Em bytes: compare_digest recusa (TypeError) strings com caracteres fora do ASCII
+    if not hmac.compare_digest(signature.encode(), _signature(encoded).encode()):
+        raise _invalid_cursor()
+    column = sort_column(model, order_by)
+    try:
+        payload = json.loads(_b64decode(encoded))
+        if payload["o"] != (column.key if column is not None else "id") or payload["d"] != order_dir:
+            raise HTTPException(status_code=400, detail="Cursor gerado para outra ordenação")
+        value = _load_value(column, payload.get("v")) if column is not None else None
+        return value, UUID(payload["id"])
+    except (KeyError, TypeError, ValueError, NotImplementedError):
+        raise _invalid_cursor()
+
+
+def _after(column, id_column, value, last_id, descending: bool) -> list:
+    """
+    Filtros das linhas depois da chave (value, last_id) na ordem (coluna, id), em segmentos consecutivos
+    dessa ordem. Os NULLs seguem o padrão do Postgres (por último em ASC, primeiro em DESC) e ficam num
+    segmento próprio: um OR com `IS NULL` impediria a busca por faixa no índice da coluna.
+    """
+    id_after = id_column < last_id if descending else id_column > last_id
+    if column is None:
+        return [id_after]
+    if value is None:
+        same_key = and_(column.is_(None), id_after)
+        return [same_key, column.isnot(None)] if descending else [same_key]
+    key = tuple_(column, id_column)
+    bound = tuple_(bindparam(None, value, type_=column.type), bindparam(None, last_id, type_=id_column.type))
+    # O limite só na coluna permite usar o índice dela; a comparação de tuplas desempata pelo id
+    after = and_(column <= value, key < bound) if descending else and_(column >= value, key > bound)
+    if not descending and column.nullable:
+        return [after, column.is_(None)]
+    return [after]
+
+
+def _table_estimate(query: Query, model) -> Optional[int]:
+    """Linhas da tabela segundo as estatísticas do planner (pg_class.reltuples); None se nunca analisada"""
+    estimate = query.session.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": model.__tablename__}
+    ).scalar()
+    return estimate if estimate is not None and estimate >= 0 else None
+
+
+def count_total(query: Query, model, mode: str = "exact",
+                count_cache: Optional[Tuple[str, Dict[str, Any], Optional[Iterable[str]]]] = None) -> Optional[int]:
+    """
+    Total da listagem conforme o modo: "none" não conta; "estimate" usa a estimativa do planner quando a
+    consulta não tem filtros (cai para a contagem exata se tiver); "exact" conta com SELECT count(*).
+
+    Com count_cache (prefixo, parâmetros e tags da listagem), a contagem exata fica numa entrada própria do
+    cache, sem os parâmetros de página: mudar offset, ordem ou cursor reaproveita o mesmo total, e as escritas
+    que invalidam as páginas pelas tags também invalidam o total.
+    """
+    if mode == "none":
+        return None
+    if mode == "estimate" and query.whereclause is None:
+        estimate = _table_estimate(query, model)
+        if estimate is not None:
+            return estimate
+    if count_cache is None:
+        return query.count()
+    prefix, params, tags = count_cache
+    filters = {key: value for key, value in params.items() if key not in PAGE_PARAMS}
+    return cache.get_or_compute(prefix, {**filters, "total": "exact"}, query.count, tags=tags)
+
+
+def paginate(query: Query, model, limit: int, offset: int, order_by: str, order_dir: str,
+             cursor: Optional[str] = None, options: Sequence = (), count: Optional[str] = None,
+             count_cache: Optional[Tuple[str, Dict[str, Any], Optional[Iterable[str]]]] = None,
+             rank=None) -> Tuple[List[Any], Optional[int], Optional[str]]:
+    """
+    Página ordenada por (order_by, id), o que deixa a ordem estável mesmo com valores repetidos. Sem cursor,
+    pula `offset` linhas; com cursor (o next_cursor da página anterior), busca as linhas depois da chave
+    dele sem descartar as anteriores. O total segue `count` (ver count_total); sem ele, é exato nas páginas
+    por offset e não é contado nas páginas por cursor.
+
+    Com order_by=relevance e `rank` (a relevância da busca, ver utils.search), ordena por (rank, id). Essa
+    ordem só pagina por offset: a relevância é calculada na consulta e não entra no cursor.
+
+    Devolve (itens, total, next_cursor); next_cursor é None na última página.
+    """
+    id_column = inspect(model).primary_key[0]
+    descending = order_dir == "desc"
+    order = [id_column.desc() if descending else id_column.asc()]
+    if order_by == RELEVANCE and rank is not None:
+        if cursor:
+            raise HTTPException(status_code=400, detail="Ordenação por relevância não aceita cursor; use offset")
+        order.insert(0, rank.desc() if descending else rank.asc())
+        rows = query.order_by(*order).options(*options).offset(offset).limit(limit + 1).all()
+        total = count_total(query, model, count or "exact", count_cache)
+        return rows[:limit], total, None
+    column = sort_column(model, order_by)
+    if column is not None:
+        order.insert(0, column.desc() if descending else column.asc())
+    # Um item a mais indica se existe página seguinte
+    if cursor:
+        value, last_id = decode_cursor(cursor, model, order_by, order_dir)
+        rows = []
+        for segment in _after(column, id_column, value, last_id, descending):
+            rows += query.filter(segment).order_by(*order).options(*options).limit(limit + 1 - len(rows)).all()
+            if len(rows) > limit:
+                break
+    else:
+        rows = query.order_by(*order).options(*options).offset(offset).limit(limit + 1).all()
+    total = count_total(query, model, count or ("none" if cursor else "exact"), count_cache)
+    items = rows[:limit]
+    next_cursor = encode_cursor(items[-1], model, order_by, order_dir) if len(rows) > limit else None
+    return items, total, next_cursor
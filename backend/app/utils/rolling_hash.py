@@ -0,0 +1,86 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional
+
+ChunkReader = Callable[[int], Iterable[bytes]]
+
+
+class RollingHash:
+    """
+    SHA-256 do arquivo completo calculado enquanto os chunks chegam.
+
+    Só o prefixo contíguo é hasheado no caminho da requisição: o chunk que chega na vez (next_chunk)
+    alimenta o hash direto do corpo recebido. Chunks fora de ordem não são relidos durante o upload; a partir
+    do primeiro buraco o hash para de avançar e finalize() (chamado na finalização/montagem) lê o restante
+    do storage. `digests` guarda o SHA-256 de cada chunk consumido para conferir com os registrados no banco.
+
+    O estado fica na memória do processo: chunks recebidos por outro worker também só entram no finalize().
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.hasher = hashlib.sha256()
+        self.next_chunk = 1
+        self.digests: List[str] = []
+
+    def candidate(self, chunk_number: int):
+        """Cópia do estado para alimentar com o corpo do chunk, se ele for o próximo da sequência"""
+        with self.lock:
+            if chunk_number == self.next_chunk:
+                return self.hasher.copy()
+        return None
+
+    def advance(self, chunk_number: int, digest: str, candidate) -> None:
+        """Registra um chunk gravado; `candidate` é o estado retornado por candidate() já alimentado"""
+        with self.lock:
+            if candidate is not None and chunk_number == self.next_chunk:
+                self.hasher = candidate
+                self.digests.append(digest)
+                self.next_chunk += 1
+
+    def finalize(self, digests: List[str], read_chunk: ChunkReader) -> Optional[str]:
+        """
+        Completa com os chunks que faltam (fora de ordem ou recebidos por outro processo) e retorna o
+        SHA-256 final se a sequência consumida bater com os digests registrados no banco.
+        """
+        with self.lock:
+            if self.digests != digests[:self.next_chunk - 1]:
+                return None
+            for number, digest in enumerate(digests[self.next_chunk - 1:], start=self.next_chunk):
+                for data in read_chunk(number):
+                    self.hasher.update(data)
+                self.digests.append(digest)
+                self.next_chunk += 1
+            return self.hasher.hexdigest()
+
+
+class RollingHashRegistry:
+    """Estados por upload_id, em memória do processo e limitados aos mais recentes"""
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.states: "OrderedDict[str, RollingHash]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.max_entries = max_entries
+
+    def get(self, upload_id: str) -> RollingHash:
+        with self.lock:
+            state = self.states.get(upload_id)
+            if state is None:
+                state = self.states[upload_id] = RollingHash()
+                while len(self.states) > self.max_entries:
+                    self.states.popitem(last=False)
+            else:
+                self.states.move_to_end(upload_id)
+            return state
+
+    def peek(self, upload_id: str) -> Optional[RollingHash]:
+        with self.lock:
+            return self.states.get(upload_id)
+
+    def discard(self, upload_id: str) -> None:
+        with self.lock:
+            self.states.pop(upload_id, None)
+
+
+rolling_hashes = RollingHashRegistry()
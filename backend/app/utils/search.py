@@ -0,0 +1,46 @@
+from sqlalchemy import Float, func, or_
+
+# order_by que ordena pela relevância do termo buscado (as demais ordenações continuam valendo com busca)
+RELEVANCE = "relevance"
+
+
+def unaccent(expression):
+    """
+    Texto sem acentos, pela função immutable_unaccent (migration add_search_indexes). Os índices de busca
+    são sobre immutable_unaccent(coluna), então filtros e ranking usam a mesma expressão.
+    """
+    return func.immutable_unaccent(expression)
+
+
+def _like_pattern(term: str) -> str:
+    # % e _ digitados na busca são texto, não curingas
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def matches(term: str, *columns):
+    """
+    Filtro das linhas em que alguma das colunas contém o termo, sem diferenciar maiúsculas nem acentos
+    ("acao" encontra "Ação"). O ILIKE com curinga no início usa os índices GIN de trigramas (pg_trgm)
+    sobre immutable_unaccent(coluna) em vez de varrer a tabela, a partir de 3 caracteres.
+    """
+    pattern = unaccent(_like_pattern(term))
+    return or_(*(unaccent(column).ilike(pattern, escape="\\") for column in columns))
+
+
+def relevance(term: str, *columns):
+    """
+    Relevância do termo (0 a 1): a maior word_similarity entre ele e as colunas, ou seja, o quanto o termo
+    se parece com o trecho mais próximo do texto. Ordena primeiro o que começa ou coincide com o termo.
+    """
+    scores = [func.word_similarity(unaccent(term), unaccent(column)) for column in columns]
+    return scores[0] if len(scores) == 1 else func.greatest(*scores)
+
+
+def distance(term: str, column):
+    """
+    1 - relevância do termo na coluna (operador <<-> do pg_trgm). Ordenar por ela usa um índice GiST de
+    trigramas sobre immutable_unaccent(coluna), que entrega primeiro as linhas mais parecidas sem calcular a
+    relevância de todas as que contêm o termo.
+    """
+    return unaccent(term).op("<<->", return_type=Float)(unaccent(column))
@@ -0,0 +1,161 @@
+import os
+import struct
+import time
+import zlib
+from typing import Callable, Iterable, Iterator, Tuple
+
+# Formatos já comprimidos: recomprimir só gasta CPU sem reduzir tamanho
+STORED_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic",
+    ".mp4", ".mov", ".avi", ".mkv", ".webm",
+    ".zip", ".rar", ".glb",
+    ".docx", ".xlsx", ".pptx",
+}
+
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP16_LIMIT = 0xFFFF
+# Acima deste tamanho a entrada já nasce em ZIP64 (deflate pode expandir um pouco o conteúdo)
+ZIP64_ENTRY_THRESHOLD = 0x7FFFFFFF
+
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+
+METHOD_STORED = 0
+METHOD_DEFLATED = 8
+
+
+def _dos_datetime(timestamp: float) -> Tuple[int, int]:
+    t = time.localtime(timestamp)
+    year = max(t.tm_year, 1980)
+    dos_date = ((year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    return dos_time, dos_date
+
+
+def _unique_name(name: str, used: set) -> str:
+    if name not in used:
+        used.add(name)
+        return name
+    root, ext = os.path.splitext(name)
+    counter = 1
+    while f"{root}_{counter}{ext}" in used:
+        counter += 1
+    unique = f"{root}_{counter}{ext}"
+    used.add(unique)
+    return unique
+
+
+ZipEntry = Tuple[str, int, float, Callable[[], Iterable[bytes]]]
+
+
+def stream_zip(entries: Iterable[ZipEntry]) -> Iterator[bytes]:
+    """
+    Gera um arquivo ZIP em streaming a partir de tuplas (nome_no_zip, tamanho, mtime, abrir_blocos).
+
+    Cada arquivo é lido em blocos pela função `abrir_blocos` e emitido logo em seguida, usando
+    data descriptors para CRC e tamanhos, então a memória por requisição é constante
+    independente do tamanho do projeto. Formatos já comprimidos são armazenados sem deflate.
+    """
+    offset = 0
+    central_directory = []
+    used_names = set()
+
+    for arcname, file_size, mtime, open_chunks in entries:
+        name = _unique_name(arcname, used_names).encode("utf-8")
+        ext = os.path.splitext(arcname)[1].lower()
+        method = METHOD_STORED if ext in STORED_EXTENSIONS else METHOD_DEFLATED
+        zip64 = file_size > ZIP64_ENTRY_THRESHOLD
+        dos_time, dos_date = _dos_datetime(mtime)
+        flags = FLAG_DATA_DESCRIPTOR | FLAG_UTF8
+        version = 45 if zip64 else 20
+
+        if zip64:
+            extra = struct.pack("<HHQQ", 0x0001, 16, 0, 0)
+            header_sizes = (ZIP64_LIMIT, ZIP64_LIMIT)
+        else:
+            extra = b""
+            header_sizes = (0, 0)
+
+        local_header = struct.pack(
+            "<IHHHHHIIIHH",
+            0x04034B50, version, flags, method, dos_time, dos_date,
+            0, header_sizes[0], header_sizes[1], len(name), len(extra)
+        ) + name + extra
+        header_offset = offset
+        yield local_header
+        offset += len(local_header)
+
+        crc = 0
+        size = 0
+        compressed_size = 0
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15) if method == METHOD_DEFLATED else None
+
+        for data in open_chunks():
+            size += len(data)
+            crc = zlib.crc32(data, crc)
+            if compressor:
+                data = compressor.compress(data)
+                if not data:
+                    continue
+            compressed_size += len(data)
+            yield data
+        if compressor:
+            tail = compressor.flush()
+            if tail:
+                compressed_size += len(tail)
+                yield tail
+        offset += compressed_size
+
+        if zip64:
+            descriptor = struct.pack("<IIQQ", 0x08074B50, crc, compressed_size, size)
+        elif compressed_size >= ZIP64_LIMIT or size >= ZIP64_LIMIT:
+            raise ValueError(f"Arquivo cresceu durante a compactação: {arcname}")
+        else:
+            descriptor = struct.pack("<IIII", 0x08074B50, crc, compressed_size, size)
+        yield descriptor
+        offset += len(descriptor)
+
+        central_directory.append((name, version, flags, method, dos_time, dos_date, crc, compressed_size, size, header_offset))
+
+    cd_offset = offset
+    for name, version, flags, method, dos_time, dos_date, crc, compressed_size, size, header_offset in central_directory:
+        zip64_fields = []
+        if size >= ZIP64_LIMIT or version == 45:
+            zip64_fields.append(size)
+            size = ZIP64_LIMIT
+        if compressed_size >= ZIP64_LIMIT or version == 45:
+            zip64_fields.append(compressed_size)
+            compressed_size = ZIP64_LIMIT
+        if header_offset >= ZIP64_LIMIT:
+            zip64_fields.append(header_offset)
+            header_offset = ZIP64_LIMIT
+        if zip64_fields:
+            extra = struct.pack("<HH", 0x0001, 8 * len(zip64_fields)) + struct.pack(f"<{len(zip64_fields)}Q", *zip64_fields)
+            version = 45
+        else:
+            extra = b""
+
+        record = struct.pack(
+            "<IHHHHHHIIIHHHHHII",
+            0x02014B50, version, version, flags, method, dos_time, dos_date,
+            crc, compressed_size, size, len(name), len(extra), 0, 0, 0,
+            0o100644 << 16, header_offset
+        ) + name + extra
+        yield record
+        offset += len(record)
+
+    cd_size = offset - cd_offset
+    count = len(central_directory)
+
+    if count >= ZIP16_LIMIT or cd_size >= ZIP64_LIMIT or cd_offset >= ZIP64_LIMIT:
+        zip64_eocd_offset = offset
+        yield struct.pack(
+            "<IQHHIIQQQQ",
+            0x06064B50, 44, 45, 45, 0, 0, count, count, cd_size, cd_offset
+        )
+        yield struct.pack("<IIQI", 0x07064B50, 0, zip64_eocd_offset, 1)
+        count = min(count, ZIP16_LIMIT)
+        cd_size = min(cd_size, ZIP64_LIMIT)
+        cd_offset = min(cd_offset, ZIP64_LIMIT)
+
+    yield struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, count, count, cd_size, cd_offset, 0)
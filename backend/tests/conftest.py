@@ -0,0 +1,159 @@
+"""
+Configuração compartilhada dos testes.
+
+As settings obrigatórias recebem valores de teste antes de qualquer import de `app`. Testes que usam o
+banco pedem a fixture `db` e precisam de DATABASE_URL apontando para um Postgres já migrado
+(`alembic upgrade head`); sem ele são ignorados.
+"""
+import os
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("CACHE_BACKEND", "local")
+
+from datetime import date
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.exc import OperationalError
+
+
+@pytest.fixture(scope="session")
+def postgres_engine():
+    from app.core.database import engine
+
+    if engine.dialect.name != "postgresql":
+        pytest.skip("requer DATABASE_URL de um Postgres migrado (alembic upgrade head)")
+    try:
+        migrated = inspect(engine).has_table("alembic_version")
+    except OperationalError as e:
+        pytest.skip(f"Postgres de DATABASE_URL indisponível: {e}")
+    if not migrated:
+        pytest.skip("banco de DATABASE_URL sem migrations: rode alembic upgrade head")
+    return engine
+
+
+@pytest.fixture
+def db(postgres_engine):
+    from app.core.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
+class ServiceData:
+    """
+    Clientes e projetos criados pelos services, que fazem commit: cada um é registrado e removido no fim do
+    teste também pelos services, para que os contadores do dashboard e a busca não fiquem com sobras
+    """
+
+    def __init__(self, db) -> None:
+        from app.models.user import User
+
+        self.db = db
+        self.admin = db.query(User).filter(User.role == "admin").first()
+        self.client_ids, self.project_ids = [], []
+
+    def client(self, **fields):
+        from app.schemas.client import ClientCreate
+        from app.services.client_service import ClientService
+
+        key = uuid4().hex[:12]
+        data = dict(name=f"Cliente {key}", document=key, document_type="cpf", email=f"{key}@teste.com",
+                    phone="11999999999")
+        data.update(fields)
+        client = ClientService(self.db).create_client(ClientCreate(**data))
+        self.client_ids.append(client.id)
+        return client
+
+    def project(self, clients=(), user_id=None, **fields):
+        from app.schemas.project import ProjectCreate
+        from app.services.project_service import ProjectService
+
+        data = dict(name=f"Projeto {uuid4().hex[:12]}", total_value=1000, start_date=date(2025, 1, 1),
+                    estimated_end_date=date(2025, 12, 31), clients=[client.id for client in clients])
+        data.update(fields)
+        project = ProjectService(self.db).create_project(ProjectCreate(**data), user_id or self.admin.id)
+        self.project_ids.append(project.id)
+        return project
+
+    def cleanup(self) -> None:
+        from app.models.client import Client
+        from app.services.client_service import ClientService
+        from app.services.project_service import ProjectService
+        from app.services.search_index import SearchIndex
+
+        self.db.rollback()
+        for project_id in self.project_ids:
+            ProjectService(self.db).delete_project(project_id)
+        for client_id in self.client_ids:
+            client = self.db.get(Client, client_id)
+            if client is None:
+                continue
+            # Desativar tira o cliente dos contadores; a linha sai depois, com a entrada da busca
+            ClientService(self.db).delete_client(client_id)
+            self.db.delete(client)
+            SearchIndex(self.db).refresh_client(client_id)
+            self.db.commit()
+
+
+@pytest.fixture
+def service_data(db):
+    data = ServiceData(db)
+    try:
+        yield data
+    finally:
+        data.cleanup()
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    """LocalStorage em tmp_path no lugar do storage configurado, para os services e as rotas de arquivos"""
+    from app.api import files as files_api
+    from app.core.storage import LocalStorage
+    from app.services import blob_store as blob_store_module
+    from app.services import file_service as file_service_module
+
+    storage = LocalStorage(str(tmp_path / "storage"))
+    for module in (file_service_module, blob_store_module, files_api):
+        monkeypatch.setattr(module, "storage", storage)
+    return storage
+
+
+@pytest.fixture
+def client(db, storage):
+    """TestClient do app autenticado como o admin criado pelas migrations"""
+    from fastapi.testclient import TestClient
+
+    from app.core.security import create_access_token
+    from app.main import app
+    from app.models.user import User
+
+    admin = db.query(User).filter(User.role == "admin").first()
+    with TestClient(app, headers={"Authorization": f"Bearer {create_access_token(admin.id)}"}) as client:
+        yield client
+
+
+@pytest.fixture
+def tiered_cache():
+    """
+    Cria TieredCaches que simulam processos diferentes: cada um com o próprio L1 e as próprias conexões,
+    todos no mesmo servidor fakeredis (dados e pub/sub compartilhados)
+    """
+    fakeredis = pytest.importorskip("fakeredis")
+    from app.utils.cache import LRUCache, RedisCache, TieredCache
+
+    server = fakeredis.FakeServer()
+
+    def build() -> TieredCache:
+        shared = RedisCache("redis://cache-de-teste/0", namespace="teste:")
+        shared.client = fakeredis.FakeRedis(server=server)
+        shared.pubsub_client = fakeredis.FakeRedis(server=server)
+        return TieredCache(LRUCache(default_ttl=5), shared, "teste:invalidate")
+
+    return build
@@ -0,0 +1,5 @@
+"""
+Benchmarks que reproduzem os números citados nos commits. Não rodam por padrão: use
+`RUN_PERF=1 python -m pytest tests/perf -s`. Os que usam o banco precisam de DATABASE_URL apontando para
+um Postgres migrado e populado (cada módulo diz o volume esperado).
+"""
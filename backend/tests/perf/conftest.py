@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import httpx
+import pytest
+
+PERF_DIR = Path(__file__).parent
+BACKEND = PERF_DIR.parents[1]
+
+
+def pytest_collection_modifyitems(config, items):
+    if os.getenv("RUN_PERF"):
+        return
+    skip = pytest.mark.skip(reason="benchmark: rode com RUN_PERF=1")
+    for item in items:
+        if PERF_DIR in Path(item.fspath).parents:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def uvicorn_server(postgres_engine, tmp_path):
+    """
+    Sobe um worker uvicorn com o app sobre o banco de DATABASE_URL (configurações extras por variável de
+    ambiente) e devolve a URL base; o processo é encerrado ao sair do bloco
+    """
+
+    @contextmanager
+    def start(port: int, **overrides: str):
+        env = dict(os.environ, UPLOAD_DIR=str(tmp_path / "uploads"), PYTHONPATH=str(BACKEND), **overrides)
+        log = open(tmp_path / f"uvicorn_{port}.log", "w")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning",
+             "--no-access-log"],
+            cwd=BACKEND, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            for _ in range(100):
+                try:
+                    httpx.get(f"{base_url}/")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.2)
+            yield base_url
+        finally:
+            server.terminate()
+            server.wait()
+            log.close()
+
+    return start
@@ -0,0 +1,137 @@
+"""
+Popula um banco migrado (alembic upgrade head) com o volume usado nos benchmarks de listagem, busca e dashboard.
+
+Os nomes combinam palavras acentuadas de listas fixas, para que a busca sem acento e por trigramas tenha o
+que encontrar; status, valores e datas variam para que o dashboard agregue algo. Para cada projeto entram
+3 etapas e 2 tarefas, e há um cliente para cada 5 projetos. As tabelas derivadas (dashboard_rollups e
+search_entries) são reconstruídas no fim.
+
+uso: python -m tests.perf.seed [projetos] [arquivos]    (padrão: 100000 projetos, 500000 arquivos)
+"""
+import sys
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+WORDS = ["Reforma", "Ampliação", "Construção", "Fachada", "Cozinha", "Banheiro", "Escritório", "Apartamento",
+         "Residência", "Clínica", "Loja", "Galpão", "Área gourmet", "Varanda", "Iluminação", "Elétrica",
+         "Hidráulica", "Paisagismo", "Marcenaria", "Decoração"]
+NEIGHBORHOODS = ["São José", "Jardim América", "Boa Viagem", "Graças", "Espinheiro", "Casa Forte", "Piedade",
+                 "Madalena", "Aflitos", "Torre", "Tamarineira", "Pina", "Derby", "Poço da Panela", "Várzea"]
+FIRST_NAMES = ["João", "José", "Antônio", "Conceição", "Márcia", "Fábio", "Lúcia", "André", "Sérgio", "Inês", "Ana",
+               "Paulo", "Luís", "Vitória", "Joaquim", "Cecília", "Otávio", "Mônica"]
+SURNAMES = ["Araújo", "Gonçalves", "Simões", "Magalhães", "Brandão", "Assunção", "Falcão", "Leão", "Monteiro",
+            "Peixoto", "Tavares", "Guimarães", "Azevêdo", "Lima", "Melo"]
+DOCUMENTS = ["Planta baixa", "Memorial descritivo", "Orçamento", "Contrato", "Render", "Corte", "Vista",
+             "Projeto elétrico", "Projeto hidráulico", "Detalhamento", "Foto da obra", "Especificação", "Cronograma",
+             "Levantamento", "Aprovação prefeitura", "Paginação de piso", "Forro", "Luminotécnico"]
+STAGES = ["Levantamento", "Estudo preliminar", "Anteprojeto"]
+VERBS = ["Revisar", "Enviar", "Aprovar", "Medir", "Orçar", "Conferir"]
+
+# :p, :c e :f são as quantidades de projetos, clientes e arquivos e :u os :n usuários que se revezam como autores;
+# ids derivados de md5 deixam cada tabela referenciar a anterior sem junções, e a chave :k separa os ids de cada carga
+STATEMENTS = [
+    """
+    INSERT INTO stage_types (id, name, is_active, created_at, updated_at)
+    SELECT gen_random_uuid(), 'Etapa padrão', true, now(), now() WHERE NOT EXISTS (SELECT 1 FROM stage_types)
+    """,
+    """
+    INSERT INTO clients (id, name, document, document_type, email, phone, is_active, first_access, created_at, updated_at)
+    SELECT md5(:k||'c'||g)::uuid, (:first_names)[g % 18 + 1]||' '||(:surnames)[(g / 18) % 15 + 1]||' '||(:surnames)[(g / 7) % 15 + 1],
+           :k||lpad(g::text, 11, '0'), 'cpf',
+           lower(unaccent((:first_names)[g % 18 + 1]))||'.'||lower(unaccent((:surnames)[(g / 18) % 15 + 1]))||:k||g||'@email.com',
+           '0', g % 10 <> 0, true, now() - (g||' minutes')::interval, now()
+    FROM generate_series(1, :c) g
+    """,
+    """
+    INSERT INTO projects (id, name, total_value, currency, start_date, estimated_end_date, actual_end_date, status,
+                          created_at, updated_at, created_by_id)
+    SELECT md5(:k||'p'||g)::uuid, (:words)[g % 20 + 1]||' '||(:neighborhoods)[(g / 20) % 15 + 1]||' '||g,
+           (g % 997) * 100 + 0.5, 'BRL', current_date - (g % 700), current_date + (g % 300),
+           CASE WHEN g % 5 = 3 THEN current_date - (g % 400) END,
+           (ARRAY['draft','active','paused','completed','cancelled'])[g % 5 + 1]::projectstatus,
+           now() - (g||' seconds')::interval, now(), (CAST(:u AS uuid[]))[g % :n + 1]
+    FROM generate_series(1, :p) g
+    """,
+    "INSERT INTO project_clients SELECT md5(:k||'p'||g)::uuid, md5(:k||'c'||(g % :c + 1))::uuid FROM generate_series(1, :p) g",
+    """
+    INSERT INTO stages (id, name, "order", status, planned_start_date, planned_end_date, value, project_id,
+                        stage_type_id, created_by_id, created_at, updated_at)
+    SELECT md5(:k||'s'||g||'-'||k)::uuid, (:stages)[k]||' '||(:words)[(g + k) % 20 + 1], k,
+           (ARRAY['pending','in_progress','completed'])[(g + k) % 3 + 1]::stagestatus,
+           current_date - (g % 60), current_date + ((g * k) % 90), 0, md5(:k||'p'||g)::uuid,
+           (SELECT id FROM stage_types LIMIT 1), (CAST(:u AS uuid[]))[(g + k) % :n + 1], now(), now()
+    FROM generate_series(1, :p) g, generate_series(1, 3) k
+    """,
+    """
+    INSERT INTO tasks (id, title, status, priority, stage_id, created_by_id, assigned_to_id, created_at, updated_at)
+    SELECT gen_random_uuid(), (:verbs)[g % 6 + 1]||' '||lower((:documents)[g % 18 + 1])||' '||g, 'todo', 'medium',
+           md5(:k||'s'||(g % :p + 1)||'-'||(g % 3 + 1))::uuid, (CAST(:u AS uuid[]))[g % :n + 1],
+           CASE WHEN g % 2 = 0 THEN (CAST(:u AS uuid[]))[(g / 2) % :n + 1] END,
+           now() - (g||' seconds')::interval, now()
+    FROM generate_series(1, :p * 2) g
+    """,
+    """
+    INSERT INTO files (id, original_name, stored_name, path, size, mime_type, category, created_at, updated_at,
+                       project_id, client_id, stage_id, uploaded_by_id)
+    SELECT gen_random_uuid(),
+           (:documents)[g % 18 + 1]||' - '||(:words)[(g / 18) % 20 + 1]||' '||(:neighborhoods)[(g / 360) % 15 + 1]||' rev'||(g % 7)||'_'||g||'.pdf',
+           'seed_'||:k||g, '/seed/'||:k||g, (g % 6317) * 7919, 'application/pdf',
+           (ARRAY['document','image','video','plan','render','contract'])[g % 6 + 1]::filecategory,
+           now() - (g||' seconds')::interval, now(), md5(:k||'p'||(g % :p + 1))::uuid,
+           CASE WHEN g % 4 = 0 THEN md5(:k||'c'||(g % :c + 1))::uuid END,
+           CASE WHEN g % 3 = 0 THEN md5(:k||'s'||(g % :p + 1)||'-'||(g % 3 + 1))::uuid END,
+           (CAST(:u AS uuid[]))[g % :n + 1]
+    FROM generate_series(1, :f) g
+    """,
+]
+
+
+def insert_rows(db: Session, projects: int, files: int, user_ids: list, key: str = "") -> None:
+    """
+    Insere o volume na transação da sessão, sem commit, com os usuários de user_ids se revezando como autores.
+    Os ids saem de md5(key || ...), então cargas com chaves diferentes convivem no mesmo banco (os testes
+    usam uma chave própria e desfazem a transação).
+    """
+    params = {
+        "p": projects, "c": max(projects // 5, 1), "f": files, "k": key,
+        "u": [str(user_id) for user_id in user_ids], "n": len(user_ids),
+        "words": WORDS, "neighborhoods": NEIGHBORHOODS, "first_names": FIRST_NAMES, "surnames": SURNAMES,
+        "documents": DOCUMENTS, "stages": STAGES, "verbs": VERBS,
+    }
+    for statement in STATEMENTS:
+        db.execute(text(statement), params)
+
+
+def seed(db: Session, projects: int = 100_000, files: int = 500_000) -> dict:
+    """Insere o volume e reconstrói as tabelas derivadas; os dados de exemplo das migrations são mantidos"""
+    from app.models.user import User
+    from app.services.dashboard_rollups import DashboardRollups
+    from app.services.search_index import SearchIndex
+
+    if db.execute(text("SELECT EXISTS (SELECT 1 FROM projects WHERE id = md5('p1')::uuid)")).scalar():
+        raise RuntimeError("banco já populado por este script: use um banco recém-migrado")
+    admin = db.query(User).filter(User.role == "admin").first()
+    if admin is None:
+        raise RuntimeError("banco sem usuário admin: rode alembic upgrade head com ADMIN_EMAIL e ADMIN_PASSWORD")
+    insert_rows(db, projects, files, [admin.id])
+    db.commit()
+    DashboardRollups(db).rebuild()
+    SearchIndex(db).rebuild()
+    db.execute(text("ANALYZE"))
+    db.commit()
+    return {
+        table: db.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+        for table in ("clients", "projects", "stages", "tasks", "files")
+    }
+
+
+if __name__ == "__main__":
+    from app.core.database import SessionLocal
+
+    args = [int(arg) for arg in sys.argv[1:3]]
+    db = SessionLocal()
+    try:
+        print(seed(db, *args))
+    finally:
+        db.close()
@@ -0,0 +1,98 @@
+"""
+Taxa de acerto do cache numa mistura de requisições parecida com a de produção (leituras de projetos,
+arquivos, clientes e dashboard; uploads em projetos quentes e edições de clientes), repetida com semente
+fixa sobre o banco de DATABASE_URL. Os números do commit usaram 50 projetos e 50 clientes;
+PERF_REPLAY_REQUESTS muda o tamanho da mistura.
+"""
+import logging
+import os
+import random
+import time
+
+from fastapi.testclient import TestClient
+
+from app.core.security import create_access_token
+from app.core.storage import LocalStorage
+from app.models import Client, Project, User
+from app.services import blob_store as blob_store_module
+from app.services import file_service as file_service_module
+from app.utils.cache import cache
+
+REQUESTS = int(os.getenv("PERF_REPLAY_REQUESTS", "3000"))
+MIX = [(30, "projects"), (20, "files"), (12, "clients"), (12, "dashboard"), (8, "upload"), (3, "client_update")]
+
+
+def test_cache_hit_rate_on_replayed_mix(db, tmp_path, monkeypatch):
+    from app.main import app
+
+    storage = LocalStorage(str(tmp_path))
+    monkeypatch.setattr(file_service_module, "storage", storage)
+    monkeypatch.setattr(blob_store_module, "storage", storage)
+    admin = db.query(User).filter(User.role == "admin").first()
+    projects = [str(p.id) for p in db.query(Project).order_by(Project.created_at.desc())]
+    clients = [str(c.id) for c in db.query(Client).order_by(Client.name)]
+    client = TestClient(app, headers={"Authorization": f"Bearer {create_access_token(admin.id)}"})
+    rnd = random.Random(14)
+
+    def popular(items):
+        # Acesso concentrado: poucos projetos e clientes quentes
+        return rnd.choices(items, weights=[1 / (i + 1) for i in range(len(items))])[0]
+
+    ops = [op for weight, op in MIX for _ in range(weight)]
+    created_files = []
+    reads = read_hits = 0
+    timing, per_op_hits = {}, {}
+    cache.clear()
+    logging.disable(logging.INFO)
+    started = time.time()
+    try:
+        for i in range(REQUESTS):
+            op = rnd.choice(ops)
+            op_started = time.perf_counter()
+            misses_before = cache.stats().get("misses", 0)
+            if op == "projects":
+                if rnd.random() < 0.6:
+                    response = client.get(f"/projects?limit=20&offset={rnd.choice([0, 0, 0, 20])}")
+                else:
+                    response = client.get(f"/projects?limit=20&client_id={popular(clients)}")
+            elif op == "files":
+                if rnd.random() < 0.7:
+                    response = client.get(f"/files?limit=20&project_id={popular(projects)}")
+                else:
+                    response = client.get("/files?limit=20")
+            elif op == "clients":
+                response = client.get(f"/clients?limit=20&offset={rnd.choice([0, 0, 20])}")
+            elif op == "dashboard":
+                response = client.get("/dashboard")
+            elif op == "upload":
+                response = client.post("/files", files=[
+                    ("file", (f"replay_{i}.dwg", os.urandom(2048), "application/octet-stream")),
+                    ("project_id", (None, popular(projects))),
+                ])
+                created_files.append(response.json()["id"])
+            else:
+                response = client.put(f"/clients/{popular(clients)}", json={"notes": f"replay {i}"})
+            timing.setdefault(op, []).append(time.perf_counter() - op_started)
+            assert response.status_code == 200, (op, response.status_code, response.text[:200])
+            if response.request.method == "GET":
+                # Leitura servida do cache: nenhum miss durante a requisição
+                hit = cache.stats().get("misses", 0) == misses_before
+                reads += 1
+                read_hits += hit
+                counts = per_op_hits.setdefault(op, [0, 0])
+                counts[0] += hit
+                counts[1] += 1
+        elapsed = time.time() - started
+    finally:
+        logging.disable(logging.NOTSET)
+        for file_id in created_files:
+            client.delete(f"/files/{file_id}")
+
+    stats = cache.stats()
+    print(f"\n{REQUESTS} requisições ({reads} leituras) em {elapsed:.1f}s")
+    print(f"  leituras servidas do cache: {read_hits}/{reads} = {read_hits / reads:.1%}")
+    print(f"  acertos por consulta ao cache: {stats['hit_rate']:.1%} ({stats['hits']} hits / {stats['misses']} misses)")
+    for op, times in sorted(timing.items()):
+        counts = per_op_hits.get(op)
+        print(f"  {op:14s} n={len(times):4d} média={1000 * sum(times) / len(times):6.1f}ms"
+              + (f" cache={counts[0] / counts[1]:.1%}" if counts else ""))
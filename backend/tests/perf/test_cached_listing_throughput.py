@@ -0,0 +1,62 @@
+"""
+Requisições por segundo de GET /projects?limit=100 já em cache, num worker uvicorn, guardando os modelos
+(CACHE_RESPONSE_BYTES=false) ou os bytes JSON prontos, sem e com gzip. O cliente usa conexões keep-alive
+cruas para pesar pouco na mesma máquina. PERF_SECONDS e PERF_CONCURRENCY mudam a duração e as conexões.
+"""
+import asyncio
+import os
+import time
+
+import pytest
+
+from app.core.security import create_access_token
+from app.models.user import User
+
+SECONDS = float(os.getenv("PERF_SECONDS", "15"))
+CONCURRENCY = int(os.getenv("PERF_CONCURRENCY", "8"))
+PORT = int(os.getenv("PERF_PORT", "8767"))
+
+
+async def _request(reader, writer, raw: bytes):
+    writer.write(raw)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":")[1])
+    body = await reader.readexactly(length)
+    return head.split(b" ")[1], len(body)
+
+
+async def _load(raw: bytes):
+    reader, writer = await asyncio.open_connection("127.0.0.1", PORT)
+    for _ in range(20):
+        status, _ = await _request(reader, writer, raw)
+        assert status == b"200", status
+    writer.close()
+
+    sizes = []
+
+    async def worker(stop):
+        reader, writer = await asyncio.open_connection("127.0.0.1", PORT)
+        while time.time() < stop:
+            status, size = await _request(reader, writer, raw)
+            assert status == b"200", status
+            sizes.append(size)
+        writer.close()
+
+    started = time.time()
+    await asyncio.gather(*(worker(started + SECONDS) for _ in range(CONCURRENCY)))
+    return len(sizes) / (time.time() - started), sizes[0]
+
+
+@pytest.mark.parametrize("response_bytes, encoding", [("false", "identity"), ("true", "identity"), ("true", "gzip")])
+def test_cached_projects_page_throughput(db, uvicorn_server, response_bytes, encoding):
+    admin = db.query(User).filter(User.role == "admin").first()
+    raw = (f"GET /projects?limit=100 HTTP/1.1\r\nHost: bench\r\nAuthorization: Bearer {create_access_token(admin.id)}"
+           f"\r\nAccept-Encoding: {encoding}\r\n\r\n").encode()
+    with uvicorn_server(PORT, CACHE_BACKEND="local", CACHE_RESPONSE_BYTES=response_bytes):
+        rate, size = asyncio.run(_load(raw))
+    print(f"\nCACHE_RESPONSE_BYTES={response_bytes} Accept-Encoding={encoding}: {rate:.1f} req/s, "
+          f"{size} bytes por resposta, {CONCURRENCY} conexões")
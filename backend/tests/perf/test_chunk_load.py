@@ -0,0 +1,88 @@
+"""
+Carga de chunks concorrentes num único upload: PERF_CHUNKS chunks de PERF_CHUNK_KB KB enviados por PUT com
+PERF_CHUNK_CONCURRENCY requisições simultâneas (padrão 8 e 16), com um worker uvicorn sobre o banco de
+DATABASE_URL. Cada 10º chunk é enviado três vezes ao mesmo tempo; respostas diferentes de 200 são
+contadas por status e o chunk é reenviado. Mede chunks/s e p95 e confere o hash do arquivo montado.
+"""
+import asyncio
+import hashlib
+import os
+import time
+
+import httpx
+import pytest
+
+from app.core.security import create_access_token
+from app.models.file import File
+from app.models.user import User
+
+CHUNKS = int(os.getenv("PERF_CHUNKS", "160"))
+CHUNK_KB = int(os.getenv("PERF_CHUNK_KB", "256"))
+CONCURRENCY = [int(c) for c in os.getenv("PERF_CHUNK_CONCURRENCY", "8,16").split(",")]
+PORT = int(os.getenv("PERF_PORT", "8768"))
+MAX_ATTEMPTS = 5
+
+
+async def _upload(base_url, headers, chunks, concurrency):
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=120,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        started = await client.post("/files/chunked/initiate", json={
+            "filename": f"carga_{concurrency}.pdf", "total_chunks": len(chunks), "chunk_size": len(chunks[0]),
+            "total_size": sum(len(chunk) for chunk in chunks), "mime_type": "application/pdf",
+        })
+        assert started.status_code == 200, started.text
+        upload_id = started.json()["upload_id"]
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies, statuses, digests = [], {}, {}
+        retries = 0
+
+        async def send(number):
+            nonlocal retries
+            chunk = chunks[number - 1]
+            for attempt in range(MAX_ATTEMPTS):
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.put(
+                        f"/files/chunked/{upload_id}/chunk/{number}", content=chunk,
+                        headers={"X-Chunk-Checksum": hashlib.sha256(chunk).hexdigest()}
+                    )
+                    latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if response.status_code == 200:
+                    digests.setdefault(number, set()).add(response.json()["checksum"])
+                    return
+                retries += 1
+                await asyncio.sleep(0.05 * (attempt + 1))
+            raise AssertionError(f"chunk {number} recusado {MAX_ATTEMPTS} vezes: {response.text}")
+
+        # Cada 10º chunk é enviado três vezes em paralelo, como um cliente que reenvia por timeout
+        sends = [number for number in range(1, len(chunks) + 1) for _ in range(3 if number % 10 == 0 else 1)]
+        start = time.perf_counter()
+        await asyncio.gather(*(send(number) for number in sends))
+        elapsed = time.perf_counter() - start
+
+        completed = await client.post(f"/files/chunked/{upload_id}/complete")
+        assert completed.status_code == 200, completed.text
+        return completed.json()["final_file_id"], elapsed, len(sends), latencies, statuses, retries, digests
+
+
+@pytest.mark.parametrize("concurrency", CONCURRENCY)
+def test_concurrent_chunks_of_one_upload(db, uvicorn_server, concurrency):
+    admin = db.query(User).filter(User.role == "admin").first()
+    headers = {"Authorization": f"Bearer {create_access_token(admin.id)}"}
+    chunks = [os.urandom(CHUNK_KB * 1024) for _ in range(CHUNKS)]
+    with uvicorn_server(PORT) as base_url:
+        file_id, elapsed, sent, latencies, statuses, retries, digests = asyncio.run(
+            _upload(base_url, headers, chunks, concurrency)
+        )
+        latencies.sort()
+        print(f"\nc={concurrency}: {sent} PUTs de {CHUNK_KB}KB em {elapsed:.1f}s, {sent / elapsed:.1f} chunks/s, "
+              f"p95 {latencies[int(len(latencies) * .95)] * 1000:.0f}ms, status={statuses}, retries={retries}")
+        try:
+            # Duplicatas respondem com o digest gravado, igual ao do chunk
+            assert all(digests[n] == {hashlib.sha256(chunks[n - 1]).hexdigest()} for n in range(1, CHUNKS + 1))
+            file = db.get(File, file_id)
+            assert file.size == CHUNK_KB * 1024 * CHUNKS
+            assert file.content_hash == hashlib.sha256(b"".join(chunks)).hexdigest()
+        finally:
+            httpx.delete(f"{base_url}/files/{file_id}", headers=headers)
@@ -0,0 +1,55 @@
+"""
+Página PERF_PAGE (padrão 500, 20 itens) de FileService.get_files por offset e pelo cursor equivalente, em
+quatro ordenações, sem cache e sem contagem (count=none nos dois lados, para medir só a página), mediana
+de PERF_PAGINATION_RUNS execuções sobre o banco de DATABASE_URL. Os números do commit usaram 1 milhão de
+arquivos (`python -m tests.perf.seed 100000 1000000`).
+"""
+import logging
+import os
+import statistics
+import time
+
+import pytest
+
+from app.models import File
+from app.services.file_service import FileService
+from app.utils.cache import cache
+from app.utils.pagination import encode_cursor
+
+LIMIT = 20
+PAGE = int(os.getenv("PERF_PAGE", "500"))
+RUNS = int(os.getenv("PERF_PAGINATION_RUNS", "5"))
+
+
+def _timed(db, service, **kwargs):
+    times = []
+    for _ in range(RUNS):
+        cache.clear()
+        db.expunge_all()
+        started = time.perf_counter()
+        page = service.get_files(LIMIT, kwargs.get("offset", 0), kwargs["order_by"], kwargs["order_dir"],
+                                 None, None, None, None, None, None, cursor=kwargs.get("cursor"), count="none")
+        times.append((time.perf_counter() - started) * 1000)
+    return page, statistics.median(times)
+
+
+@pytest.mark.parametrize("order_by, order_dir", [
+    ("created_at", "desc"), ("created_at", "asc"), ("size", "desc"), ("description", "asc"),
+])
+def test_offset_and_cursor_return_the_same_page(db, order_by, order_dir):
+    offset = LIMIT * (PAGE - 1)
+    column = getattr(File, order_by)
+    ordering = (column.desc(), File.id.desc()) if order_dir == "desc" else (column.asc(), File.id.asc())
+    previous = db.query(File).order_by(*ordering).offset(offset - 1).limit(1).one_or_none()
+    if previous is None:
+        pytest.skip(f"banco com menos de {offset} arquivos")
+    cursor = encode_cursor(previous, File, order_by, order_dir)
+    service = FileService(db)
+    logging.disable(logging.INFO)
+    try:
+        by_offset, offset_ms = _timed(db, service, offset=offset, order_by=order_by, order_dir=order_dir)
+        by_cursor, cursor_ms = _timed(db, service, cursor=cursor, order_by=order_by, order_dir=order_dir)
+    finally:
+        logging.disable(logging.NOTSET)
+    print(f"\n{order_by} {order_dir:4s} página {PAGE}: offset {offset_ms:8.1f} ms  cursor {cursor_ms:8.1f} ms")
+    assert [item.id for item in by_cursor.items] == [item.id for item in by_offset.items]
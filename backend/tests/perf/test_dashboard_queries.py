@@ -0,0 +1,61 @@
+"""
+Consultas e latência do dashboard calculado pelas seções agregadas (SECTIONS), chamadas direto, sem cache,
+sobre o banco de DATABASE_URL; a leitura pela tabela dashboard_rollups entra na mesma tabela para
+comparação. Os números do commit usaram 100 mil projetos, 300 mil etapas e 20 mil clientes
+(`python -m tests.perf.seed`). PERF_DASHBOARD_RUNS muda o número de repetições (mediana).
+"""
+import logging
+import os
+import statistics
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+
+from app.services import dashboard_service
+from app.utils.cache import cache
+
+RUNS = int(os.getenv("PERF_DASHBOARD_RUNS", "20"))
+
+
+def _measure(db, build):
+    times, statements = [], 0
+    for _ in range(RUNS):
+        db.expire_all()
+        cache.clear()
+        counter = [0]
+
+        def count(*args):
+            counter[0] += 1
+
+        event.listen(db.get_bind(), "before_cursor_execute", count)
+        started = time.perf_counter()
+        try:
+            build()
+        finally:
+            times.append((time.perf_counter() - started) * 1000)
+            event.remove(db.get_bind(), "before_cursor_execute", count)
+        statements = counter[0]
+    return statements, statistics.median(times)
+
+
+def test_dashboard_statements_and_latency(db):
+    now = datetime.now(timezone.utc)
+    logging.disable(logging.INFO)
+    try:
+        results = {
+            f"seção {name}": _measure(db, lambda build=build: build(db, now))
+            for name, build in dashboard_service.SECTIONS.items()
+        }
+        results["todas as seções"] = _measure(
+            db, lambda: [build(db, now) for build in dashboard_service.SECTIONS.values()]
+        )
+        results["dashboard_rollups"] = _measure(db, lambda: dashboard_service._rollup_dashboard(db, now))
+    finally:
+        logging.disable(logging.NOTSET)
+    print()
+    for name, (statements, median) in results.items():
+        print(f"{name:20s} {statements:3d} consultas  mediana {median:8.1f} ms")
+    # Cada seção é um número fixo de consultas agregadas, que não cresce com o número de projetos
+    # (o cálculo anterior, por projeto, fazia 22)
+    assert results["todas as seções"][0] <= 6
@@ -0,0 +1,60 @@
+"""
+Buscas textuais das listagens (arquivos, projetos, clientes e tarefas) chamadas pelos services, com o
+cache vazio, sobre o banco de DATABASE_URL: mediana de PERF_SEARCH_RUNS execuções, descartada a primeira.
+PERF_SEARCH_ORDER escolhe a ordenação (created_at ou relevance). Os números do commit usaram 500 mil
+arquivos, 100 mil projetos, 20 mil clientes e 200 mil tarefas (`python -m tests.perf.seed`).
+"""
+import logging
+import os
+import statistics
+import time
+
+import pytest
+
+from app.services.client_service import ClientService
+from app.services.file_service import FileService
+from app.services.project_service import ProjectService
+from app.services.task_service import TaskService
+from app.utils.cache import cache
+
+RUNS = int(os.getenv("PERF_SEARCH_RUNS", "6"))
+ORDER = os.getenv("PERF_SEARCH_ORDER", "created_at")
+
+
+def _files(text):
+    return lambda db: FileService(db).get_files(20, 0, ORDER, "desc", text, None, None, None, None, None)
+
+
+CASES = {
+    "arquivos 'Orçamento'": _files("Orçamento"),
+    "arquivos 'orcamento'": _files("orcamento"),
+    "arquivos 'hidráulico - Cozinha Casa Forte'": _files("hidráulico - Cozinha Casa Forte"),
+    "arquivos 'rev5_123457'": _files("rev5_123457"),
+    "arquivos 'xyzw' (nenhum)": _files("xyzw"),
+    "projetos search 'Graças 4'": lambda db: ProjectService(db).get_projects(
+        20, 0, ORDER, "desc", None, None, None, None, None, None, None, "Graças 4"),
+    "projetos stage_name 'preliminar Marcen'": lambda db: ProjectService(db).get_projects(
+        20, 0, ORDER, "desc", None, None, None, None, "preliminar Marcen", None, None, None),
+    "clientes 'Gonçalves Leão'": lambda db: ClientService(db).get_clients(20, 0, ORDER, "desc", "Gonçalves Leão", None),
+    "clientes e-mail 'joao.araujo1'": lambda db: ClientService(db).get_clients(20, 0, ORDER, "desc", "joao.araujo1", None),
+    "tarefas 'orcar foto da obra 1'": lambda db: TaskService(db).get_tasks(
+        20, 0, ORDER, "desc", "orcar foto da obra 1", None, None, None, None, None, None),
+}
+
+
+@pytest.mark.parametrize("name", list(CASES))
+def test_search_latency(db, name):
+    times = []
+    logging.disable(logging.INFO)
+    try:
+        for _ in range(RUNS):
+            cache.clear()
+            db.expunge_all()
+            started = time.perf_counter()
+            page = CASES[name](db)
+            times.append((time.perf_counter() - started) * 1000)
+    finally:
+        logging.disable(logging.NOTSET)
+    first = page.items[0] if page.items else None
+    label = next((getattr(first, field) for field in ("original_name", "name", "title") if hasattr(first, field)), None)
+    print(f"\n{name:42s} mediana {statistics.median(times[1:]):8.1f} ms  total {page.total}  primeiro {label}")
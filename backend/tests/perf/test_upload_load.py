@@ -0,0 +1,73 @@
+"""
+Latência de GET /projects enquanto PERF_UPLOADS uploads de PERF_UPLOAD_MB MB chegam por POST /files
+(multipart), com um worker uvicorn sobre o banco de DATABASE_URL. Compara com a latência ociosa.
+"""
+import asyncio
+import os
+import time
+
+import httpx
+
+from app.core.security import create_access_token
+from app.models.project import Project
+from app.models.user import User
+
+UPLOADS = int(os.getenv("PERF_UPLOADS", "50"))
+UPLOAD_MB = int(os.getenv("PERF_UPLOAD_MB", "20"))
+PORT = int(os.getenv("PERF_PORT", "8766"))
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+
+async def _run(base_url, headers, project_id, payloads):
+    limits = httpx.Limits(max_connections=UPLOADS + 10)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=300,
+                                 limits=limits) as client:
+        idle = []
+        for _ in range(30):
+            start = time.perf_counter()
+            await client.get("/projects")
+            idle.append(time.perf_counter() - start)
+
+        done = asyncio.Event()
+        codes = {}
+
+        async def upload(i):
+            response = await client.post("/files", files=[
+                ("file", (f"carga_{i}.pdf", payloads[i], "application/pdf")), ("project_id", (None, project_id))
+            ])
+            codes[response.status_code] = codes.get(response.status_code, 0) + 1
+
+        async def probe():
+            latencies = []
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/projects")
+                latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.05)
+            return latencies
+
+        started = time.perf_counter()
+        probing = asyncio.create_task(probe())
+        await asyncio.gather(*(upload(i) for i in range(UPLOADS)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        busy = await probing
+    return idle, busy, elapsed, codes
+
+
+def test_projects_latency_during_uploads(db, uvicorn_server):
+    admin = db.query(User).filter(User.role == "admin").first()
+    project = db.query(Project).first()
+    headers = {"Authorization": f"Bearer {create_access_token(admin.id)}"}
+    payloads = [os.urandom(UPLOAD_MB * 1024 * 1024) for _ in range(UPLOADS)]
+    with uvicorn_server(PORT) as base_url:
+        idle, busy, elapsed, codes = asyncio.run(_run(base_url, headers, str(project.id), payloads))
+
+    print(f"\nocioso /projects p50={_pct(idle, .5):.0f}ms p99={_pct(idle, .99):.0f}ms | "
+          f"durante {UPLOADS}x{UPLOAD_MB}MB ({elapsed:.1f}s, status={codes}): n={len(busy)} "
+          f"p50={_pct(busy, .5):.0f}ms p99={_pct(busy, .99):.0f}ms max={max(busy) * 1000:.0f}ms")
+    assert codes == {200: UPLOADS}
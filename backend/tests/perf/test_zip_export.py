@@ -0,0 +1,70 @@
+"""
+Exportação ZIP de um projeto com 200 arquivos: tempo até o primeiro byte e pico de memória do caminho
+antigo (ZipFile num BytesIO com ZIP_DEFLATED) contra stream_zip. PERF_ZIP_FILES e PERF_ZIP_FILE_MB
+mudam o volume.
+"""
+import io
+import os
+import time
+import tracemalloc
+import zipfile
+
+from app.utils.zip_stream import stream_zip
+
+FILES = int(os.getenv("PERF_ZIP_FILES", "200"))
+FILE_MB = int(os.getenv("PERF_ZIP_FILE_MB", "2"))
+EXTENSIONS = (".jpg", ".mp4", ".pdf", ".dwg")
+
+
+def _project(tmp_path):
+    paths = []
+    for i in range(FILES):
+        path = tmp_path / f"arquivo_{i}{EXTENSIONS[i % len(EXTENSIONS)]}"
+        # Metade aleatória (não comprime), metade repetitiva
+        path.write_bytes(os.urandom(FILE_MB * 512 * 1024) + b"A" * (FILE_MB * 512 * 1024))
+        paths.append(path)
+    return paths
+
+
+def _buffered(paths):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for path in paths:
+            zf.write(path, path.name)
+    buffer.seek(0)
+    while block := buffer.read(64 * 1024):
+        yield block
+
+
+def _streamed(paths):
+    def entry(path):
+        def chunks():
+            with open(path, "rb") as f:
+                while block := f.read(64 * 1024):
+                    yield block
+        return path.name, os.path.getsize(path), os.path.getmtime(path), chunks
+
+    return stream_zip(entry(path) for path in paths)
+
+
+def _measure(stream):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first_byte = None
+    total = 0
+    for block in stream:
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        total += len(block)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first_byte, elapsed, peak, total
+
+
+def test_zip_export_ttfb_and_peak_memory(tmp_path):
+    paths = _project(tmp_path)
+    for name, stream in (("BytesIO + deflate", _buffered(paths)), ("stream_zip", _streamed(paths))):
+        first_byte, elapsed, peak, total = _measure(stream)
+        print(f"\n{name:18s} TTFB {first_byte * 1000:8.1f} ms  total {elapsed:6.2f} s  "
+              f"pico {peak / 1024 / 1024:8.1f} MB  zip {total / 1024 / 1024:.0f} MB")
@@ -0,0 +1,75 @@
+"""
+Apoio dos testes de consultas das listagens (orçamento de comandos SQL e planos de execução): um registro
+dos comandos executados no engine e uma carga de dados na transação do teste, desfeita pela fixture `db`.
+"""
+import hashlib
+from types import SimpleNamespace
+from typing import List, Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+from app.models import Client, Project, Stage, User
+from tests.perf.seed import insert_rows
+
+
+class QueryRecorder:
+    """Registra os comandos SQL executados num engine, com os parâmetros, enquanto o bloco `with` está ativo"""
+
+    def __init__(self, engine: Engine) -> None:
+        self.engine = engine
+        self.statements: List[Tuple[str, object]] = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.statements.append((statement, parameters))
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def selects(self) -> List[Tuple[str, object]]:
+        return [(s, p) for s, p in self.statements if s.lstrip().upper().startswith("SELECT")]
+
+    def __enter__(self) -> "QueryRecorder":
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def _seed_id(key: str, name: str) -> UUID:
+    # Mesmo esquema de ids de tests.perf.seed: md5(chave || nome)
+    return UUID(hashlib.md5(f"{key}{name}".encode()).hexdigest())
+
+
+def seed_list_data(db, projects: int, files: int, users: int = 1) -> SimpleNamespace:
+    """
+    Insere na transação de `db`, com a carga de tests.perf.seed, `projects` projetos (um cliente para cada 5,
+    3 etapas e 2 tarefas por projeto) e `files` arquivos. Os autores são `users` usuários criados aqui, o
+    primeiro deles admin. O primeiro cliente também é vinculado aos 100 primeiros projetos, para que as
+    listagens por cliente tenham páginas cheias sem que um só cliente passe do lote de 500 chaves do selectin.
+    """
+    key = uuid4().hex[:8]
+    authors = [
+        User(name=f"Usuário dos testes {i}", email=f"usuario{i}.{key}@teste.com", username=f"usuario{i}_{key}",
+             password_hash="-", role="admin" if i == 0 else "architect")
+        for i in range(users)
+    ]
+    db.add_all(authors)
+    db.flush()
+    admin = authors[0]
+    insert_rows(db, projects, files, [author.id for author in authors], key)
+    db.execute(text(
+        "INSERT INTO project_clients SELECT md5(:k||'p'||g)::uuid, md5(:k||'c1')::uuid "
+        "FROM generate_series(1, least(:p, 100)) g ON CONFLICT DO NOTHING"
+    ), {"k": key, "p": projects})
+    return SimpleNamespace(
+        admin=admin,
+        client=db.get(Client, _seed_id(key, "c1")),
+        project=db.get(Project, _seed_id(key, "p1")),
+        stage=db.get(Stage, _seed_id(key, "s1-1")),
+    )
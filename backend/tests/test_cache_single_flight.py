@@ -0,0 +1,96 @@
+import threading
+import time
+
+from app.utils.cache import LRUCache
+
+KEY = ("projects", {"limit": 20})
+THREADS = 16
+
+
+def _blocking_load(value):
+    """load que só termina quando `release` é sinalizado; conta as chamadas e avisa quando começa"""
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def load():
+        calls.append(threading.get_ident())
+        started.set()
+        assert release.wait(5)
+        return value
+
+    return load, started, release, calls
+
+
+def _run(threads_count, target):
+    results = [None] * threads_count
+    barrier = threading.Barrier(threads_count)
+
+    def worker(i):
+        barrier.wait()
+        results[i] = target(i)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_concurrent_misses_on_cold_key_run_load_once():
+    cache = LRUCache(default_ttl=60)
+    load, started, release, calls = _blocking_load(["Projeto"])
+    threads, results = _run(THREADS, lambda i: cache.get_or_compute(*KEY, load))
+    assert started.wait(5)
+    # Dá tempo para as demais threads chegarem e ficarem esperando o cálculo em andamento
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [["Projeto"]] * THREADS
+    assert cache.coalesced == THREADS - 1
+    assert cache.get(*KEY) == ["Projeto"]
+
+
+def test_callers_get_stale_value_while_leader_refreshes():
+    cache = LRUCache(default_ttl=60, stale_ttl=60)
+    cache.set(*KEY, ["Antigo"], ttl=0.05)
+    time.sleep(0.1)
+    assert cache.get(*KEY) is None
+
+    load, started, release, calls = _blocking_load(["Novo"])
+    leader = threading.Thread(target=lambda: cache.get_or_compute(*KEY, load))
+    leader.start()
+    assert started.wait(5)
+
+    # Com o líder ainda bloqueado, as demais chamadas terminam com o valor vencido em vez de esperar
+    threads, results = _run(THREADS, lambda i: cache.get_or_compute(*KEY, load))
+    for thread in threads:
+        thread.join(5)
+        assert not thread.is_alive()
+    assert results == [["Antigo"]] * THREADS
+    assert cache.stale_served == THREADS
+
+    release.set()
+    leader.join(5)
+    # O recálculo roda na thread do líder (que usa a sessão da própria requisição), não em segundo plano
+    assert calls == [leader.ident]
+    assert cache.get_or_compute(*KEY, load) == ["Novo"]
+    assert len(calls) == 1
+
+
+def test_cold_key_is_computed_once_across_processes(tiered_cache):
+    # Cada TieredCache faz o papel de um processo: o single-flight local não basta, a trava fica no Redis
+    processes = [tiered_cache() for _ in range(4)]
+    load, started, release, calls = _blocking_load(["Projeto"])
+    threads, results = _run(len(processes), lambda i: processes[i].get_or_compute(*KEY, load))
+    assert started.wait(5)
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [["Projeto"]] * len(processes)
+    assert sum(process.coalesced for process in processes) == len(processes) - 1
@@ -0,0 +1,55 @@
+import pickle
+from typing import ClassVar, List
+
+from pydantic import BaseModel
+
+from app.utils import cache as cache_module
+from app.utils.cache import EncodedJSON, LRUCache
+
+
+class Item(BaseModel):
+    name: str
+
+
+class Page(BaseModel):
+    items: List[Item]
+
+
+class CountingPage(Page):
+    dumps: ClassVar[int] = 0
+
+    def model_dump_json(self, **kwargs):
+        CountingPage.dumps += 1
+        return super().model_dump_json(**kwargs)
+
+
+def _no_estimate(value):
+    raise AssertionError(f"valor serializado de novo só para medir: {type(value).__name__}")
+
+
+def test_encoded_response_is_serialized_once():
+    cache = LRUCache()
+    CountingPage.dumps = 0
+    page = CountingPage(items=[Item(name=f"Projeto {i}") for i in range(50)])
+    encoded = cache.get_or_compute_json("projects", {"limit": 50}, lambda: page)
+    assert CountingPage.dumps == 1
+    assert cache.bytes == len(encoded.body) + len(encoded.gzipped or b"")
+    assert cache.get_or_compute_json("projects", {"limit": 50}, lambda: page) is encoded
+    assert CountingPage.dumps == 1
+
+
+def test_tiered_cache_sizes_l1_entries_from_the_shared_bytes(tiered_cache, monkeypatch):
+    tiered = tiered_cache()
+    other = tiered_cache()
+    shared = tiered.shared
+    value = EncodedJSON(b'{"items": []}' * 100, None, 'W/"x"')
+
+    monkeypatch.setattr(cache_module, "estimate_size", _no_estimate)
+    tiered.set("projects", {"limit": 20}, value, tags=["projects:all"])
+    stored = shared.client.get(shared._data_key(shared._make_key("projects", {"limit": 20})))
+    assert tiered.local.bytes == len(stored)
+    assert len(stored) > len(value.body)
+    # O L1 de outro processo é preenchido na leitura com o tamanho do que veio do compartilhado
+    assert other.get("projects", {"limit": 20}).body == value.body
+    assert other.local.bytes == len(stored)
+    assert pickle.loads(stored)[1].body == value.body
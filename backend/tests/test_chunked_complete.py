@@ -0,0 +1,116 @@
+import hashlib
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from fastapi import BackgroundTasks
+
+from app.core.database import SessionLocal
+from app.core.storage import LocalStorage
+from app.models.chunked_upload import ChunkedUpload, ChunkedUploadChunk
+from app.models.file import File
+from app.models.user import User
+from app.services import blob_store as blob_store_module
+from app.services import file_service as file_service_module
+from app.services.file_service import FileService, assemble_upload_job
+
+CALLERS = 8
+CHUNKS = [os.urandom(64 * 1024) for _ in range(4)]
+
+
+@pytest.fixture
+def upload(db, tmp_path, monkeypatch):
+    storage = LocalStorage(str(tmp_path))
+    monkeypatch.setattr(file_service_module, "storage", storage)
+    monkeypatch.setattr(blob_store_module, "storage", storage)
+    admin = db.query(User).filter(User.role == "admin").first()
+    upload = ChunkedUpload(
+        upload_id=f"{uuid4().hex}_teste", filename="memorial.pdf", total_chunks=len(CHUNKS),
+        chunk_size=len(CHUNKS[0]), total_size=sum(len(chunk) for chunk in CHUNKS),
+        file_checksum=hashlib.sha256(b"".join(CHUNKS)).hexdigest(), mime_type="application/pdf",
+        uploaded_by_id=admin.id, expires_at=datetime.now(timezone.utc) + timedelta(hours=1)
+    )
+    db.add(upload)
+    db.flush()
+    for number, data in enumerate(CHUNKS, start=1):
+        storage.put_bytes(f"temp_chunks/{upload.upload_id}/chunk_{number:06d}", data)
+        db.add(ChunkedUploadChunk(upload_id=upload.id, chunk_number=number, size=len(data),
+                                  sha256=hashlib.sha256(data).hexdigest()))
+    db.commit()
+    yield upload
+
+    db.expire_all()
+    # Pelo service, que também solta o blob e tira o arquivo da busca
+    for file in db.query(File).filter(File.content_hash == upload.file_checksum).all():
+        FileService(db).delete_file(str(file.id))
+    db.delete(upload)
+    db.commit()
+
+
+def _complete_in_parallel(upload_id, with_background_tasks):
+    """Dispara CALLERS complete_upload ao mesmo tempo, cada um com a própria sessão"""
+    barrier = threading.Barrier(CALLERS)
+    results = []
+
+    def call():
+        db = SessionLocal()
+        try:
+            actor = db.query(User).filter(User.role == "admin").first()
+            tasks = BackgroundTasks() if with_background_tasks else None
+            barrier.wait()
+            response = FileService(db).complete_upload(upload_id, actor, lambda *args: None, tasks)
+            results.append((response, tasks))
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=call) for _ in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == CALLERS
+    return results
+
+
+def _count_calls(monkeypatch, name):
+    calls = []
+    original = getattr(FileService, name)
+
+    def counted(self, *args, **kwargs):
+        calls.append(args)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(FileService, name, counted)
+    return calls
+
+
+def test_parallel_complete_assembles_once(db, upload, monkeypatch):
+    merges = _count_calls(monkeypatch, "_merge_chunks")
+    results = _complete_in_parallel(upload.upload_id, with_background_tasks=False)
+
+    assert len(merges) == 1
+    file_ids = {response.final_file_id for response, _ in results if response.final_file_id}
+    assert len(file_ids) == 1
+    # Quem perdeu a reserva recebe "em montagem" ou, se chegou depois, o upload já completado
+    assert all(response.final_file_id or response.status == "assembling" for response, _ in results)
+    db.expire_all()
+    assert db.query(File).filter(File.content_hash == upload.file_checksum).count() == 1
+
+
+def test_parallel_complete_schedules_one_background_assembly(db, upload, monkeypatch):
+    assemblies = _count_calls(monkeypatch, "assemble_upload")
+    results = _complete_in_parallel(upload.upload_id, with_background_tasks=True)
+
+    scheduled = [task for _, tasks in results for task in tasks.tasks]
+    assert len(scheduled) == 1
+    assert scheduled[0].func is assemble_upload_job
+    assert sum(response.message == "Montagem do arquivo iniciada" for response, _ in results) == 1
+    assert assemblies == []
+
+    scheduled[0].func(*scheduled[0].args)
+    assert assemblies == [(upload.upload_id,)]
+    db.refresh(upload)
+    assert upload.is_completed and upload.status == "completed"
+    assert db.query(File).filter(File.content_hash == upload.file_checksum).count() == 1
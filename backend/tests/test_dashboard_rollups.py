@@ -0,0 +1,90 @@
+"""
+Contadores do dashboard (dashboard_rollups) depois de escritas pelos services: cada escrita aplica a sua
+diferença na própria transação, então `check` continua batendo com o recálculo completo.
+
+Um banco que já diverge (SQL manual, scripts) não reprova o teste: ele compara a divergência de cada bucket
+(guardado menos esperado) antes e depois das escritas, e uma escrita que esquece de aplicar a diferença
+muda essa divergência.
+"""
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Tuple
+
+from app.schemas.client import ClientUpdate
+from app.schemas.project import ProjectUpdate, StageUpdateForProject
+from app.services.client_service import ClientService
+from app.services.dashboard_rollups import COMPLETED_REVENUE, OPEN_STAGES_DUE, DashboardRollups
+from app.services.project_service import ProjectService
+
+
+def _drift(db) -> Dict[Tuple[str, str], Tuple[int, Decimal]]:
+    """Divergência de cada bucket entre a tabela e o recálculo, lidos no mesmo snapshot"""
+    db.rollback()
+    result = DashboardRollups(db).check()
+    db.rollback()
+    return {
+        (d["metric"], d["bucket"]): (d["stored"][0] - d["expected"][0], d["stored"][1] - d["expected"][1])
+        for d in result["differences"]
+    }
+
+
+def _stage_update(stage, **fields) -> StageUpdateForProject:
+    data = dict(id=stage.id, stage_type_id=stage.stage_type_id, order=stage.order, status=stage.status,
+                planned_start_date=stage.planned_start_date, planned_end_date=stage.planned_end_date)
+    data.update(fields)
+    return StageUpdateForProject(**data)
+
+
+def test_project_writes_keep_rollups_consistent(db, service_data):
+    baseline = _drift(db)
+    client = service_data.client()
+    project = service_data.project([client], status="active")
+    assert _drift(db) == baseline
+
+    projects = ProjectService(db)
+    first, second, *removed = sorted(project.stages, key=lambda stage: stage.order)
+    # Conclui o projeto, conclui uma etapa, muda o prazo de outra, remove as demais e cria uma nova
+    projects.update_project(project.id, ProjectUpdate(
+        status="completed", actual_end_date=date(2025, 11, 30), total_value=2500,
+        stages=[
+            _stage_update(first, status="completed"),
+            _stage_update(second, planned_end_date=date(2025, 10, 15)),
+            StageUpdateForProject(stage_type_id=first.stage_type_id, order=9, planned_start_date=date(2025, 2, 1),
+                                  planned_end_date=date(2025, 9, 1)),
+        ]
+    ))
+    rollups = DashboardRollups(db).project_rollups(project.id)
+    assert rollups[(COMPLETED_REVENUE, "2025-11-30")] == (1, Decimal(2500))
+    assert set(key for key in rollups if key[0] == OPEN_STAGES_DUE) == {
+        (OPEN_STAGES_DUE, "2025-10-15"), (OPEN_STAGES_DUE, "2025-09-01")
+    }
+    assert _drift(db) == baseline
+
+    # Reabrir tira a receita; trocar a etapa atual não mexe nos contadores
+    projects.update_project(project.id, ProjectUpdate(
+        status="paused", stages=[_stage_update(stage) for stage in db.get(type(project), project.id).stages]
+    ))
+    projects.update_current_stage(project.id, second.id)
+    assert _drift(db) == baseline
+
+    assert projects.delete_project(project.id)
+    assert DashboardRollups(db).project_rollups(project.id) == {}
+    assert _drift(db) == baseline
+
+
+def test_client_writes_keep_rollups_consistent(db, service_data):
+    baseline = _drift(db)
+    active = service_data.client()
+    inactive = service_data.client(is_active=False)
+    assert _drift(db) == baseline
+
+    clients = ClientService(db)
+    for client, update in ((active, ClientUpdate(is_active=False)), (inactive, ClientUpdate(is_active=True)),
+                           (inactive, ClientUpdate(name="Cliente renomeado"))):
+        clients.update_client(client.id, update)
+        assert _drift(db) == baseline, update
+
+    clients.delete_client(inactive.id)
+    # Desativar um cliente já inativo não pode descontá-lo de novo
+    clients.delete_client(inactive.id)
+    assert _drift(db) == baseline
@@ -0,0 +1,116 @@
+"""
+Dashboards por recorte (/dashboard/me, /dashboard/clients/{id}, /dashboard/users/{id}): cada recorte fica numa
+entrada própria do cache, recalculada só quando muda um projeto dele ou um cliente exibido nele.
+"""
+from datetime import date
+from uuid import uuid4
+
+import pytest
+
+from app.core.security import create_access_token
+from app.models.user import User
+from app.schemas.client import ClientUpdate
+from app.schemas.project import ProjectUpdate
+from app.services import dashboard_service
+from app.services.client_service import ClientService
+from app.services.project_service import ProjectService
+from app.utils.cache import cache
+
+
+@pytest.fixture
+def architect(db):
+    """Usuário não admin, autor dos projetos do recorte por usuário (peça-o antes de service_data)"""
+    key = uuid4().hex[:8]
+    user = User(name="Arquiteta dos testes", email=f"arquiteta.{key}@teste.com", username=f"arquiteta_{key}",
+                password_hash="-", role="architect")
+    db.add(user)
+    db.commit()
+    yield user
+    db.rollback()
+    db.delete(db.get(User, user.id))
+    db.commit()
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Recortes recalculados (chave de cada load do dashboard por recorte), com o cache limpo"""
+    if dashboard_service.settings.CACHE_BACKEND != "local":
+        pytest.skip("requer CACHE_BACKEND=local")
+    cache.clear()
+    keys = []
+    tags = dashboard_service.DashboardScope.tags
+
+    def recording_tags(self, db):
+        keys.append(self.key)
+        return tags(self, db)
+
+    monkeypatch.setattr(dashboard_service.DashboardScope, "tags", recording_tags)
+    yield keys
+    cache.clear()
+
+
+def _stage_updates(project):
+    return [
+        dict(id=stage.id, stage_type_id=stage.stage_type_id, order=stage.order, status=stage.status,
+             planned_start_date=stage.planned_start_date, planned_end_date=stage.planned_end_date)
+        for stage in project.stages
+    ]
+
+
+def test_scoped_dashboard_changes_only_with_its_projects(db, client, architect, service_data, loads):
+    first, second = service_data.client(), service_data.client()
+    first_project = service_data.project([first], user_id=architect.id, status="active")
+    second_project = service_data.project([second], status="active")
+    scopes = {
+        f"client:{first.id}": (f"/dashboard/clients/{first.id}", {}),
+        f"client:{second.id}": (f"/dashboard/clients/{second.id}", {}),
+        f"user:{architect.id}": (f"/dashboard/users/{architect.id}", {}),
+        # O próprio cliente vê o mesmo recorte que o admin pede por /dashboard/clients/{id}
+        "me": ("/dashboard/me", {"Authorization": f"Bearer {create_access_token(first.id)}"}),
+    }
+
+    def fetch():
+        bodies = {}
+        for name, (url, headers) in scopes.items():
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200, response.text
+            bodies[name] = response.json()
+        return bodies
+
+    before = fetch()
+    assert sorted(loads) == sorted({f"client:{first.id}", f"client:{second.id}", f"user:{architect.id}"})
+    assert before["me"] == before[f"client:{first.id}"]
+    assert before[f"client:{first.id}"]["projects_status_counts"]["active"] == 1
+    assert fetch() == before and len(loads) == 3
+
+    # Mudar o projeto do segundo cliente recalcula só o recorte dele
+    loads.clear()
+    ProjectService(db).update_project(second_project.id, ProjectUpdate(
+        status="completed", actual_end_date=date.today(), stages=_stage_updates(second_project)
+    ))
+    after = fetch()
+    assert loads == [f"client:{second.id}"]
+    assert after[f"client:{second.id}"]["projects_status_counts"]["completed"] == 1
+    assert after[f"client:{second.id}"] != before[f"client:{second.id}"]
+    assert {name: body for name, body in after.items() if name != f"client:{second.id}"} == \
+        {name: body for name, body in before.items() if name != f"client:{second.id}"}
+
+    # Mudar o projeto do primeiro cliente recalcula o recorte dele e o da autora, não o do segundo
+    loads.clear()
+    ProjectService(db).update_project(first_project.id, ProjectUpdate(
+        status="paused", stages=_stage_updates(first_project)
+    ))
+    changed = fetch()
+    assert sorted(loads) == sorted([f"client:{first.id}", f"user:{architect.id}"])
+    for name in (f"client:{first.id}", f"user:{architect.id}", "me"):
+        assert changed[name]["projects_status_counts"]["paused"] == 1
+    assert changed[f"client:{second.id}"] == after[f"client:{second.id}"]
+
+    # Renomear um cliente muda o nome exibido nos recentes só dos recortes com projetos dele
+    loads.clear()
+    ClientService(db).update_client(second.id, ClientUpdate(name="Cliente renomeado"))
+    renamed = fetch()
+    assert loads == [f"client:{second.id}"]
+    assert renamed[f"client:{second.id}"]["recent_projects"][0]["client_name"] == "Cliente renomeado"
+    assert {name: body for name, body in renamed.items() if name != f"client:{second.id}"} == \
+        {name: body for name, body in changed.items() if name != f"client:{second.id}"}
@@ -0,0 +1,99 @@
+import os
+from uuid import uuid4
+
+import pytest
+
+from app.models.file import File
+from app.models.user import User
+
+DATA = os.urandom(10_000)
+
+
+@pytest.fixture
+def stored_file(db, storage):
+    admin = db.query(User).filter(User.role == "admin").first()
+    storage.put_bytes("docs/memorial.pdf", DATA)
+    file = File(original_name="memorial.pdf", stored_name=f"{uuid4().hex}.pdf", path="docs/memorial.pdf",
+                size=len(DATA), mime_type="application/pdf", category="document", uploaded_by_id=admin.id)
+    db.add(file)
+    db.commit()
+    yield file
+    db.delete(file)
+    db.commit()
+
+
+def _download(client, file, **headers):
+    return client.get(f"/files/{file.id}/download", headers=headers)
+
+
+def test_full_download_sends_validators(client, stored_file):
+    response = _download(client, stored_file)
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert response.headers["etag"]
+    assert response.headers["last-modified"]
+    assert response.headers["accept-ranges"] == "bytes"
+
+
+def test_single_range(client, stored_file):
+    response = _download(client, stored_file, Range="bytes=100-199")
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 100-199/{len(DATA)}"
+    assert response.content == DATA[100:200]
+
+
+def test_multiple_ranges_return_multipart_byteranges(client, stored_file):
+    response = _download(client, stored_file, Range="bytes=0-9,5000-5019")
+    assert response.status_code == 206
+    content_type, _, boundary = response.headers["content-type"].partition("; boundary=")
+    assert content_type == "multipart/byteranges"
+    assert int(response.headers["content-length"]) == len(response.content)
+
+    body = response.content
+    assert body.endswith(f"--{boundary}--\r\n".encode())
+    parts = body.split(f"--{boundary}".encode())[1:-1]
+    assert len(parts) == 2
+    for part, (start, end) in zip(parts, [(0, 9), (5000, 5019)]):
+        headers, _, content = part.partition(b"\r\n\r\n")
+        assert b"Content-Type: application/pdf" in headers
+        assert f"Content-Range: bytes {start}-{end}/{len(DATA)}".encode() in headers
+        # Cada parte termina com CRLF antes do próximo delimitador
+        assert content == DATA[start:end + 1] + b"\r\n"
+
+
+def test_unsatisfiable_range_returns_416(client, stored_file):
+    response = _download(client, stored_file, Range=f"bytes={len(DATA)}-{len(DATA) + 10}")
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"*/{len(DATA)}"
+
+
+@pytest.mark.parametrize("validator", ["etag", "last-modified"])
+def test_conditional_request_returns_304_without_touching_storage(client, stored_file, storage, monkeypatch,
+                                                                   validator):
+    headers = _download(client, stored_file).headers
+
+    def untouchable(*args, **kwargs):
+        raise AssertionError("o 304 não deveria acessar o storage")
+
+    for method in ("open_range", "local_path", "presign", "stat"):
+        monkeypatch.setattr(storage, method, untouchable)
+    if validator == "etag":
+        response = _download(client, stored_file, **{"If-None-Match": headers["etag"]})
+    else:
+        response = _download(client, stored_file, **{"If-Modified-Since": headers["last-modified"]})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == headers["etag"]
+
+
+def test_if_range_with_current_etag_returns_range(client, stored_file):
+    etag = _download(client, stored_file).headers["etag"]
+    response = _download(client, stored_file, Range="bytes=0-99", **{"If-Range": etag})
+    assert response.status_code == 206
+    assert response.content == DATA[:100]
+
+
+def test_stale_if_range_returns_whole_file(client, stored_file):
+    response = _download(client, stored_file, Range="bytes=0-99", **{"If-Range": '"versao-antiga"'})
+    assert response.status_code == 200
+    assert response.content == DATA
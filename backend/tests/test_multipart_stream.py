@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.core.multipart_stream import MultipartStream
+
+BOUNDARY = "----limite123"
+
+
+def _body(parts):
+    body = b""
+    for name, value, filename in parts:
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else "")
+        body += f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n".encode()
+        if filename:
+            body += b"Content-Type: application/pdf\r\n"
+        body += b"\r\n" + value + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+def _request(body, piece=7):
+    """Request cujo corpo chega em pedaços pequenos, cortando boundaries e cabeçalhos no meio"""
+    pieces = [body[i:i + piece] for i in range(0, len(body), piece)]
+    received = []
+
+    async def receive():
+        data = pieces.pop(0) if pieces else b""
+        received.append(data)
+        return {"type": "http.request", "body": data, "more_body": bool(pieces)}
+
+    scope = {"type": "http", "method": "POST", "headers": [
+        (b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())
+    ]}
+    return Request(scope, receive), received
+
+
+async def _read(stream):
+    await stream.open_file()
+    return b"".join([data async for data in stream.file_chunks()])
+
+
+def test_file_is_streamed_and_fields_before_and_after_are_kept():
+    content = bytes(range(256)) * 40 + b"\r\n--quase-boundary\r\n"
+    request, received = _request(_body([
+        ("category", b"plan", None), ("file", content, "Planta ção.pdf"),
+        ("project_id", b"123", None), ("description", "Reforma".encode(), None),
+    ]))
+    stream = MultipartStream(request, "file")
+    assert received == []
+    assert asyncio.run(_read(stream)) == content
+    assert stream.filename == "Planta ção.pdf"
+    assert stream.content_type == "application/pdf"
+    assert stream.fields == {"category": "plan", "project_id": "123", "description": "Reforma"}
+
+
+def test_missing_file_part_is_rejected():
+    request, _ = _request(_body([("checksum", b"abc", None)]))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(_read(MultipartStream(request, "chunk")))
+    assert error.value.status_code == 400
+
+
+def test_truncated_body_is_rejected():
+    request, _ = _request(_body([("chunk", b"x" * 1000, "chunk")])[:600])
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(_read(MultipartStream(request, "chunk")))
+    assert error.value.status_code == 400
+
+
+def test_non_multipart_body_is_rejected():
+    scope = {"type": "http", "method": "POST", "headers": [(b"content-type", b"application/json")]}
+    with pytest.raises(HTTPException):
+        MultipartStream(Request(scope), "file")
@@ -0,0 +1,101 @@
+from datetime import date
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.project import Project
+from app.models.user import User
+from app.utils.pagination import _after, decode_cursor, encode_cursor, paginate
+
+
+class _Item:
+    def __init__(self, **fields):
+        self.id = uuid4()
+        self.__dict__.update(fields)
+
+
+def _decode_error(cursor, order_by="start_date", order_dir="asc"):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, Project, order_by, order_dir)
+    assert error.value.status_code == 400
+    return error.value.detail
+
+
+def test_cursor_round_trip():
+    item = _Item(start_date=date(2025, 3, 1), actual_end_date=None, total_value=Decimal("1500.50"))
+    assert decode_cursor(encode_cursor(item, Project, "start_date", "asc"), Project, "start_date", "asc") == \
+        (date(2025, 3, 1), item.id)
+    assert decode_cursor(encode_cursor(item, Project, "actual_end_date", "desc"), Project, "actual_end_date",
+                         "desc") == (None, item.id)
+    assert decode_cursor(encode_cursor(item, Project, "total_value", "asc"), Project, "total_value", "asc") == \
+        (Decimal("1500.50"), item.id)
+    # Ordenação fora das colunas do modelo pagina só pelo id
+    assert decode_cursor(encode_cursor(item, Project, "inexistente", "asc"), Project, "inexistente", "asc") == \
+        (None, item.id)
+
+
+def test_tampered_cursor_is_rejected():
+    cursor = encode_cursor(_Item(start_date=date(2025, 3, 1)), Project, "start_date", "asc")
+    encoded, _, signature = cursor.partition(".")
+    forged = encode_cursor(_Item(start_date=date(1999, 1, 1)), Project, "start_date", "asc").partition(".")[0]
+    assert _decode_error(f"{forged}.{signature}") == "Cursor inválido"
+    assert _decode_error(f"{encoded}.{signature[:-1]}{'B' if signature[-1] == 'A' else 'A'}") == "Cursor inválido"
+    assert _decode_error(encoded) == "Cursor inválido"
+    assert _decode_error("") == "Cursor inválido"
+
+
+@pytest.mark.parametrize("cursor", ["é.é", "cursor.assinatura-ç", "😀"])
+def test_non_ascii_cursor_is_rejected_not_crashing(cursor):
+    assert _decode_error(cursor) == "Cursor inválido"
+
+
+def test_cursor_from_another_ordering_is_rejected():
+    cursor = encode_cursor(_Item(start_date=date(2025, 3, 1), name="Casa"), Project, "start_date", "asc")
+    assert _decode_error(cursor, "start_date", "desc") == "Cursor gerado para outra ordenação"
+    assert _decode_error(cursor, "name", "asc") == "Cursor gerado para outra ordenação"
+
+
+def test_after_keeps_nulls_in_their_own_segment():
+    column, id_column = Project.__table__.c.actual_end_date, Project.__table__.c.id
+    last_id = uuid4()
+    # Chave NULL: em ASC (NULLs por último) só restam os NULLs com id maior; em DESC (NULLs primeiro), eles
+    # e depois todas as linhas não nulas
+    assert [str(s) for s in _after(column, id_column, None, last_id, False)] == [
+        "projects.actual_end_date IS NULL AND projects.id > :id_1"]
+    assert [str(s) for s in _after(column, id_column, None, last_id, True)] == [
+        "projects.actual_end_date IS NULL AND projects.id < :id_1", "projects.actual_end_date IS NOT NULL"]
+    # Chave com valor: em ASC os NULLs vêm num segmento separado depois das linhas maiores, nunca num OR
+    ascending = _after(column, id_column, date(2025, 1, 1), last_id, False)
+    assert len(ascending) == 2
+    assert "IS NULL" not in str(ascending[0])
+    assert str(ascending[1]) == "projects.actual_end_date IS NULL"
+    assert len(_after(column, id_column, date(2025, 1, 1), last_id, True)) == 1
+
+
+@pytest.mark.parametrize("order_dir", ["asc", "desc"])
+def test_cursor_walk_matches_postgres_order_with_nulls(db, order_dir):
+    admin = db.query(User).filter(User.role == "admin").first()
+    marker = f"paginacao-{uuid4().hex}"
+    end_dates = [None, date(2025, 1, 1), None, date(2025, 1, 1), date(2024, 6, 1), None, date(2026, 2, 2)] * 2
+    for end_date in end_dates:
+        db.add(Project(name=marker, total_value=1000, start_date=date(2024, 1, 1), created_by_id=admin.id,
+                       estimated_end_date=date(2026, 1, 1), actual_end_date=end_date))
+    db.flush()
+
+    query = db.query(Project).filter(Project.name == marker)
+    column = Project.actual_end_date
+    expected = query.order_by(column.desc() if order_dir == "desc" else column.asc(),
+                              Project.id.desc() if order_dir == "desc" else Project.id.asc()).all()
+
+    walked, cursor = [], None
+    while True:
+        # Só a primeira página (por offset) conta o total
+        items, total, next_cursor = paginate(query, Project, 3, 0, "actual_end_date", order_dir, cursor=cursor)
+        assert total == (len(end_dates) if cursor is None else None)
+        cursor = next_cursor
+        walked += items
+        if cursor is None:
+            break
+    assert [p.id for p in walked] == [p.id for p in expected]
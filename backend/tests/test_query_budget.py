@@ -0,0 +1,83 @@
+from typing import Callable, Dict
+
+import pytest
+
+from tests.query_harness import QueryRecorder, seed_list_data
+
+# Máximo de comandos SQL por página de cada listagem: contagem + página + uma consulta IN por relação
+# serializada. Passar dele indica um N+1 (relação sem loader). O SQLAlchemy consulta as relações selectin
+# em lotes de 500 chaves, então páginas grandes podem somar um lote por relação (até o dobro do orçamento),
+# mas nunca um comando por item.
+LIST_QUERY_BUDGETS: Dict[str, int] = {
+    "get_projects": 8,
+    "get_projects_by_client": 8,
+    "get_my_projects": 8,
+    "get_clients": 9,
+    "get_files": 2,
+    "get_tasks": 2,
+    "get_stage_types": 2,
+}
+
+PAGE_SIZES = (1, 100)
+
+
+@pytest.fixture
+def list_calls(db) -> Dict[str, Callable[[int], object]]:
+    """
+    Listagens sobre 500 projetos com clientes, etapas, tarefas e arquivos inseridos na transação do teste,
+    para que a página de 100 itens venha cheia em todas elas
+    """
+    from app.core.config import settings
+    from app.services.client_service import ClientService
+    from app.services.file_service import FileService
+    from app.services.project_service import ProjectService
+    from app.services.stage_type_service import StageTypeService
+    from app.services.task_service import TaskService
+
+    # O teste limpa o cache a cada chamada
+    if settings.CACHE_BACKEND != "local":
+        pytest.skip("requer CACHE_BACKEND=local")
+    data = seed_list_data(db, projects=500, files=1000)
+    projects = ProjectService(db)
+    return {
+        "get_projects": lambda limit: projects.get_projects(
+            limit, 0, "created_at", "desc", None, None, None, None, None, None, None, None
+        ),
+        "get_projects_by_client": lambda limit: projects.get_projects_by_client(
+            data.client.id, None, limit, 0, "created_at", "desc", None, None, None, None
+        ),
+        "get_my_projects": lambda limit: projects.get_my_projects(
+            data.client, limit, 0, "created_at", "desc", None, None, None, None, None
+        ),
+        "get_clients": lambda limit: ClientService(db).get_clients(limit, 0, "created_at", "desc", None, None),
+        "get_files": lambda limit: FileService(db).get_files(
+            limit, 0, "created_at", "desc", None, None, None, None, None, None
+        ),
+        "get_tasks": lambda limit: TaskService(db).get_tasks(
+            limit, 0, "created_at", "desc", None, None, None, None, None, None, None
+        ),
+        "get_stage_types": lambda limit: StageTypeService(db).get_stage_types(
+            None, limit, 0, "created_at", "desc", None, None
+        ),
+    }
+
+
+@pytest.mark.parametrize("name", list(LIST_QUERY_BUDGETS))
+def test_list_endpoint_stays_within_query_budget(db, postgres_engine, list_calls, name):
+    """A página de 1 item cabe no orçamento e a de 100, no máximo no dobro (lotes extras do selectin)"""
+    from app.utils.cache import cache
+
+    counts = {}
+    for limit in PAGE_SIZES:
+        cache.clear()
+        db.expunge_all()
+        with QueryRecorder(postgres_engine) as recorder:
+            page = list_calls[name](limit)
+        counts[limit] = recorder.count
+    if name != "get_stage_types":
+        assert len(page.items) == PAGE_SIZES[-1]
+
+    budget = LIST_QUERY_BUDGETS[name]
+    queries = ", ".join(f"{limit} itens: {count}" for limit, count in counts.items())
+    assert counts[PAGE_SIZES[0]] <= budget and counts[PAGE_SIZES[-1]] <= 2 * budget, \
+        f"{name}: {queries} (orçamento {budget}, até o dobro com {PAGE_SIZES[-1]} itens)"
@@ -0,0 +1,189 @@
+"""
+Planos das consultas das listagens: cada listagem roda sem cache e cada SELECT que ela fez (página, total e
+relações carregadas) passa por EXPLAIN. Nenhum plano pode varrer uma tabela grande (Seq Scan) para achar
+poucas linhas dela; varrer para ler quase a tabela toda (o total sem filtro, um filtro que casa com quase
+tudo) é o plano certo.
+
+Os dados vêm de seed_list_data numa transação do módulo, seguida de ANALYZE, para que o planner escolha os
+índices pelas estatísticas reais. Desligar o Seq Scan (SET LOCAL enable_seqscan = off) fica só como
+fallback, quando PLAN_SEED_PROJECTS reduz a carga a ponto de nenhuma tabela passar de MIN_ROWS linhas:
+nesse tamanho o planner varre de propósito, e o override só revela qual índice ele usaria.
+"""
+import json
+import os
+from typing import Callable, Dict, Iterator
+
+import pytest
+from sqlalchemy import text
+
+from tests.query_harness import QueryRecorder, seed_list_data
+
+# Tabelas que crescem com o uso: nenhuma consulta de listagem pode varrê-las inteiras
+LARGE_TABLES = ("projects", "clients", "project_clients", "stages", "tasks", "files")
+
+# Abaixo disso o planner varre a tabela de propósito (é mais barato que o índice)
+MIN_ROWS = 10_000
+
+# Fração da tabela abaixo da qual um Seq Scan indica índice faltando
+SELECTIVE_FRACTION = 0.01
+
+# 15 mil projetos: 45 mil etapas, 30 mil tarefas e 75 mil arquivos, de 20 autores
+SEED_PROJECTS = int(os.getenv("PLAN_SEED_PROJECTS", "15000"))
+SEED_USERS = 20
+
+PAGE_SIZE = 20
+
+# Índices da migration add_list_filter_indexes: (tabela, coluna do filtro)
+LIST_FILTER_INDEXES = [
+    ("files", "project_id"),
+    ("files", "client_id"),
+    ("files", "stage_id"),
+    ("files", "uploaded_by_id"),
+    ("tasks", "stage_id"),
+    ("tasks", "created_by_id"),
+    ("tasks", "assigned_to_id"),
+]
+
+
+def _plan_nodes(plan: dict) -> Iterator[dict]:
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _plan_nodes(child)
+
+
+def _analyze(db) -> Dict[str, float]:
+    """Atualiza as estatísticas das tabelas grandes e devolve as linhas de cada uma que passa de MIN_ROWS"""
+    db.execute(text(f"ANALYZE {', '.join(LARGE_TABLES)}"))
+    rows = db.execute(text("SELECT relname, reltuples FROM pg_class WHERE relname = ANY(:tables)"),
+                      {"tables": list(LARGE_TABLES)}).all()
+    return {name: tuples for name, tuples in rows if tuples >= MIN_ROWS}
+
+
+@pytest.fixture(scope="module")
+def plan_db(postgres_engine):
+    """
+    Sessão própria do módulo com SEED_PROJECTS projetos e 5 arquivos por projeto inseridos e analisados numa
+    transação desfeita no fim. O ANALYZE grava a contagem de linhas em pg_class fora da transação, então
+    depois do rollback as tabelas são analisadas de novo para o banco voltar às estatísticas dos seus dados.
+    """
+    from app.core.config import settings
+    from app.core.database import SessionLocal
+
+    # As listagens limpam o cache a cada chamada
+    if settings.CACHE_BACKEND != "local":
+        pytest.skip("requer CACHE_BACKEND=local")
+    db = SessionLocal()
+    try:
+        db.info["plan_data"] = seed_list_data(db, projects=SEED_PROJECTS, files=SEED_PROJECTS * 5,
+                                              users=SEED_USERS)
+        db.info["large_tables"] = _analyze(db)
+        if not db.info["large_tables"]:
+            db.execute(text("SET LOCAL enable_seqscan = off"))
+            db.info["large_tables"] = {table: 1 for table in LARGE_TABLES}
+        yield db
+    finally:
+        db.rollback()
+        db.execute(text(f"ANALYZE {', '.join(LARGE_TABLES)}"))
+        db.commit()
+        db.close()
+
+
+def _list_calls(db) -> Dict[str, Callable[[], object]]:
+    from app.services.client_service import ClientService
+    from app.services.file_service import FileService
+    from app.services.project_service import ProjectService
+    from app.services.task_service import TaskService
+
+    def allow(client_ids, actor):
+        return None
+
+    data = db.info["plan_data"]
+    admin, client, project, stage = data.admin, data.client, data.project, data.stage
+    projects, files, tasks = ProjectService(db), FileService(db), TaskService(db)
+
+    def list_projects(**filters):
+        params = dict(name=None, status=None, start_date=None, client_id=None, stage_name=None,
+                      stage_type=None, stage=None, search=None)
+        params.update(filters)
+        return lambda: projects.get_projects(PAGE_SIZE, 0, "created_at", "desc", **params, count="exact")
+
+    def list_files(**filters):
+        params = dict(original_name=None, category=None, project_id=None, client_id=None, stage_id=None,
+                      uploaded_by_id=None)
+        params.update(filters)
+        return lambda: files.get_files(PAGE_SIZE, 0, "created_at", "desc", **params, count="exact")
+
+    def list_tasks(**filters):
+        params = dict(title=None, status=None, priority=None, due_date=None, stage_id=None, created_by_id=None,
+                      assigned_to_id=None)
+        params.update(filters)
+        return lambda: tasks.get_tasks(PAGE_SIZE, 0, "created_at", "desc", **params, count="exact")
+
+    return {
+        "get_projects": list_projects(),
+        "get_projects?client_id": list_projects(client_id=str(client.id)),
+        "get_projects?stage_type": list_projects(stage_type=str(stage.stage_type_id)),
+        "get_projects?stage": list_projects(stage=str(stage.id)),
+        "get_projects_by_client": lambda: projects.get_projects_by_client(
+            client.id, None, PAGE_SIZE, 0, "created_at", "desc", None, None, None, None, count="exact"
+        ),
+        "get_my_projects": lambda: projects.get_my_projects(
+            client, PAGE_SIZE, 0, "created_at", "desc", None, None, None, None, None, count="exact"
+        ),
+        "get_clients": lambda: ClientService(db).get_clients(PAGE_SIZE, 0, "created_at", "desc", None, None,
+                                                             count="exact"),
+        "get_files": list_files(),
+        "get_files?project_id": list_files(project_id=str(project.id)),
+        "get_files?client_id": list_files(client_id=str(client.id)),
+        "get_files?stage_id": list_files(stage_id=str(stage.id)),
+        "get_files?uploaded_by_id": list_files(uploaded_by_id=str(admin.id)),
+        "get_files_by_project": lambda: files.get_files_by_project(str(project.id), allow, admin),
+        "get_files_by_client": lambda: files.get_files_by_client(str(client.id), allow, admin),
+        "get_files_by_stage": lambda: files.get_files_by_stage(str(stage.id), allow, admin),
+        "get_tasks": list_tasks(),
+        "get_tasks?stage_id": list_tasks(stage_id=str(stage.id)),
+        "get_tasks?created_by_id": list_tasks(created_by_id=str(admin.id)),
+        "get_tasks?assigned_to_id": list_tasks(assigned_to_id=str(admin.id)),
+        "get_tasks_by_stage": lambda: tasks.get_tasks_by_stage(str(stage.id), admin, allow),
+        "get_tasks_by_project": lambda: tasks.get_tasks_by_project(str(project.id), admin, allow),
+    }
+
+
+def _plans(db, postgres_engine, name: str) -> dict:
+    """
+    Executa a listagem e junta, dos planos de todos os SELECTs dela, os índices usados e as tabelas grandes
+    varridas para devolver menos de SELECTIVE_FRACTION das linhas
+    """
+    from app.utils.cache import cache
+
+    cache.clear()
+    call = _list_calls(db)[name]
+    with QueryRecorder(postgres_engine) as recorder:
+        call()
+    seq_scans, indexes = set(), set()
+    for statement, parameters in recorder.selects:
+        plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        for node in _plan_nodes(plan[0]["Plan"]):
+            rows = db.info["large_tables"].get(node.get("Relation Name"))
+            if node["Node Type"] == "Seq Scan" and rows and node["Plan Rows"] < rows * SELECTIVE_FRACTION:
+                seq_scans.add(node["Relation Name"])
+            if "Index Name" in node:
+                indexes.add(node["Index Name"])
+    return {"seq_scans": sorted(seq_scans), "indexes": sorted(indexes)}
+
+
+@pytest.mark.parametrize("table, column", LIST_FILTER_INDEXES)
+def test_list_filter_uses_created_at_index(plan_db, postgres_engine, table, column):
+    result = _plans(plan_db, postgres_engine, f"get_{table}?{column}")
+    assert f"ix_{table}_{column}_created_at_id" in result["indexes"], result
+
+
+def test_list_endpoints_do_not_scan_large_tables(plan_db, postgres_engine):
+    scans = {}
+    for name in _list_calls(plan_db):
+        seq_scans = _plans(plan_db, postgres_engine, name)["seq_scans"]
+        if seq_scans:
+            scans[name] = seq_scans
+    assert not scans
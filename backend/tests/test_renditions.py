@@ -0,0 +1,145 @@
+import io
+import os
+from uuid import uuid4
+
+import pytest
+from PIL import Image
+
+from app.core import renditions as renditions_module
+from app.core.renditions import RenditionCache
+from app.models.file import File
+from app.models.user import User
+from app.utils.image_renditions import render_image
+
+SIZES = {"thumb": 256, "medium": 1280}
+
+
+def _image_bytes(fmt, size=(2000, 1000), mode="RGB", color=(200, 30, 30)):
+    buffer = io.BytesIO()
+    Image.new(mode, size, color).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def test_render_image_resizes_to_each_target_in_its_format(tmp_path):
+    source = tmp_path / "fachada.png"
+    Image.new("RGBA", (2000, 1000), (30, 120, 200, 128)).save(source)
+    targets = [(str(tmp_path / "256.webp"), 256, "webp"), (str(tmp_path / "1280.jpg"), 1280, "jpeg")]
+    assert render_image(str(source), targets) == [(256, 128), (1280, 640)]
+
+    with Image.open(targets[0][0]) as thumb:
+        assert thumb.format == "WEBP"
+        assert thumb.size == (256, 128)
+    with Image.open(targets[1][0]) as medium:
+        # JPEG não tem alfa: a transparência é composta sobre branco
+        assert medium.format == "JPEG"
+        assert medium.mode == "RGB"
+        assert medium.size == (1280, 640)
+
+
+def test_render_image_keeps_smaller_images_at_their_size(tmp_path):
+    source = tmp_path / "icone.jpg"
+    source.write_bytes(_image_bytes("JPEG", size=(100, 80)))
+    assert render_image(str(source), [(str(tmp_path / "256.webp"), 256, "webp")]) == [(100, 80)]
+
+
+def test_render_image_reads_16_bit_tiff(tmp_path):
+    source = tmp_path / "levantamento.tif"
+    Image.new("I;16", (600, 300), 40000).save(source, "TIFF")
+    dest = tmp_path / "256.jpg"
+    assert render_image(str(source), [(str(dest), 256, "jpeg")]) == [(256, 128)]
+    with Image.open(dest) as img:
+        assert img.mode == "RGB"
+        # 40000/65535 da escala de 16 bits vira ~156 em 8 bits, não branco saturado
+        assert 150 <= img.getpixel((10, 10))[0] <= 160
+
+
+def test_render_image_reads_heic(tmp_path):
+    pillow_heif = pytest.importorskip("pillow_heif")
+    source = tmp_path / "obra.heic"
+    pillow_heif.from_pillow(Image.new("RGB", (800, 600), (10, 200, 10))).save(str(source))
+    assert render_image(str(source), [(str(tmp_path / "256.webp"), 256, "webp")]) == [(256, 192)]
+
+
+def test_rendition_path_is_keyed_by_file_size_and_format(tmp_path):
+    cache = RenditionCache(str(tmp_path), SIZES, 1)
+    file_id = uuid4()
+    paths = {cache.path(file_id, size, fmt) for size in SIZES for fmt in ("webp", "jpeg")}
+    assert len(paths) == 4
+    assert cache.path(file_id, "thumb", "webp") == os.path.join(os.path.realpath(tmp_path), str(file_id), "256.webp")
+    assert cache.path(uuid4(), "thumb", "webp") != cache.path(file_id, "thumb", "webp")
+
+
+@pytest.fixture
+def thumbnails(storage, tmp_path, monkeypatch):
+    """
+    RenditionCache próprio do teste; o pool roda em processos novos (spawn), que leem o original pelo
+    storage configurado por variável de ambiente, então UPLOAD_DIR aponta para a raiz do storage do teste
+    """
+    from app.api import files as files_api
+
+    monkeypatch.setenv("UPLOAD_DIR", storage.root)
+    cache = RenditionCache(str(tmp_path / "renditions"), SIZES, 1)
+    for module in (files_api, renditions_module):
+        monkeypatch.setattr(module, "renditions", cache)
+    monkeypatch.setattr(renditions_module.settings, "RENDITIONS_ON_UPLOAD", False)
+    yield cache
+    if cache._pool is not None:
+        cache._pool.shutdown()
+
+
+@pytest.fixture
+def make_file(db, storage):
+    admin = db.query(User).filter(User.role == "admin").first()
+    created = []
+
+    def make(name, data, category="image", mime_type="image/png"):
+        key = f"docs/{uuid4().hex}{os.path.splitext(name)[1]}"
+        storage.put_bytes(key, data)
+        file = File(original_name=name, stored_name=os.path.basename(key), path=key, size=len(data),
+                    mime_type=mime_type, category=category, uploaded_by_id=admin.id)
+        db.add(file)
+        db.commit()
+        created.append(file)
+        return file
+
+    yield make
+    for file in created:
+        db.delete(file)
+    db.commit()
+
+
+def test_thumbnail_route_generates_once_and_negotiates_format(client, thumbnails, make_file, monkeypatch):
+    file = make_file("fachada.png", _image_bytes("PNG"))
+    webp = client.get(f"/files/{file.id}/thumbnail", headers={"Accept": "image/webp,*/*"})
+    assert webp.status_code == 200
+    assert webp.headers["content-type"] == "image/webp"
+    assert webp.headers["vary"] == "Accept"
+    assert Image.open(io.BytesIO(webp.content)).size == (256, 128)
+
+    jpeg = client.get(f"/files/{file.id}/thumbnail?size=medium")
+    assert jpeg.status_code == 200
+    assert jpeg.headers["content-type"] == "image/jpeg"
+    assert Image.open(io.BytesIO(jpeg.content)).size == (1280, 640)
+
+    # Já gerada: servida do disco sem passar pelo pool
+    def no_render(*args, **kwargs):
+        raise AssertionError("a rendition já existe")
+
+    monkeypatch.setattr(thumbnails, "_submit", no_render)
+    again = client.get(f"/files/{file.id}/thumbnail", headers={"Accept": "image/webp"})
+    assert again.content == webp.content
+    cached = client.get(f"/files/{file.id}/thumbnail", headers={"Accept": "image/webp",
+                                                                 "If-None-Match": webp.headers["etag"]})
+    assert cached.status_code == 304
+
+
+def test_thumbnail_route_errors(client, thumbnails, make_file):
+    pdf = make_file("memorial.pdf", b"%PDF-1.4", category="document", mime_type="application/pdf")
+    assert client.get(f"/files/{pdf.id}/thumbnail").status_code == 404
+    assert client.get(f"/files/{uuid4()}/thumbnail").status_code == 404
+
+    image = make_file("fachada.png", _image_bytes("PNG"))
+    assert client.get(f"/files/{image.id}/thumbnail?size=gigante").status_code == 400
+
+    broken = make_file("corrompida.png", b"\x89PNG nao e uma imagem")
+    assert client.get(f"/files/{broken.id}/thumbnail").status_code == 422
@@ -0,0 +1,49 @@
+import hashlib
+import os
+
+from app.utils.rolling_hash import RollingHash
+
+CHUNKS = [os.urandom(1000 + i) for i in range(5)]
+DIGESTS = [hashlib.sha256(chunk).hexdigest() for chunk in CHUNKS]
+FULL = hashlib.sha256(b"".join(CHUNKS)).hexdigest()
+
+
+def _receive(rolling, number):
+    candidate = rolling.candidate(number)
+    if candidate is not None:
+        candidate.update(CHUNKS[number - 1])
+    rolling.advance(number, DIGESTS[number - 1], candidate)
+
+
+def _reader(reads):
+    def read_chunk(number):
+        reads.append(number)
+        yield CHUNKS[number - 1]
+    return read_chunk
+
+
+def test_in_order_chunks_are_hashed_without_reading_storage():
+    rolling = RollingHash()
+    for number in range(1, 6):
+        _receive(rolling, number)
+    reads = []
+    assert rolling.finalize(DIGESTS, _reader(reads)) == FULL
+    assert reads == []
+
+
+def test_out_of_order_chunks_are_only_read_on_finalize():
+    rolling = RollingHash()
+    for number in (1, 3, 2, 5, 4):
+        _receive(rolling, number)
+    # Só o prefixo contíguo (1, 2) entrou no hash; nada foi relido durante o upload
+    assert rolling.next_chunk == 3
+    reads = []
+    assert rolling.finalize(DIGESTS, _reader(reads)) == FULL
+    assert reads == [3, 4, 5]
+
+
+def test_finalize_rejects_digests_that_do_not_match_consumed_chunks():
+    rolling = RollingHash()
+    _receive(rolling, 1)
+    other = [hashlib.sha256(b"outro").hexdigest()] + DIGESTS[1:]
+    assert rolling.finalize(other, _reader([])) is None
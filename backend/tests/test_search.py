@@ -0,0 +1,134 @@
+"""
+Busca global: o filtro de permissão dos clientes, a validação dos tipos e a manutenção incremental do
+índice search_entries pelos services (refresh_project e refresh_client), conferida com `check` depois de cada
+escrita. Como nos contadores do dashboard, divergências que o banco já tinha antes do teste não o reprovam:
+as escritas do teste não podem acrescentar nem tirar nenhuma.
+"""
+import os
+from uuid import UUID, uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.models import Client, File, SearchEntry, Stage
+from app.schemas.client import ClientUpdate
+from app.schemas.project import ProjectUpdate, StageUpdateForProject
+from app.schemas.task import TaskCreate
+from app.services.client_service import ClientService
+from app.services.file_service import FileService
+from app.services.project_service import ProjectService
+from app.services.search_index import SearchIndex
+from app.services.search_service import SearchService
+from app.services.task_service import TaskService
+
+
+def _differences(db) -> set:
+    db.rollback()
+    result = SearchIndex(db).check(limit=10_000)
+    db.rollback()
+    return {(d["entity_type"], d["entity_id"], d["stored"], d["expected"]) for d in result["differences"]}
+
+
+def _search(db, actor, q, types=None):
+    return {(hit.type, hit.id) for hit in SearchService(db).search(actor, q, types, 50).items}
+
+
+def _entries(db, project_id):
+    db.expire_all()
+    return {(entry.entity_type, entry.entity_id): entry for entry in
+            db.query(SearchEntry).filter(SearchEntry.project_id == project_id)}
+
+
+@pytest.fixture
+def key():
+    # Termo que só aparece nos dados do teste
+    return f"tamarindo{uuid4().hex[:10]}"
+
+
+@pytest.fixture
+def uploaded(db, client, storage):
+    """Envia arquivos pela rota de upload e os remove no fim pelo service"""
+    file_ids = []
+
+    def upload(name, project_id):
+        response = client.post("/files", files=[
+            ("file", (name, os.urandom(2048), "application/pdf")), ("project_id", (None, str(project_id)))
+        ])
+        assert response.status_code == 200, response.text
+        file_ids.append(UUID(response.json()["id"]))
+        return file_ids[-1]
+
+    yield upload
+    db.rollback()
+    for file_id in file_ids:
+        FileService(db).delete_file(str(file_id))
+
+
+def test_client_only_finds_its_own_projects(db, service_data, key):
+    first, second = service_data.client(name=f"Cliente {key} um"), service_data.client(name=f"Cliente {key} dois")
+    shared_name = f"Obra {key}"
+    own = service_data.project([first], name=shared_name)
+    other = service_data.project([second], name=shared_name)
+    shared = service_data.project([first, second], name=f"{shared_name} conjunta")
+
+    actor = db.get(Client, first.id)
+    assert _search(db, actor, key) == {("client", first.id), ("project", own.id), ("project", shared.id)}
+    assert _search(db, actor, key, ["project", "client"]) == _search(db, actor, key)
+    # As etapas dos dois projetos têm os mesmos nomes: só as do próprio projeto aparecem
+    stage_name = own.stages[0].name
+    hits = {entity_id for _, entity_id in _search(db, actor, stage_name, ["stage"])}
+    assert {stage.id for stage in own.stages if stage.name == stage_name} <= hits
+    assert not hits & {stage.id for stage in other.stages}
+
+    everything = _search(db, service_data.admin, key)
+    assert {("project", other.id), ("client", second.id)} <= everything
+
+
+def test_types_are_validated_and_filter_hits(db, service_data, key):
+    project = service_data.project([service_data.client()], name=f"Obra {key}")
+    with pytest.raises(HTTPException) as error:
+        SearchService(db).search(service_data.admin, key, ["project", "orcamento"], 20)
+    assert error.value.status_code == 400
+    assert _search(db, service_data.admin, key, ["project"]) == {("project", project.id)}
+    assert _search(db, service_data.admin, key, ["client", "task"]) == set()
+
+
+def test_service_writes_keep_index_consistent(db, service_data, uploaded, key):
+    baseline = _differences(db)
+    first, second = service_data.client(name=f"Cliente {key}"), service_data.client()
+    project = service_data.project([first], name=f"Obra {key}")
+    stages = sorted(project.stages, key=lambda stage: stage.order)
+    task = TaskService(db).create_task(TaskCreate(title=f"Tarefa {key}", stage_id=stages[-1].id,
+                                                  created_by_id=service_data.admin.id))
+    file_id = uploaded(f"planta-{key}.pdf", project.id)
+    assert _differences(db) == baseline
+    assert all(entry.client_ids == [first.id] for entry in _entries(db, project.id).values())
+
+    # Renomear o projeto, trocar o cliente e remover a última etapa (com a tarefa) numa só escrita
+    ProjectService(db).update_project(project.id, ProjectUpdate(
+        name=f"Casa {key}", clients=[second.id],
+        stages=[StageUpdateForProject(id=stage.id, stage_type_id=stage.stage_type_id, order=stage.order,
+                                      status=stage.status, planned_start_date=stage.planned_start_date,
+                                      planned_end_date=stage.planned_end_date) for stage in stages[:-1]]
+    ))
+    assert _differences(db) == baseline
+    entries = _entries(db, project.id)
+    assert ("stage", stages[-1].id) not in entries and ("task", task.id) not in entries
+    assert all(entry.client_ids == [second.id] for entry in entries.values())
+    assert entries[("stage", stages[0].id)].subtitle == f"Casa {key}"
+    assert entries[("file", file_id)].subtitle == f"Casa {key}"
+    # O primeiro cliente perdeu o projeto e tudo que vinha dele
+    assert _search(db, db.get(Client, first.id), key) == {("client", first.id)}
+
+    # Renomear o cliente muda o subtítulo do projeto
+    ClientService(db).update_client(second.id, ClientUpdate(name=f"Construtora {key}"))
+    assert _differences(db) == baseline
+    assert _entries(db, project.id)[("project", project.id)].subtitle == f"Construtora {key}"
+
+    # Apagar o projeto tira as entradas dele e das etapas; o arquivo fica, sem projeto
+    ProjectService(db).delete_project(project.id)
+    assert _differences(db) == baseline
+    assert _entries(db, project.id) == {}
+    assert db.get(File, file_id).project_id is None
+    assert db.query(Stage).filter(Stage.project_id == project.id).count() == 0
+    assert ("file", file_id) in _search(db, service_data.admin, key)
@@ -0,0 +1,145 @@
+import asyncio
+import os
+from uuid import uuid4
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.core.storage import LocalStorage, S3Storage
+
+DATA = os.urandom(3 * 1024 * 1024 + 123)
+
+
+@pytest.fixture(scope="module")
+def moto_endpoint():
+    """Servidor S3 local (moto) no lugar de um MinIO: o driver fala HTTP com ele como falaria com o serviço real"""
+    server_module = pytest.importorskip("moto.server")
+    pytest.importorskip("boto3")
+    server = server_module.ThreadedMotoServer(ip_address="127.0.0.1", port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def s3_storage(moto_endpoint):
+    storage = S3Storage(f"crialt-{uuid4().hex}", endpoint_url=moto_endpoint, region="us-east-1",
+                        access_key_id="teste", secret_access_key="teste", prefix="uploads")
+    storage.client.create_bucket(Bucket=storage.bucket)
+    return storage
+
+
+@pytest.fixture(params=["local", "s3"])
+def storage(request, tmp_path):
+    if request.param == "local":
+        return LocalStorage(str(tmp_path / "storage"))
+    return request.getfixturevalue("s3_storage")
+
+
+def _read(storage, key, *args):
+    return b"".join(storage.open_range(key, *args))
+
+
+def test_put_stream_stat_and_open_range(storage):
+    chunks = [DATA[i:i + 700_000] for i in range(0, len(DATA), 700_000)]
+    assert storage.put_stream("blobs/ab/arquivo", iter(chunks)) == len(DATA)
+    stored = storage.stat("blobs/ab/arquivo")
+    assert stored.key == "blobs/ab/arquivo"
+    assert stored.size == len(DATA)
+    assert storage.exists("blobs/ab/arquivo")
+    assert _read(storage, "blobs/ab/arquivo") == DATA
+    assert _read(storage, "blobs/ab/arquivo", 100, 2_000_000) == DATA[100:2_000_000]
+    assert _read(storage, "blobs/ab/arquivo", len(DATA) - 10) == DATA[-10:]
+
+
+def test_missing_key(storage):
+    assert storage.stat("blobs/nao/existe") is None
+    assert not storage.exists("blobs/nao/existe")
+    storage.delete("blobs/nao/existe")
+
+
+def test_put_stream_async(storage):
+    async def chunks():
+        for i in range(0, len(DATA), 500_000):
+            yield DATA[i:i + 500_000]
+
+    assert asyncio.run(storage.put_stream_async("temp/async", chunks())) == len(DATA)
+    assert _read(storage, "temp/async") == DATA
+
+
+def test_move_replaces_destination(storage):
+    storage.put_bytes("temp/origem", b"novo")
+    storage.put_bytes("blobs/destino", b"antigo")
+    storage.move("temp/origem", "blobs/destino")
+    assert not storage.exists("temp/origem")
+    assert _read(storage, "blobs/destino") == b"novo"
+
+
+def test_copy_keeps_source(storage):
+    storage.put_bytes("blobs/origem", b"conteudo")
+    storage.put_bytes("legacy/copia", b"antigo")
+    storage.copy("blobs/origem", "legacy/copia")
+    assert _read(storage, "blobs/origem") == b"conteudo"
+    assert _read(storage, "legacy/copia") == b"conteudo"
+
+
+def test_list_and_delete_prefix(storage):
+    storage.put_bytes("temp_chunks/u1/chunk_000001", b"a" * 10)
+    storage.put_bytes("temp_chunks/u1/chunk_000002", b"b" * 5)
+    storage.put_bytes("temp_chunks/u10/chunk_000001", b"c" * 7)
+    listed = {obj.key: obj.size for obj in storage.list("temp_chunks/u1/")}
+    assert listed == {"temp_chunks/u1/chunk_000001": 10, "temp_chunks/u1/chunk_000002": 5}
+
+    assert storage.delete_prefix("temp_chunks/u1/") == 15
+    assert storage.list("temp_chunks/u1/") == []
+    assert storage.exists("temp_chunks/u10/chunk_000001")
+
+
+def test_local_storage_serves_paths_not_urls(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    storage.put_bytes("docs/memorial.pdf", b"pdf")
+    assert storage.presign("docs/memorial.pdf") is None
+    assert storage.local_path("docs/memorial.pdf") == os.path.join(os.path.realpath(tmp_path), "docs", "memorial.pdf")
+
+
+@pytest.mark.parametrize("key", ["../fora", "docs/../../fora", "/etc/passwd"])
+def test_local_storage_rejects_keys_outside_root(tmp_path, key):
+    storage = LocalStorage(str(tmp_path / "storage"))
+    with pytest.raises(HTTPException) as error:
+        storage.put_bytes(key, b"x")
+    assert error.value.status_code == 400
+
+
+def test_local_storage_rejects_symlinks(tmp_path):
+    outside = tmp_path / "fora"
+    outside.mkdir()
+    (outside / "segredo").write_bytes(b"segredo")
+    storage = LocalStorage(str(tmp_path / "storage"))
+    storage.put_bytes("docs/real", b"dados")
+    os.symlink(outside, tmp_path / "storage" / "escape")
+    os.symlink(tmp_path / "storage" / "docs" / "real", tmp_path / "storage" / "docs" / "atalho")
+
+    for key in ("escape/segredo", "docs/atalho"):
+        with pytest.raises(HTTPException) as error:
+            _read(storage, key)
+        assert error.value.status_code == 400
+
+
+def test_s3_presign_downloads_with_disposition(s3_storage):
+    s3_storage.put_bytes("blobs/planta", DATA)
+    url = s3_storage.presign("blobs/planta", 60, filename="planta.dwg", media_type="application/acad")
+    response = httpx.get(url)
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert response.headers["content-disposition"] == 'attachment; filename="planta.dwg"'
+    assert response.headers["content-type"] == "application/acad"
+
+
+def test_s3_keys_live_under_prefix(s3_storage):
+    s3_storage.put_bytes("blobs/x", b"x")
+    keys = [item["Key"] for item in s3_storage.client.list_objects_v2(Bucket=s3_storage.bucket)["Contents"]]
+    assert keys == ["uploads/blobs/x"]
+    with pytest.raises(HTTPException):
+        s3_storage.put_bytes("../x", b"x")
@@ -0,0 +1,57 @@
+import time
+
+KEY = ("clients", {"limit": 5})
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def _in_l1(tiered):
+    return tiered.local.lookup(*KEY)[1]
+
+
+def test_invalidate_in_one_process_evicts_the_other_l1(tiered_cache):
+    writer = tiered_cache()
+    reader = tiered_cache()
+    writer.set(*KEY, ["Ana"], tags=["clients:all"])
+    assert reader.get(*KEY) == ["Ana"]
+    assert _in_l1(reader)
+
+    # Sem o pub/sub o leitor continuaria servindo o valor do próprio L1 até o TTL acabar
+    writer.invalidate("clients:all")
+    assert _wait_for(lambda: not _in_l1(reader))
+    assert reader.get(*KEY) is None
+
+    writer.set(*KEY, ["Ana Maria"], tags=["clients:all"])
+    assert reader.get(*KEY) == ["Ana Maria"]
+
+
+def test_invalidation_during_shared_read_keeps_stale_value_out_of_l1(tiered_cache):
+    writer = tiered_cache()
+    reader = tiered_cache()
+    reader.get(*KEY)  # inscreve o leitor no canal de invalidação
+    writer.set(*KEY, ["Ana"], tags=["clients:all"])
+    read_shared = reader.shared.lookup_with_tags
+
+    def read_then_invalidate(prefix, params):
+        # O valor já foi lido do compartilhado quando a escrita em outro processo chega pelo canal
+        result = read_shared(prefix, params)
+        epoch = reader.epoch
+        writer.invalidate("clients:all")
+        assert _wait_for(lambda: reader.epoch > epoch)
+        return result
+
+    reader.shared.lookup_with_tags = read_then_invalidate
+    assert reader.get(*KEY) == ["Ana"]
+    assert not _in_l1(reader)
+
+    reader.shared.lookup_with_tags = read_shared
+    writer.set(*KEY, ["Ana Maria"], tags=["clients:all"])
+    assert reader.get(*KEY) == ["Ana Maria"]
+    assert _in_l1(reader)
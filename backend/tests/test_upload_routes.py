@@ -0,0 +1,67 @@
+import hashlib
+import os
+
+from app.models.chunked_upload import ChunkedUpload
+from app.models.file import File
+from app.models.project import Project
+from app.services.file_service import FileService
+
+
+def _cleanup(db, content_hash):
+    db.expire_all()
+    # Pelo service, que também solta o blob e tira o arquivo da busca
+    for file in db.query(File).filter(File.content_hash == content_hash).all():
+        FileService(db).delete_file(str(file.id))
+
+
+def test_post_file_with_fields_after_the_file(db, client):
+    project = db.query(Project).first()
+    data = os.urandom(300 * 1024)
+    # Mesma ordem do frontend: arquivo primeiro, campos depois
+    response = client.post("/files", files=[
+        ("file", ("memorial.pdf", data, "application/pdf")),
+        ("project_id", (None, str(project.id))),
+        ("description", (None, "Memorial descritivo")),
+    ])
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["size"] == len(data)
+    assert body["project_id"] == str(project.id)
+    assert body["description"] == "Memorial descritivo"
+    file = db.get(File, body["id"])
+    assert file.content_hash == hashlib.sha256(data).hexdigest()
+    _cleanup(db, file.content_hash)
+
+
+def test_post_file_rejects_invalid_type_before_storing(db, client):
+    response = client.post("/files", files={"file": ("script.exe", b"MZ", "application/x-msdownload")})
+    assert response.status_code == 400
+
+
+def test_post_chunk_checks_trailing_checksum(db, client):
+    chunks = [os.urandom(200 * 1024), os.urandom(1000)]
+    started = client.post("/files/chunked/initiate", json={
+        "filename": "render.pdf", "total_chunks": 2, "chunk_size": len(chunks[0]),
+        "total_size": sum(len(chunk) for chunk in chunks), "mime_type": "application/pdf"
+    })
+    assert started.status_code == 200, started.text
+    upload_id = started.json()["upload_id"]
+    try:
+        wrong = client.post(f"/files/chunked/{upload_id}/chunk/1", files=[
+            ("chunk", ("blob", chunks[0], "application/octet-stream")), ("checksum", (None, "0" * 64))
+        ])
+        assert wrong.status_code == 400
+        for number, chunk in enumerate(chunks, start=1):
+            response = client.post(f"/files/chunked/{upload_id}/chunk/{number}", files=[
+                ("chunk", ("blob", chunk, "application/octet-stream")),
+                ("checksum", (None, hashlib.sha256(chunk).hexdigest())),
+            ])
+            assert response.status_code == 200, response.text
+        completed = client.post(f"/files/chunked/{upload_id}/complete")
+        assert completed.status_code == 200, completed.text
+        file = db.get(File, completed.json()["final_file_id"])
+        assert file.content_hash == hashlib.sha256(b"".join(chunks)).hexdigest()
+        _cleanup(db, file.content_hash)
+    finally:
+        db.query(ChunkedUpload).filter(ChunkedUpload.upload_id == upload_id).delete()
+        db.commit()
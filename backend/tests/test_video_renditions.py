@@ -0,0 +1,124 @@
+import os
+import sys
+from uuid import uuid4
+
+import pytest
+
+from app.models.file import File, FileRendition
+from app.models.user import User
+from app.services import video_rendition_service as video_module
+from app.services.video_rendition_service import VideoRenditionService
+
+# ffmpeg/ffprobe falsos: o ffprobe responde metadados fixos e o ffmpeg grava bytes conhecidos no arquivo de
+# saída (último argumento), ou falha com FAKE_FFMPEG_FAIL definido
+FAKE_FFPROBE = f"""#!{sys.executable}
+import json
+print(json.dumps({{"streams": [{{"width": 640, "height": 360}}], "format": {{"duration": "12.5"}}}}))
+"""
+FAKE_FFMPEG = f"""#!{sys.executable}
+import os, sys
+if os.environ.get("FAKE_FFMPEG_FAIL"):
+    sys.stderr.write("Invalid data found when processing input")
+    sys.exit(1)
+output = sys.argv[-1]
+with open(output, "wb") as f:
+    f.write((os.path.basename(output) + ":").encode() * 1000)
+"""
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    paths = {}
+    for name, script in (("ffmpeg", FAKE_FFMPEG), ("ffprobe", FAKE_FFPROBE)):
+        path = tmp_path / "bin" / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(script)
+        path.chmod(0o755)
+        paths[name] = str(path)
+    monkeypatch.setattr(video_module.settings, "FFMPEG_PATH", paths["ffmpeg"])
+    monkeypatch.setattr(video_module.settings, "FFPROBE_PATH", paths["ffprobe"])
+    return paths
+
+
+@pytest.fixture
+def video(db, storage, monkeypatch):
+    monkeypatch.setattr(video_module, "storage", storage)
+    admin = db.query(User).filter(User.role == "admin").first()
+    storage.put_bytes("docs/obra.mp4", os.urandom(5000))
+    file = File(original_name="visita à obra.mp4", stored_name=f"{uuid4().hex}.mp4", path="docs/obra.mp4",
+                size=5000, mime_type="video/mp4", category="video", uploaded_by_id=admin.id)
+    db.add(file)
+    db.commit()
+    yield file
+    db.rollback()
+    db.query(FileRendition).filter(FileRendition.file_id == file.id).delete()
+    db.delete(file)
+    db.commit()
+
+
+def _fake_executor(monkeypatch):
+    """Troca o executor global por um que só registra os jobs, para o teste não disputar o banco com eles"""
+    submitted = []
+
+    class Executor:
+        def submit(self, fn, *args):
+            submitted.append((fn, *args))
+
+    monkeypatch.setattr(video_module, "_executor", Executor())
+    return submitted
+
+
+def _renditions(db, file):
+    db.expire_all()
+    return {r.kind: r for r in db.query(FileRendition).filter(FileRendition.file_id == file.id)}
+
+
+def test_schedule_without_ffmpeg_is_skipped(db, video, monkeypatch):
+    monkeypatch.setattr(video_module.settings, "FFMPEG_PATH", "/nao/existe/ffmpeg")
+    submitted = _fake_executor(monkeypatch)
+
+    assert VideoRenditionService(db).schedule(video) is False
+    assert submitted == []
+    assert _renditions(db, video) == {}
+
+
+def test_regenerate_route_without_ffmpeg_returns_503(client, video, monkeypatch):
+    monkeypatch.setattr(video_module.settings, "FFMPEG_PATH", "/nao/existe/ffmpeg")
+    assert client.post(f"/files/{video.id}/renditions").status_code == 503
+
+
+def test_schedule_records_pending_and_submits_job(db, video, fake_ffmpeg, monkeypatch):
+    submitted = _fake_executor(monkeypatch)
+
+    assert VideoRenditionService(db).schedule(video) is True
+    assert submitted == [(video_module.video_rendition_job, str(video.id))]
+    assert {kind: r.status for kind, r in _renditions(db, video).items()} == {"poster": "pending", "preview": "pending"}
+
+
+def test_process_stores_renditions_served_with_ranges(db, client, storage, video, fake_ffmpeg):
+    results = VideoRenditionService(db).process(str(video.id))
+    assert [(r.kind, r.status) for r in results] == [("poster", "ready"), ("preview", "ready")]
+
+    renditions = _renditions(db, video)
+    for kind, name in (("poster", "poster.jpg"), ("preview", "preview.mp4")):
+        rendition = renditions[kind]
+        assert rendition.path == f"renditions/{video.id}/{name}"
+        assert rendition.size == storage.stat(rendition.path).size == len(name) * 1000 + 1000
+        assert (rendition.width, rendition.height) == (640, 360)
+    assert renditions["preview"].duration == 12.5
+    assert renditions["poster"].duration is None
+
+    response = client.get(f"/files/{video.id}/renditions/preview", headers={"Range": "bytes=0-11"})
+    assert response.status_code == 206
+    assert response.content == b"preview.mp4:"
+    assert response.headers["content-type"] == "video/mp4"
+    listed = client.get(f"/files/{video.id}/renditions").json()
+    assert [r["status"] for r in listed] == ["ready", "ready"]
+
+
+def test_process_failure_is_recorded(db, client, video, fake_ffmpeg, monkeypatch):
+    monkeypatch.setenv("FAKE_FFMPEG_FAIL", "1")
+    results = VideoRenditionService(db).process(str(video.id))
+    assert [r.status for r in results] == ["failed", "failed"]
+    assert "Invalid data" in _renditions(db, video)["poster"].error_message
+    assert client.get(f"/files/{video.id}/renditions/poster").status_code == 404
@@ -0,0 +1,86 @@
+import os
+import zipfile
+
+from app.utils.zip_stream import STORED_EXTENSIONS, ZIP64_ENTRY_THRESHOLD, stream_zip
+
+BLOCK = 1024 * 1024
+
+
+def _entry(path, arcname):
+    def chunks():
+        with open(path, "rb") as f:
+            while block := f.read(BLOCK):
+                yield block
+
+    return arcname, os.path.getsize(path), os.path.getmtime(path), chunks
+
+
+def _write_zip(entries, target):
+    # Blocos só de zeros viram buracos no arquivo: o ZIP de um arquivo esparso de 2GB ocupa quase nada em disco
+    with open(target, "wb") as out:
+        for part in stream_zip(entries):
+            if len(part) >= BLOCK and part.count(0) == len(part):
+                out.seek(len(part), os.SEEK_CUR)
+            else:
+                out.write(part)
+        out.truncate()
+
+
+def test_stored_and_deflated_entries_round_trip(tmp_path):
+    contents = {f"arquivo{ext}": os.urandom(5000) for ext in sorted(STORED_EXTENSIONS)}
+    contents["memorial.txt"] = "Orçamento da reforma\n".encode() * 2000
+    contents["Planta baixa ção.dwg"] = b"LINE 0 0 10 10\n" * 5000
+    entries = []
+    for name, data in contents.items():
+        path = tmp_path / f"src_{len(entries)}"
+        path.write_bytes(data)
+        entries.append(_entry(path, name))
+    # Nome repetido ganha sufixo em vez de sobrescrever a entrada anterior
+    entries.append(_entry(tmp_path / "src_0", next(iter(contents))))
+    archive = tmp_path / "export.zip"
+    _write_zip(entries, archive)
+
+    with zipfile.ZipFile(archive) as zf:
+        assert zf.testzip() is None
+        infos = {info.filename: info for info in zf.infolist()}
+        assert len(infos) == len(contents) + 1
+        for name, data in contents.items():
+            info = infos[name]
+            expected = zipfile.ZIP_STORED if os.path.splitext(name)[1] in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+            assert info.compress_type == expected
+            assert zf.read(name) == data
+        duplicate = next(iter(contents))
+        root, ext = os.path.splitext(duplicate)
+        assert zf.read(f"{root}_1{ext}") == contents[duplicate]
+    assert infos["memorial.txt"].compress_size < infos["memorial.txt"].file_size
+
+
+def test_zip64_entry_above_threshold_round_trips(tmp_path):
+    # Arquivo esparso acima de 0x7FFFFFFF com um trecho de dados no fim; .mp4 é armazenado sem deflate
+    big = tmp_path / "render.mp4"
+    size = ZIP64_ENTRY_THRESHOLD + 2 * BLOCK
+    tail = os.urandom(4096)
+    with open(big, "wb") as f:
+        f.truncate(size)
+        f.seek(size - len(tail))
+        f.write(tail)
+    small = tmp_path / "capa.jpg"
+    small.write_bytes(os.urandom(1000))
+    archive = tmp_path / "export.zip"
+    _write_zip([_entry(big, "render.mp4"), _entry(small, "capa.jpg")], archive)
+
+    assert os.path.getsize(archive) > size
+    with zipfile.ZipFile(archive) as zf:
+        info = zf.getinfo("render.mp4")
+        assert info.file_size == size
+        assert info.compress_type == zipfile.ZIP_STORED
+        # Ler até o fim faz o zipfile conferir o CRC da entrada
+        with zf.open(info) as entry:
+            read = 0
+            while block := entry.read(8 * BLOCK):
+                read += len(block)
+                last = block
+        assert read == size
+        assert last.endswith(tail)
+        # A entrada seguinte fica depois de 2GB: o offset dela precisa estar certo no diretório central
+        assert zf.read("capa.jpg") == small.read_bytes()
@@ -79,6 +79,7 @@ export interface ChunkUploadResponse {
   received: boolean;
   upload_progress: number;
   uploaded_chunks: number[];
+  checksum?: string;
 }
 
 export interface ChunkedUploadStatus {
@@ -348,7 +349,10 @@ export class FileService {
    * Calcula o checksum SHA-256 do arquivo completo
    */
   private async calculateFileChecksum(file: File): Promise<string> {
-    const buffer = await file.arrayBuffer();
+    return this.sha256Hex(await file.arrayBuffer());
+  }
+
+  private async sha256Hex(buffer: ArrayBuffer): Promise<string> {
     const hashBuffer = await crypto.subtle.digest('SHA-256', buffer);
     const hashArray = Array.from(new Uint8Array(hashBuffer));
     return hashArray.map(b => b.toString(16).padStart(2, '0')).join('');
@@ -459,6 +463,8 @@ export class FileService {
 
     const formData = new FormData();
     formData.append('chunk', chunk);
+    // SHA-256 do chunk: o servidor rejeita na hora um chunk corrompido no caminho
+    formData.append('checksum', await this.sha256Hex(await chunk.arrayBuffer()));
 
     const request = new HttpRequest(
       'POST',